@@ -0,0 +1,73 @@
+"""Micro-benchmark: name generation through the compiled template.
+
+    python benchmarks/bench_names.py [--count 1000000] [--template ...]
+
+Builds `count` in-memory FileRecords (no disk access) and times
+`CompiledTemplate.make` over all of them, plus the one-off compile. Prints one
+JSON object; names_per_sec for the default template should stay well above 1M.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smartrename.engine import RenameOptions  # noqa: E402
+from smartrename.scanner import FileRecord  # noqa: E402
+from smartrename.template import compile_template  # noqa: E402
+
+CASES = {
+    "classic": "",
+    "padded": "{base}{sep}{index:6}",
+    "parent": "{parent}{sep}{index}",
+    "orig_stem": "{orig_stem}{sep}{index}",
+    "mtime": "{mtime:%Y%m%d}{sep}{index}",
+}
+
+
+def run_case(template: str, count: int, repeat: int) -> dict:
+    opts = RenameOptions("/tmp", "Vacation", template=template, ext_mode="lower")
+    now = time.time_ns()
+    records = [FileRecord(f"/photos/{i % 50:02d}", f"IMG_{i:07d}.JPG", 1000 + i, now - i * 10**9, i)
+               for i in range(count)]
+    t0 = time.perf_counter()
+    tpl = compile_template(opts, count)
+    t_compile = time.perf_counter() - t0
+
+    make = tpl.make
+    best = float("inf")
+    for _ in range(repeat):
+        seq = opts.start
+        t0 = time.perf_counter()
+        for r in records:
+            make(r, seq)
+            seq += 1
+        best = min(best, time.perf_counter() - t0)
+    return {
+        "template": tpl.template,
+        "count": count,
+        "compile_s": round(t_compile, 6),
+        "best_s": round(best, 6),
+        "names_per_sec": int(count / best) if best else 0,
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--count", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--template", help="benchmark only this template")
+    args = ap.parse_args(argv)
+
+    cases = {"custom": args.template} if args.template is not None else CASES
+    results = {name: run_case(t, args.count, args.repeat) for name, t in cases.items()}
+    json.dump({"benchmark": "names", "python": sys.version.split()[0], "results": results},
+              sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Memory benchmark: peak RSS of holding a whole preview in memory.
+
+    python benchmarks/bench_rows.py [--count 1000000] [--stores rowstore,planrows]
+
+For each store a fresh child process builds `count` in-memory FileRecords
+(spread over folders like a real tree; no disk access), plans them and keeps
+every row: "rowstore" is what the GUI holds (smartrename.rowstore), "planrows"
+a plain list of engine.PlanRow objects for comparison. Each child reports its
+RSS before planning and its peak RSS after; prints one JSON object. Needs the
+`resource` module (Linux / macOS).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smartrename import engine  # noqa: E402
+from smartrename.engine import RenameOptions  # noqa: E402
+from smartrename.rowstore import RowStore  # noqa: E402
+from smartrename.scanner import FileRecord, ScanResult  # noqa: E402
+
+STORES = ("rowstore", "planrows")
+FILES_PER_DIR = 200
+
+
+def rss_mb() -> float:
+    """Current RSS (Linux /proc; elsewhere the peak so far)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # bytes on macOS, KiB elsewhere
+
+
+def synthetic_scan(count: int) -> ScanResult:
+    now = time.time_ns()
+    records = []
+    names_by_dir = {}
+    for i in range(count):
+        d = f"/photos/{i // FILES_PER_DIR // 100:03d}/{i // FILES_PER_DIR:05d}"
+        name = f"IMG_{i:07d}.JPG"
+        records.append(FileRecord(d, name, 1000 + i, now - i * 10**9, i + 1))
+        names_by_dir.setdefault(d, set()).add(name)
+    return ScanResult(records, names_by_dir)
+
+
+def child(store: str, count: int) -> dict:
+    opts = RenameOptions("/photos", "Vacation")
+    scanned = synthetic_scan(count)
+    before = rss_mb()
+    t0 = time.perf_counter()
+    if store == "rowstore":
+        rows = RowStore()
+        append = rows.append
+        for r, new_name, status, dup in engine.iter_planned(opts, scanned):
+            append(r.parent, r.name, new_name, status, dup)
+    else:
+        rows = list(engine.iter_plan(opts, scanned))
+    elapsed = time.perf_counter() - t0
+    peak = peak_rss_mb()
+    return {
+        "store": store,
+        "rows": len(rows),
+        "plan_s": round(elapsed, 3),
+        "rss_before_mb": round(before, 1),
+        "peak_rss_mb": round(peak, 1),
+        "rows_mb": round(peak - before, 1),
+        "bytes_per_row": int((peak - before) * 2**20 / max(1, len(rows))),
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--count", type=int, default=1_000_000)
+    ap.add_argument("--stores", default=",".join(STORES), help="comma list: " + ",".join(STORES))
+    ap.add_argument("--child", choices=STORES, help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        json.dump(child(args.child, args.count), sys.stdout)
+        return 0
+
+    results = {}
+    for store in args.stores.split(","):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", store,
+                              "--count", str(args.count)], check=True, capture_output=True, text=True).stdout
+        results[store] = json.loads(out)
+    json.dump({"benchmark": "rows", "python": sys.version.split()[0], "count": args.count,
+               "results": results}, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""Benchmark harness: synthetic trees, per-phase timings, baseline comparison.
+
+    python benchmarks/harness.py                       # quick matrix, compare with baseline.json
+    python benchmarks/harness.py --preset full         # up to 1M files
+    python benchmarks/harness.py --layouts deep --counts 100000 --sorts mtime
+    python benchmarks/harness.py --update-baseline     # store this run as the new baseline
+
+Each scenario builds a tree under --root (tmpfs when /dev/shm exists), then
+runs the headless engine phase by phase: scan, sort, names (template pass),
+resolve (conflict pass), rename and undo. Undo puts the tree back, so one
+tree serves every sort mode and repeated runs (each phase keeps its best
+time over --repeat runs). Results are printed as JSON. A phase counts as a
+regression when it is both --threshold slower (relative; --io-threshold for
+the syscall-bound scan/rename/undo) and --min-delta slower (absolute) than the
+baseline; the exit status is 1 if any phase regressed.
+
+"Collision density" is the share of target names already held by folders that
+are not part of the batch, so those files go through the " (N)" resolver.
+Baselines are machine-specific: refresh baseline.json when the hardware changes.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smartrename import engine  # noqa: E402
+from smartrename.engine import RenameOptions  # noqa: E402
+from smartrename.nameindex import NameIndex  # noqa: E402
+from smartrename.scanner import scan_tree  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, "baseline.json")
+PHASES = ("scan", "sort", "names", "resolve", "rename", "undo")
+IO_PHASES = {"scan", "rename", "undo"}  # syscall-bound: noisier, so judged with --io-threshold
+PRESETS = {
+    "quick": {"layouts": ["flat", "deep"], "counts": [1000, 10000], "collisions": [0.0, 0.1],
+              "sorts": ["name", "mtime"]},
+    "full": {"layouts": ["flat", "deep"], "counts": [1000, 10000, 100000, 1000000],
+             "collisions": [0.0, 0.1, 0.5], "sorts": ["name", "mtime", "size"]},
+}
+BASE = "Bench"
+FILES_PER_DIR = 100  # deep layout: files per leaf folder; leaves nest one folder level per digit
+
+
+def default_root() -> str:
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+# ---------- synthetic trees
+def build_tree(root: str, layout: str, count: int, collisions: float) -> str:
+    """Create `count` empty-but-sized files; returns the tree's top folder."""
+    top = tempfile.mkdtemp(prefix=f"smartrename-bench-{layout}-{count}-", dir=root)
+    width = len(str(count))
+    pad = engine.decide_pad("numbers", "auto", 1, count)  # how the planner will pad the index
+    levels = len(str(max(count - 1, 0) // FILES_PER_DIR))
+    now = time.time()
+    step = max(1, round(1 / collisions)) if collisions > 0 else 0
+    for i in range(count):
+        if layout == "flat":
+            d = top
+        else:
+            # leaf 1234 -> d1/d2/d3/d4, FILES_PER_DIR files each
+            leaf = f"{i // FILES_PER_DIR:0{levels}d}"
+            d = os.path.join(top, *(f"d{c}" for c in leaf))
+            if i % FILES_PER_DIR == 0:
+                os.makedirs(d, exist_ok=True)
+        # names in reverse of numeric order so every file really moves
+        p = os.path.join(d, f"IMG_{count - i:0{width}d}.jpg")
+        with open(p, "wb") as f:
+            f.truncate((i * 7919) % 65536)  # sparse: distinct sizes, no data written
+        os.utime(p, (now - i, now - (i * 31) % count))
+        if step and i % step == 0:
+            # a folder squatting on what will be this file's target name
+            os.mkdir(os.path.join(d, f"{BASE}_{i + 1:0{pad}d}.jpg"))
+    return top
+
+
+# ---------- one scenario
+def run_scenario(top: str, layout: str, count: int, collisions: float, sort: str,
+                 workers: int) -> dict:
+    opts = RenameOptions(top, BASE, include_sub=layout == "deep", sort=sort, workers=workers)
+    opts.validate()
+    t = {}
+
+    t0 = time.perf_counter()
+    scanned = scan_tree(opts.folder, recursive=opts.include_sub, with_stat=opts.needs_stat())
+    t["scan"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    engine.sort_records(opts, scanned.records)
+    t["sort"] = time.perf_counter() - t0
+
+    items = scanned.records
+    index = NameIndex(scanned.names_by_dir, case_insensitive=opts.case_insensitive)
+    t0 = time.perf_counter()
+    wanted = engine.generate_names(opts, items, index)
+    t["names"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    names, statuses = engine.claim_targets(opts, items, wanted, index)
+    t["resolve"] = time.perf_counter() - t0
+
+    rows = [engine.PlanRow(r.path, n, r.path.with_name(n), s) for r, n, s in zip(items, names, statuses)]
+    resolved = sum(1 for n, w in zip(names, wanted) if n != w)
+    t0 = time.perf_counter()
+    ok, fail, undo_map = engine.apply_renames(rows, workers=workers)
+    t["rename"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    undo_ok, undo_fail = engine.undo_renames(undo_map)
+    t["undo"] = time.perf_counter() - t0
+
+    if fail or undo_fail:
+        raise RuntimeError(f"{fail} rename(s) and {undo_fail} undo(s) failed in {top}")
+    return {
+        "files": len(items),
+        "renamed": ok,
+        "resolved": resolved,
+        "phases": {k: round(v, 6) for k, v in t.items()},
+        "total": round(sum(t.values()), 6),
+    }
+
+
+def best_of(runs: list) -> dict:
+    """Fastest time per phase over repeated runs of one scenario."""
+    best = dict(runs[0])
+    best["phases"] = {p: min(r["phases"][p] for r in runs) for p in runs[0]["phases"]}
+    best["total"] = round(sum(best["phases"].values()), 6)
+    best["runs"] = len(runs)
+    return best
+
+
+def scenario_key(layout: str, count: int, collisions: float, sort: str) -> str:
+    return f"{layout}-{count}-c{collisions:g}-{sort}"
+
+
+# ---------- baseline
+def compare(results: dict, baseline: dict, threshold: float, io_threshold: float,
+            min_delta: float) -> list:
+    """[(scenario, phase, baseline_s, current_s)] for every regressed phase."""
+    out = []
+    for key, cur in results.items():
+        old = baseline.get(key)
+        if not old:
+            continue
+        for phase in PHASES:
+            a, b = old["phases"].get(phase), cur["phases"].get(phase)
+            if a is None or b is None:
+                continue
+            limit = io_threshold if phase in IO_PHASES else threshold
+            if b > a * (1 + limit) and b - a > min_delta:
+                out.append((key, phase, a, b))
+    return out
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--preset", choices=list(PRESETS), default="quick")
+    ap.add_argument("--layouts", help="comma list: flat,deep")
+    ap.add_argument("--counts", help="comma list of file counts, e.g. 1000,100000")
+    ap.add_argument("--collisions", help="comma list of collision densities in [0, 1]")
+    ap.add_argument("--sorts", help="comma list of sort modes: name,mtime,size")
+    ap.add_argument("--workers", type=int, default=1, help="rename workers (default: 1)")
+    ap.add_argument("--repeat", type=int, default=3,
+                    help="runs per scenario; each phase keeps its fastest time (default: 3)")
+    ap.add_argument("--root", default=default_root(), help="where to build trees (default: %(default)s)")
+    ap.add_argument("--baseline", default=BASELINE, help="baseline JSON (default: benchmarks/baseline.json)")
+    ap.add_argument("--threshold", type=float, default=0.25,
+                    help="relative slowdown that counts for sort/names/resolve (default: 0.25)")
+    ap.add_argument("--io-threshold", type=float, default=0.5,
+                    help="relative slowdown that counts for scan/rename/undo (default: 0.5)")
+    ap.add_argument("--min-delta", type=float, default=0.01,
+                    help="ignore slowdowns smaller than this many seconds (default: 0.01)")
+    ap.add_argument("--update-baseline", action="store_true", help="write this run to --baseline")
+    ap.add_argument("-o", "--output", help="also write the results JSON here")
+    args = ap.parse_args(argv)
+
+    matrix = dict(PRESETS[args.preset])
+    if args.layouts:
+        matrix["layouts"] = args.layouts.split(",")
+    if args.counts:
+        matrix["counts"] = [int(c) for c in args.counts.split(",")]
+    if args.collisions:
+        matrix["collisions"] = [float(c) for c in args.collisions.split(",")]
+    if args.sorts:
+        matrix["sorts"] = args.sorts.split(",")
+
+    results = {}
+    for layout in matrix["layouts"]:
+        for count in matrix["counts"]:
+            for coll in matrix["collisions"]:
+                print(f"building {layout} tree, {count:,} files, collisions {coll:g}…", file=sys.stderr)
+                top = build_tree(args.root, layout, count, coll)
+                try:
+                    for sort in matrix["sorts"]:
+                        key = scenario_key(layout, count, coll, sort)
+                        runs = [run_scenario(top, layout, count, coll, sort, args.workers)
+                                for _ in range(max(1, args.repeat))]
+                        results[key] = best_of(runs)
+                        print(f"  {key}: {results[key]['total']:.3f}s", file=sys.stderr)
+                finally:
+                    shutil.rmtree(top, ignore_errors=True)
+
+    report = {
+        "benchmark": "harness",
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "root": args.root,
+        "workers": args.workers,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    if args.update_baseline:
+        old = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                old = json.load(f).get("results", {})
+        old.update(results)
+        report["results"] = old
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"baseline updated: {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("no baseline to compare with (run with --update-baseline)", file=sys.stderr)
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f).get("results", {})
+    regressions = compare(results, baseline, args.threshold, args.io_threshold, args.min_delta)
+    for key, phase, a, b in regressions:
+        print(f"REGRESSION {key} {phase}: {a:.4f}s -> {b:.4f}s (+{(b / a - 1) * 100:.0f}%)", file=sys.stderr)
+    if not regressions:
+        print(f"no regressions against {args.baseline}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
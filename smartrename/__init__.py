@@ -0,0 +1,16 @@
+"""Smart Renamer — Easy+ core package.
+
+`engine` holds the tkinter-free scan/plan/apply logic; `gui` is the Tk app and
+`cli` the headless front-end. Both front-ends drive the same engine.
+"""
+from .engine import PlanRow, RenameOptions, apply_renames, iter_plan, plan, scan, undo_renames
+
+__all__ = [
+    "PlanRow",
+    "RenameOptions",
+    "apply_renames",
+    "iter_plan",
+    "plan",
+    "scan",
+    "undo_renames",
+]
@@ -0,0 +1,255 @@
+"""Order a conflict-free batch of renames so chains never clobber each other.
+
+Within a batch every target is unique and every source is unique, so "row A
+must wait for row B to vacate A's target" forms a graph where each row has at
+most one blocker and at most one dependent: the components are simple chains
+and simple cycles. Chains run tail first (one rename per file); a cycle is
+broken by parking one member under a temporary name (k+1 renames for k files).
+With a backend that can exchange two names atomically (see
+smartrename.renameat), a two-file cycle -- a swap -- is one exchange step.
+"""
+import contextlib
+import os
+import uuid
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+TEMP_MARK = ".smartrename-swap-"
+
+
+class Step:
+    """One rename to perform. `row` is the plan row it belongs to; `temp` is
+    True for the first half of a cycle break (source -> temporary name);
+    `exchange` is True for a swap of old_path and target_path (two files)."""
+    __slots__ = ("old_path", "target_path", "status", "row", "temp", "exchange")
+
+    def __init__(self, old_path: Path, target_path: Path, row, temp: bool = False, exchange: bool = False):
+        self.old_path = old_path
+        self.target_path = target_path
+        self.status = "OK"
+        self.row = row
+        self.temp = temp
+        self.exchange = exchange
+
+    @property
+    def files(self) -> int:
+        """Files this step renames, for ok/failed counts."""
+        return 0 if self.temp else 2 if self.exchange else 1
+
+
+def name_key(p: Path) -> tuple:
+    # case-folded on purpose: on case-sensitive filesystems this can only add
+    # an ordering constraint, never drop one
+    return (str(p.parent), p.name.casefold())
+
+
+def temp_path(p: Path) -> Path:
+    return p.with_name(f"{TEMP_MARK}{uuid.uuid4().hex[:12]}{p.suffix}")
+
+
+def is_temp(p) -> bool:
+    """Whether `p` is a temporary name made by temp_path()."""
+    return os.path.basename(os.fspath(p)).startswith(TEMP_MARK)
+
+
+def order_renames(rows: Sequence, exchange: bool = False) -> List[Step]:
+    """Rows (with .old_path / .target_path) -> Steps in a safe execution order.
+    With `exchange`, swaps become single exchange steps."""
+    n = len(rows)
+    by_src = {}
+    for i, r in enumerate(rows):
+        by_src[name_key(r.old_path)] = i
+
+    # blocker[i]: row that must move before i can take its target
+    blocker = [None] * n
+    dependent = {}
+    for i, r in enumerate(rows):
+        b = by_src.get(name_key(r.target_path))
+        if b is not None and b != i:  # b == i: case-only rename of itself
+            blocker[i] = b
+            dependent[b] = i
+
+    done = [False] * n
+    out: List[Step] = []
+
+    def follow(j):
+        while j is not None and not done[j]:
+            out.append(Step(rows[j].old_path, rows[j].target_path, rows[j]))
+            done[j] = True
+            j = dependent.get(j)
+
+    # chains: start from rows whose target is already free
+    for i in range(n):
+        if blocker[i] is None and not done[i]:
+            follow(i)
+
+    # whatever is left sits on cycles
+    for i in range(n):
+        if done[i]:
+            continue
+        r = rows[i]
+        j = blocker[i]
+        if exchange and blocker[j] == i and r.old_path.parent == r.target_path.parent:
+            out.append(Step(r.old_path, r.target_path, r, exchange=True))
+            done[i] = done[j] = True
+            continue
+        tmp = temp_path(r.old_path)
+        out.append(Step(r.old_path, tmp, r, temp=True))
+        done[i] = True
+        follow(dependent.get(i))
+        out.append(Step(tmp, r.target_path, r))
+    return out
+
+
+class BlockedNames:
+    """Tracks names that stayed occupied because a step failed, so a later step
+    that would rename onto them is skipped instead of overwriting a file."""
+
+    def __init__(self):
+        self._keys = set()
+
+    def blocks(self, step) -> bool:
+        return bool(self._keys) and name_key(step.target_path) in self._keys
+
+    def add(self, step):
+        self._keys.add(name_key(step.old_path))
+        if step.exchange:
+            self._keys.add(name_key(step.target_path))
+
+
+def cycle_safe_chunks(steps: Sequence[Step], size: int) -> Iterator[Tuple[int, int]]:
+    """[start, stop) ranges of at least `size` steps (but the last) that never
+    end between the two halves of a cycle break."""
+    start = 0
+    parked = set()
+    for i, st in enumerate(steps):
+        if st.temp:
+            parked.add(st.target_path)
+        else:
+            parked.discard(st.old_path)
+        if not parked and i + 1 - start >= size:
+            yield start, i + 1
+            start = i + 1
+    if start < len(steps):
+        yield start, len(steps)
+
+
+def skipped_error(step) -> OSError:
+    return FileExistsError(f"skipped: {os.fspath(step.target_path)} was not vacated (an earlier rename failed)")
+
+
+def run_step(step: Step, renamer, resolve: bool = False) -> List[Tuple[Path, Path]]:
+    """Perform one step with a smartrename.renameat backend; returns the
+    (from, to) moves that happened (two, mirrored, for an exchange). With
+    `resolve`, a target that turned out to be taken gets the next free
+    `name (N).ext` instead, and the step and its row are updated to match."""
+    src, dst = step.old_path, step.target_path
+    if step.exchange:
+        renamer.swap(src, dst, temp_path(src))
+        return [(src, dst), (dst, src)]
+    try:
+        renamer.rename(src, dst)
+    except FileExistsError:
+        if not resolve or step.temp:
+            raise
+        dst = _rename_resolving(renamer, src, dst)
+        step.target_path = dst
+        if step.row is not None:
+            step.row.new_name = dst.name
+            step.row.target_path = dst
+    return [(src, dst)]
+
+
+def _rename_resolving(renamer, src: Path, dst: Path, limit: int = 10_000) -> Path:
+    # same "stem (N).ext" scheme as NameIndex.resolve, tried against the disk itself
+    ext = dst.suffix
+    stem = dst.name[:len(dst.name) - len(ext)] if ext else dst.name
+    for i in range(1, limit + 1):
+        cand = dst.with_name(f"{stem} ({i}){ext}")
+        try:
+            renamer.rename(src, cand)
+            return cand
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"{dst}: no free '{stem} (N){ext}' name")
+
+
+class StepRunner:
+    """Runs ordered steps one at a time and reports them per file: the hop of a
+    cycle break onto its temporary name is not reported, the hop off it is
+    reported as one move from the file's original name. While a file is parked
+    (`cycle_open`) a caller must not stop; if the hop off the temporary name
+    fails, the file is put back on its original name when that is still free.
+
+    on_result(src, dst, err) gets one call per file, on_step(step, err, undone)
+    one per step (undone=True: a temporary hop reverted that way). Both, and
+    the undo_map updates, run under `lock`."""
+
+    def __init__(self, renamer, resolve: bool = False, undo_map: Optional[list] = None,
+                 on_result=None, on_step=None, lock=None):
+        self.renamer = renamer
+        self.resolve = resolve
+        self.undo_map = undo_map if undo_map is not None else []
+        self.on_result = on_result
+        self.on_step = on_step
+        self.lock = lock or contextlib.nullcontext()
+        self._parked = {}    # temporary name -> (original name, its temp step)
+        self._unparked = {}  # temporary name -> (original name, error) of a hop that failed
+
+    @property
+    def cycle_open(self) -> bool:
+        return bool(self._parked)
+
+    def run(self, step: Step, skip: Optional[OSError] = None) -> Optional[OSError]:
+        """Run `step`, or fail it with `skip`; returns its error (None: renamed)."""
+        origin, err = step.old_path, skip
+        never = self._unparked.pop(step.old_path, None)
+        if never is not None:
+            origin, err = never  # the file never left its original name
+        moves = ()
+        if err is None:
+            try:
+                moves = run_step(step, self.renamer, self.resolve)
+            except OSError as e:
+                err = e
+        put_back = None
+        parked = self._parked.pop(step.old_path, None)
+        if parked is not None:
+            origin, temp_step = parked
+            if err is not None:
+                try:
+                    self.renamer.rename(step.old_path, origin)
+                    put_back = temp_step
+                except OSError as e:
+                    err = OSError(f"{err}; the file was left at {os.fspath(step.old_path)} ({e})")
+        elif step.temp:
+            if err is None:
+                self._parked[step.target_path] = (step.old_path, step)
+            else:
+                self._unparked[step.target_path] = (step.old_path, err)
+
+        with self.lock:
+            if put_back is not None:
+                _drop_last(self.undo_map, (step.old_path, origin))
+                if self.on_step:
+                    self.on_step(put_back, None, True)
+            for src, dst in moves:
+                self.undo_map.append((dst, src))
+            if self.on_step:
+                self.on_step(step, err, False)
+            if self.on_result and not step.temp:
+                if err is None:
+                    for src, dst in moves:
+                        self.on_result(origin if src == step.old_path else src, dst, None)
+                else:
+                    self.on_result(origin, step.target_path, err)
+                    if step.exchange:
+                        self.on_result(step.target_path, step.old_path, err)
+        return err
+
+
+def _drop_last(items: list, item):
+    for k in range(len(items) - 1, -1, -1):
+        if items[k] == item:
+            del items[k]
+            return
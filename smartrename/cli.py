@@ -0,0 +1,425 @@
+"""Headless command line front-end: `python main.py --headless FOLDER --base NAME ...`.
+
+The plan is streamed to stdout (or --output) one row at a time as JSONL or TSV;
+a one-line summary goes to stderr. Never imports tkinter.
+"""
+import argparse
+import dataclasses
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from . import engine, filters, jobqueue, journal, metacache, planfile, profiles
+from .engine import RenameOptions
+from .metrics import NO_METRICS, Metrics, capture, capture_prefix
+
+
+def _size_arg(text: str) -> int:
+    try:
+        return filters.parse_size(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def _date_arg(text: str) -> float:
+    try:
+        return filters.parse_date(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(
+        prog="main.py --headless",
+        description="Plan (and optionally apply) a bulk rename without the GUI.",
+    )
+    ap.add_argument("folder", nargs="?", help="folder to rename files in")
+    ap.add_argument("--base", help="base name (required when planning)")
+    ap.add_argument("--include-sub", action="store_true", help="include files in subfolders")
+    ap.add_argument("--max-depth", type=int, metavar="N",
+                    help="with --include-sub, go at most N subfolder levels deep (default: no limit)")
+    ap.add_argument("--sort", choices=list(engine.SORT_MODES), default="name")
+    ap.add_argument("--reset-per-folder", action="store_true", help="reset numbering per subfolder")
+    ap.add_argument("--no-auto-resolve", dest="auto_resolve", action="store_false",
+                    help="report conflicts instead of adding ' (1)' suffixes")
+    ap.add_argument("--index-type", choices=list(engine.INDEX_TYPES), default="numbers")
+    ap.add_argument("--index-pos", choices=list(engine.INDEX_POSITIONS), default="after")
+    ap.add_argument("--sep", default="_")
+    ap.add_argument("--start", type=int, default=1)
+    ap.add_argument("--pad", choices=engine.PAD_MODES, default="auto")
+    ap.add_argument("--case", choices=engine.CASE_MODES, default="unchanged")
+    ap.add_argument("--ext", dest="ext_mode", choices=engine.EXT_MODES, default="keep")
+    ap.add_argument("--case-insensitive", action="store_true",
+                    help="treat names differing only in case as the same (SMB/NTFS shares)")
+    ap.add_argument("--template", default="",
+                    help="name template, e.g. '{base}{sep}{index:4}' or '{parent}_{mtime:%%Y%%m%%d}_{index}' "
+                         "(fields: base sep index parent orig_stem orig_name mtime taken size)")
+    ap.add_argument("--find", default="", help="regex to replace in every generated name")
+    ap.add_argument("--replace", default="", help="replacement for --find (\\1 for groups)")
+    ap.add_argument("--find-dupes", action="store_true",
+                    help="leave byte-identical copies of an earlier file as they are (status Duplicate)")
+
+    fg = ap.add_argument_group("filters (applied while scanning; excluded folders are not walked)")
+    fg.add_argument("--only-ext", dest="extensions", default="", metavar="EXTS",
+                    help="only files with these extensions, e.g. 'jpg,jpeg,heic'")
+    fg.add_argument("--include", action="append", default=[], metavar="RULE",
+                    help="only files matching this glob (or re:REGEX); repeatable")
+    fg.add_argument("--exclude", action="append", default=[], metavar="RULE",
+                    help="skip files and folders matching this glob (or re:REGEX), "
+                         "e.g. node_modules, .git, @eaDir; repeatable")
+    fg.add_argument("--skip-hidden", action="store_true", help="skip hidden files and folders")
+    fg.add_argument("--min-size", type=_size_arg, metavar="SIZE", help="e.g. 100K")
+    fg.add_argument("--max-size", type=_size_arg, metavar="SIZE", help="e.g. 2G")
+    fg.add_argument("--newer-than", type=_date_arg, metavar="DATE", help="modified at/after YYYY-MM-DD[ HH:MM]")
+    fg.add_argument("--older-than", type=_date_arg, metavar="DATE", help="modified before YYYY-MM-DD[ HH:MM]")
+
+    ap.add_argument("--format", choices=("jsonl", "tsv", "none"), default="jsonl",
+                    help="plan output format (default: jsonl)")
+    ap.add_argument("-o", "--output", help="write the plan here instead of stdout")
+    ap.add_argument("--apply", action="store_true", help="perform the renames after planning")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="parallel renames for high-latency shares (default: 1)")
+    ap.add_argument("--scan-workers", type=int, default=1, metavar="N",
+                    help="list N folders at a time while scanning deep or remote trees (default: 1)")
+    ap.add_argument("--timings", action="store_true",
+                    help="print per-phase timings and syscall counts to stderr")
+    ap.add_argument("--metrics", metavar="FILE",
+                    help="append this run's timings and counters as one JSON line to FILE")
+    ap.add_argument("--profile", metavar="DIR", nargs="?", const="",
+                    help="run under cProfile + tracemalloc and write .prof / .mem.txt files "
+                         "(default DIR: ~/.smartrename/profiles)")
+    ap.add_argument("--meta-cache", metavar="FILE", nargs="?", const="",
+                    help="keep EXIF dates (and content hashes) of unchanged files in an SQLite cache "
+                         f"so later runs skip re-reading them (default FILE: {metacache.default_path()})")
+
+    pg = ap.add_argument_group("plan files (review now, apply later)")
+    pg.add_argument("--save-plan", metavar="FILE",
+                    help="also write the plan to FILE (.csv or .jsonl) with relative paths, size/mtime "
+                         "fingerprints and the options used")
+    pg.add_argument("--apply-plan", metavar="FILE",
+                    help="rename as a saved plan says (skipping files changed since) and exit")
+    pg.add_argument("--plan-root", metavar="DIR",
+                    help="with --apply-plan, the folder the plan's paths are relative to "
+                         "(default: the one recorded in the plan)")
+
+    qg = ap.add_argument_group("profiles and job queue")
+    qg.add_argument("--save-profile", metavar="NAME",
+                    help="save the naming, scan and filter options given as a named profile and exit")
+    qg.add_argument("--use-profile", metavar="NAME",
+                    help="take every option from a saved profile instead of the flags (FOLDER is still needed)")
+    qg.add_argument("--list-profiles", action="store_true", help="list saved profiles and exit")
+    qg.add_argument("--delete-profile", metavar="NAME", help="delete a saved profile and exit")
+    qg.add_argument("--profiles-file", metavar="FILE", help=f"profiles location (default: {profiles.default_path()})")
+    qg.add_argument("--queue", metavar="FILE",
+                    help="run many folders, one 'FOLDER' or 'FOLDER<TAB>PROFILE' per line ('-' = stdin); "
+                         "lines without a profile use --use-profile or the flags. Plans only, unless --apply")
+    qg.add_argument("--per-device", type=int, default=1, metavar="N",
+                    help="queue jobs running at once on one disk or share (default: 1)")
+    qg.add_argument("--max-jobs", type=int, default=4, metavar="N",
+                    help="queue jobs running at once overall (default: 4)")
+
+    jg = ap.add_argument_group("journal (crash recovery and undo)")
+    jg.add_argument("--no-journal", dest="journal", action="store_false",
+                    help="don't record --apply batches in the on-disk journal")
+    jg.add_argument("--journal-dir", help=f"journal location (default: {journal.default_dir()})")
+    jg.add_argument("--list-batches", action="store_true", help="list journaled batches and exit")
+    jg.add_argument("--undo-batch", metavar="ID", help="revert a journaled batch and exit")
+    jg.add_argument("--resume-batch", metavar="ID", help="finish an interrupted batch and exit")
+    jg.add_argument("--rollback-torn", action="store_true",
+                    help="revert every batch that was interrupted mid-run and exit")
+    return ap
+
+
+def options_from_args(args: argparse.Namespace) -> RenameOptions:
+    return RenameOptions(
+        folder=args.folder or "",
+        base=args.base,
+        include_sub=args.include_sub,
+        sort=args.sort,
+        reset_per_folder=args.reset_per_folder,
+        auto_resolve=args.auto_resolve,
+        index_type=args.index_type,
+        index_pos=args.index_pos,
+        sep=args.sep,
+        start=args.start,
+        pad=args.pad,
+        case=args.case,
+        ext_mode=args.ext_mode,
+        case_insensitive=args.case_insensitive,
+        workers=args.workers,
+        template=args.template,
+        find=args.find,
+        replace=args.replace,
+        find_dupes=args.find_dupes,
+        scan_workers=args.scan_workers,
+        max_depth=args.max_depth,
+        extensions=args.extensions,
+        include=";".join(args.include),
+        exclude=";".join(args.exclude),
+        skip_hidden=args.skip_hidden,
+        min_size=args.min_size,
+        max_size=args.max_size,
+        newer_than=args.newer_than,
+        older_than=args.older_than,
+    )
+
+
+def _write_row(out, fmt: str, row: engine.PlanRow):
+    if fmt == "jsonl":
+        out.write(json.dumps(row.as_dict(), ensure_ascii=False) + "\n")
+    elif fmt == "tsv":
+        out.write(f"{row.old_path}\t{row.target_path}\t{row.status}\n")
+
+
+def _print_result(src, dst, err):
+    if err is not None:
+        print(f"[OS error] {src} -> {dst} :: {err}", file=sys.stderr)
+
+
+def journal_main(args) -> int:
+    """--list-batches / --undo-batch / --resume-batch / --rollback-torn."""
+    jdir = args.journal_dir
+    if args.list_batches:
+        for b in journal.list_batches(jdir):
+            print(b.summary())
+        return 0
+    if args.rollback_torn:
+        rc = 0
+        for b in journal.find_torn(jdir):
+            ok, fail = journal.undo_batch(b, _print_result)
+            print(f"Rolled back {b.batch_id}. Success: {ok}, Failed: {fail}", file=sys.stderr)
+            rc = rc or (1 if fail else 0)
+        return rc
+
+    batch_id = args.undo_batch or args.resume_batch
+    state = journal.find_batch(batch_id, jdir)
+    if state is None:
+        print(f"error: no such batch: {batch_id}", file=sys.stderr)
+        return 2
+    if args.undo_batch:
+        ok, fail = journal.undo_batch(state, _print_result)
+        print(f"Undo complete. Success: {ok}, Failed: {fail}", file=sys.stderr)
+    else:
+        ok, fail, unknown = journal.resume_batch(state, _print_result, workers=args.workers)
+        print(f"Resumed. Success: {ok}, Failed: {fail}, Unknown (left alone): {unknown}", file=sys.stderr)
+    return 1 if fail else 0
+
+
+def plan_main(args) -> int:
+    """--apply-plan FILE [--plan-root DIR]."""
+    try:
+        with planfile.PlanReader(args.apply_plan) as reader:
+            root = args.plan_root or reader.root
+            print(f"Applying plan made {reader.created or '(unknown)'} to {root}", file=sys.stderr)
+            ok, fail, stale, batch_id = planfile.apply_plan(
+                args.apply_plan, _print_result, root=root, workers=args.workers,
+                journal_dir=(args.journal_dir or journal.default_dir()) if args.journal else None, reader=reader)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    print(f"Done. Success: {ok}, Failed: {fail}" + (f" ({stale} changed since the plan)" if stale else ""),
+          file=sys.stderr)
+    if batch_id:
+        print(f"Journal batch: {batch_id} (undo with --undo-batch {batch_id})", file=sys.stderr)
+    return 1 if fail else 0
+
+
+def profiles_main(args) -> int:
+    """--list-profiles / --delete-profile / --save-profile."""
+    path = args.profiles_file
+    try:
+        if args.list_profiles:
+            for name in profiles.names(path):
+                print(name)
+        elif args.delete_profile:
+            if not profiles.delete(args.delete_profile, path):
+                print(f"error: no such profile: {args.delete_profile}", file=sys.stderr)
+                return 2
+        else:
+            opts = options_from_args(args)
+            # everything but the folder must be valid
+            dataclasses.replace(opts, folder=Path(args.folder or ".")).validate()
+            profiles.save(args.save_profile, opts, path)
+            print(f"Saved profile: {args.save_profile}", file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+def _read_queue(args) -> list:
+    """Jobs from --queue FILE: 'FOLDER' or 'FOLDER<TAB>PROFILE' per line."""
+    f = sys.stdin if args.queue == "-" else open(args.queue, "r", encoding="utf-8")
+    jobs = []
+    try:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            folder, _, name = line.partition("\t")
+            name = name.strip() or args.use_profile
+            if name:
+                opts = profiles.options(name, folder.strip(), args.profiles_file)
+            else:
+                opts = dataclasses.replace(options_from_args(args), folder=Path(folder.strip()))
+            jobs.append(jobqueue.Job(opts, name or ""))
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    return jobs
+
+
+def queue_main(args) -> int:
+    """--queue FILE [--apply] [--per-device N] [--max-jobs N]."""
+    try:
+        jobs = _read_queue(args)
+        if any(not j.profile for j in jobs) and args.base is None and not args.template:
+            raise ValueError("queue lines without a profile need --use-profile, --base or --template")
+        sched = jobqueue.Scheduler(jobs, apply=args.apply, per_device=args.per_device, max_jobs=args.max_jobs,
+                                   journal_dir=(args.journal_dir or journal.default_dir()) if args.journal else None,
+                                   on_update=_print_job, on_result=lambda job, src, dst, err: _print_result(src, dst, err))
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    t0 = time.perf_counter()
+    sched.run()
+    failed = [j for j in jobs if j.state == jobqueue.JOB_FAILED]
+    renamed = sum(j.ok for j in jobs)
+    print(f"Queue: {len(jobs)} job(s), {len(failed)} failed, {sum(j.files for j in jobs)} file(s), "
+          f"{sum(j.to_rename for j in jobs)} to rename, {renamed} renamed, {sum(j.failed for j in jobs)} "
+          f"rename(s) failed in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    return 1 if failed or any(j.failed for j in jobs) else 0
+
+
+def _print_job(job: jobqueue.Job):
+    if job.state in jobqueue.FINISHED:
+        print(job.summary(), file=sys.stderr)
+
+
+def main(argv=None) -> int:
+    ap = build_parser()
+    args = ap.parse_args(argv)
+    if args.list_batches or args.undo_batch or args.resume_batch or args.rollback_torn:
+        return journal_main(args)
+    if args.apply_plan:
+        return plan_main(args)
+    if args.list_profiles or args.delete_profile or args.save_profile:
+        if args.save_profile and args.base is None and not args.template:
+            ap.error("--save-profile needs --base (or --template)")
+        return profiles_main(args)
+    if args.queue:
+        return queue_main(args)
+    if not args.folder or (args.base is None and not args.template and not args.use_profile):
+        ap.error("FOLDER and --base (or --template, or --use-profile) are required")
+    try:
+        if args.use_profile:
+            opts = profiles.options(args.use_profile, args.folder, args.profiles_file)
+        else:
+            opts = options_from_args(args)
+        opts.validate()
+        if args.save_plan:
+            planfile.format_for(args.save_plan)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    metrics = Metrics("apply" if args.apply else "preview") \
+        if (args.timings or args.metrics or args.profile is not None) else NO_METRICS
+    if args.profile is None:
+        rc = run(args, opts, metrics)
+    else:
+        with capture(capture_prefix(args.profile or None, "cli")) as written:
+            rc = run(args, opts, metrics)
+        metrics.extra["profile"] = written
+        for path in written:
+            print(f"profile: {path}", file=sys.stderr)
+
+    if metrics:
+        metrics.finish()
+        if args.timings:
+            print(metrics.summary(), file=sys.stderr)
+        if args.metrics:
+            metrics.write(args.metrics)
+    return rc
+
+
+def run(args, opts: RenameOptions, metrics) -> int:
+    """Plan (and with --apply, rename) for already validated options."""
+    meta = None
+    if args.meta_cache is not None:
+        try:
+            meta = metacache.MetaCache(args.meta_cache or None)
+        except (OSError, sqlite3.Error) as e:
+            print(f"warning: metadata cache disabled: {e}", file=sys.stderr)
+    try:
+        scanned = engine.scan(opts, metrics, meta)
+    finally:
+        if meta is not None:
+            meta.close()
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    saved = planfile.PlanWriter(args.save_plan, opts.folder, opts.to_dict()) if args.save_plan else None
+    to_apply = []
+    counts = {engine.STATUS_OK: 0, engine.STATUS_SKIP: 0, engine.STATUS_CONFLICT: 0, engine.STATUS_DUPLICATE: 0}
+    records = scanned.records
+    t0 = time.perf_counter()
+    try:
+        for r, new_name, status, dup in engine.iter_planned(opts, scanned, metrics):
+            p = r.path
+            row = engine.PlanRow(p, new_name, p.with_name(new_name), status,
+                                 dup_of=None if dup is None else records[dup].path, ident=r.ident)
+            counts[status] += 1
+            _write_row(out, args.format, row)
+            if saved is not None:
+                saved.write(r.parent, r.name, new_name, status, r.size, r.mtime_ns,
+                            None if dup is None else str(row.dup_of))
+            if args.apply and status == engine.STATUS_OK:
+                to_apply.append(row)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if saved is not None:
+            saved.close()
+    if metrics:
+        # rows + output, i.e. everything in the loop that names/resolve didn't cover
+        metrics.phases["output"] = (time.perf_counter() - t0
+                                    - metrics.phases.get("names", 0.0) - metrics.phases.get("resolve", 0.0))
+    del scanned, records
+
+    print(f"Preview: {counts[engine.STATUS_OK]} to rename, "
+          f"{counts[engine.STATUS_SKIP]} skipped, {counts[engine.STATUS_CONFLICT]} conflict(s)"
+          + (f", {counts[engine.STATUS_DUPLICATE]} duplicate(s)." if opts.find_dupes else "."),
+          file=sys.stderr)
+    if saved is not None:
+        print(f"Plan saved: {args.save_plan} ({saved.rows} rows)", file=sys.stderr)
+
+    rc = 0
+    if args.apply:
+        if counts[engine.STATUS_CONFLICT]:
+            print("error: there are name conflicts; nothing was renamed.", file=sys.stderr)
+            return 1
+
+        calls = 0
+
+        def on_result(src, dst, err):
+            nonlocal calls
+            calls += 1
+            _print_result(src, dst, err)
+
+        with metrics.phase("rename"):
+            if args.journal:
+                ok, fail, _, batch_id = journal.apply_journaled(
+                    to_apply, opts.folder, on_result, workers=opts.workers, directory=args.journal_dir,
+                    auto_resolve=opts.auto_resolve)
+            else:
+                ok, fail, _ = engine.apply_renames(to_apply, on_result, workers=opts.workers,
+                                                  auto_resolve=opts.auto_resolve)
+                batch_id = None
+        metrics.add("rename", calls)
+        print(f"Done. Success: {ok}, Failed: {fail}", file=sys.stderr)
+        if batch_id:
+            print(f"Journal batch: {batch_id} (undo with --undo-batch {batch_id})", file=sys.stderr)
+        rc = 1 if fail else 0
+    return rc
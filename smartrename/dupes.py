@@ -0,0 +1,157 @@
+"""Byte-identical duplicate detection that reads as few bytes as it can.
+
+Each stage only looks at the files the previous one could not tell apart:
+
+    size     bucket by st_size, already known from the scan (no reads)
+    partial  hash of the first and last PARTIAL_BYTES; files no larger than
+             twice that are hashed whole here, which settles them
+    full     whole-file hash through mmap for large files still tied,
+             spread over a process pool for big batches
+
+Hashes are BLAKE2b-128. With a MetaCache (smartrename.metacache) full hashes
+are stored per file, so unchanged files are never hashed twice. Empty files
+are ignored: they are all "identical" but never interesting.
+"""
+import hashlib
+import mmap
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .metrics import NO_METRICS
+
+PARTIAL_BYTES = 64 * 1024
+CHUNK = 64                          # paths per pool task
+PROCESS_POOL_MIN_BYTES = 256 * 2**20  # below this much full hashing, threads are cheaper than spawning
+DIGEST_SIZE = 16
+
+
+def partial_hash(path: str, size: int) -> Optional[bytes]:
+    """Digest of the first and last PARTIAL_BYTES (the whole file when it is
+    at most 2 * PARTIAL_BYTES, in which case it equals full_hash())."""
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    try:
+        with open(path, "rb") as f:
+            if size <= 2 * PARTIAL_BYTES:
+                h.update(f.read())
+            else:
+                h.update(f.read(PARTIAL_BYTES))
+                f.seek(-PARTIAL_BYTES, os.SEEK_END)
+                h.update(f.read(PARTIAL_BYTES))
+    except OSError:
+        return None
+    return h.digest()
+
+
+def full_hash(path: str) -> Optional[bytes]:
+    """Digest of the whole file, read through mmap."""
+    h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return h.digest()  # mmap refuses empty files
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                h.update(m)
+    except (OSError, ValueError):
+        return None
+    return h.digest()
+
+
+def _partial_chunk(jobs: Sequence[Tuple[str, int]]) -> List[Optional[bytes]]:
+    return [partial_hash(p, size) for p, size in jobs]
+
+
+def _full_chunk(paths: Sequence[str]) -> List[Optional[bytes]]:
+    return [full_hash(p) for p in paths]
+
+
+def _pool_map(fn, items: Sequence, workers: int, processes: bool) -> list:
+    """fn over CHUNK-sized slices of items, flattened, in order."""
+    chunks = [items[i:i + CHUNK] for i in range(0, len(items), CHUNK)]
+    if len(chunks) <= 1 or workers <= 1:
+        return fn(items)
+    out: list = []
+    if processes and (os.cpu_count() or 1) > 1:
+        import multiprocessing
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, os.cpu_count() or 1),
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                for part in pool.map(fn, chunks):
+                    out.extend(part)
+            return out
+        except (OSError, RuntimeError, NotImplementedError):
+            out = []  # no usable process pool here: hashlib releases the GIL, threads do fine
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dupes") as pool:
+        for part in pool.map(fn, chunks):
+            out.extend(part)
+    return out
+
+
+def find_duplicates(records: Sequence, cache=None, workers: Optional[int] = None,
+                    metrics=NO_METRICS) -> Dict[int, int]:
+    """{index of a copy: index of the first record with the same bytes}, indices
+    into `records` (which must carry sizes, i.e. come from a stat'ing scan).
+    Phases dup_size / dup_partial / dup_full are timed, with files and bytes
+    read counted per phase."""
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+
+    with metrics.phase("dup_size"):
+        by_size: Dict[int, List[int]] = defaultdict(list)
+        for i, r in enumerate(records):
+            if r.size > 0:
+                by_size[r.size].append(i)
+        buckets = [idx for idx in by_size.values() if len(idx) > 1]
+    metrics.add("dup_size_files", len(records))
+
+    digests: Dict[int, bytes] = {}     # whole-content digest per record index
+    fresh: List[int] = []              # digests computed this run (for the cache)
+    cands = [i for idx in buckets for i in idx]
+    if cache is not None and cands:
+        for i, known in zip(cands, cache.get([records[i] for i in cands], "hash")):
+            if known is not None:
+                digests[i] = bytes.fromhex(known)
+    cached_sizes = {records[i].size for i in digests}
+
+    with metrics.phase("dup_partial"):
+        todo = [i for i in cands if i not in digests]
+        parts = _pool_map(_partial_chunk, [(os.path.join(records[i].parent, records[i].name), records[i].size)
+                                           for i in todo], workers, processes=False)
+        ties: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+        for i, d in zip(todo, parts):
+            if d is None:
+                continue
+            if records[i].size <= 2 * PARTIAL_BYTES:
+                digests[i] = d
+                fresh.append(i)
+            else:
+                ties[(records[i].size, d)].append(i)
+    metrics.add("dup_partial_files", len(todo))
+    metrics.add("dup_partial_bytes", sum(min(records[i].size, 2 * PARTIAL_BYTES) for i in todo))
+
+    with metrics.phase("dup_full"):
+        # a large file needs its full hash if its partial hash ties with another
+        # uncached file, or if a cached digest of the same size could match it
+        full = [i for key, idx in ties.items() for i in idx if len(idx) > 1 or key[0] in cached_sizes]
+        total = sum(records[i].size for i in full)
+        hashed = _pool_map(_full_chunk, [os.path.join(records[i].parent, records[i].name) for i in full],
+                           workers, processes=total >= PROCESS_POOL_MIN_BYTES)
+        for i, d in zip(full, hashed):
+            if d is not None:
+                digests[i] = d
+                fresh.append(i)
+    metrics.add("dup_full_files", len(full))
+    metrics.add("dup_full_bytes", total)
+
+    if cache is not None and fresh:
+        cache.put([records[i] for i in fresh], "hash", [digests[i].hex() for i in fresh])
+
+    first: Dict[Tuple[int, bytes], int] = {}
+    dup_of: Dict[int, int] = {}
+    for i in sorted(digests):
+        key = (records[i].size, digests[i])
+        j = first.setdefault(key, i)
+        if j != i:
+            dup_of[i] = j
+    metrics.add("dupes", len(dup_of))
+    return dup_of
@@ -0,0 +1,709 @@
+"""Scan / plan / apply engine shared by the Tk app and the headless CLI.
+
+Nothing in this module imports tkinter, so it can run on machines without a
+display (or without Tk installed at all).
+"""
+import calendar
+import os
+import re
+import stat
+import time
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .chains import BlockedNames, Step, StepRunner, is_temp, order_renames, skipped_error, temp_path
+from .metrics import NO_METRICS
+from .nameindex import NameIndex
+from .scanner import FileRecord, ScanResult, scan_tree
+
+ILLEGAL_WIN_CHARS = r'[<>:"/\\|?*\x00-\x1F]'
+
+# option values -> UI labels (the GUI shows the labels, the engine uses the keys)
+SORT_MODES = {
+    "name": "Name (A→Z)",
+    "mtime": "Modified time (old→new)",
+    "size": "Size (small→large)",
+    "taken": "Date taken, EXIF (old→new)",
+}
+INDEX_TYPES = {
+    "numbers": "Numbers",
+    "letters": "Letters",
+    "roman": "Roman",
+    "none": "None",
+}
+INDEX_POSITIONS = {
+    "after": "After base",
+    "before": "Before base",
+}
+PAD_MODES = ("auto", "1", "2", "3", "4", "5", "6")
+CASE_MODES = ("unchanged", "lower", "upper", "title")
+EXT_MODES = ("keep", "lower", "upper")
+
+# row statuses
+STATUS_OK = "OK"
+STATUS_SKIP = "Skip (same)"
+STATUS_CONFLICT = "Conflict"
+STATUS_DUPLICATE = "Duplicate"    # same bytes as an earlier file; left as is
+STATUS_FAILED = "Failed"          # the rename was tried and failed
+
+STATUS_TAGS = {
+    STATUS_OK: "ok",
+    STATUS_SKIP: "skip",
+    STATUS_CONFLICT: "conflict",
+    STATUS_DUPLICATE: "dup",
+    STATUS_FAILED: "failed",
+}
+
+
+def label_to_key(labels: dict, label: str) -> str:
+    """Reverse lookup for the label tables above (unknown labels pass through)."""
+    for key, text in labels.items():
+        if text == label:
+            return key
+    return label
+
+
+# ---------- options
+@dataclass
+class RenameOptions:
+    folder: Path
+    base: str
+    include_sub: bool = False
+    sort: str = "name"                # name | mtime | size | taken
+    reset_per_folder: bool = False
+    auto_resolve: bool = True
+    index_type: str = "numbers"       # numbers | letters | roman | none
+    index_pos: str = "after"          # after | before
+    sep: str = "_"
+    start: int = 1
+    pad: str = "auto"                 # auto | 1..6
+    case: str = "unchanged"           # unchanged | lower | upper | title
+    ext_mode: str = "keep"            # keep | lower | upper
+    case_insensitive: bool = False    # compare names like SMB/NTFS do
+    workers: int = 1                  # parallel renames at apply time (1 = sequential)
+    template: str = ""                # name template, e.g. "{base}{sep}{index:4}" (see smartrename.template)
+    find: str = ""                    # regex applied to each generated stem
+    replace: str = ""
+    find_dupes: bool = False          # mark byte-identical copies (see smartrename.dupes)
+    scan_workers: int = 1             # folders listed in parallel when scanning (helps on NFS/SMB)
+    max_depth: Optional[int] = None   # subfolder levels below `folder` with include_sub (None = all)
+    # scan filters (see smartrename.filters); excluded folders are never walked
+    extensions: str = ""              # allowlist, e.g. "jpg, heic" (empty = every file)
+    include: str = ""                 # ';'-separated globs / re:regexes a file must match
+    exclude: str = ""                 # ';'-separated globs / re:regexes for files and folders to skip
+    skip_hidden: bool = False         # dot-files/folders (and Windows hidden ones)
+    min_size: Optional[int] = None    # bytes
+    max_size: Optional[int] = None
+    newer_than: Optional[float] = None  # epoch seconds, compared with mtime
+    older_than: Optional[float] = None
+
+    def __post_init__(self):
+        self.folder = Path(self.folder)
+        self.base = (self.base or "").strip()
+
+    def validate(self):
+        """Raise ValueError with a user-facing message if the options can't be planned."""
+        if not self.folder.exists():
+            raise ValueError(f"Folder does not exist:\n{self.folder}")
+        if not self.base and (not self.template or "{base}" in self.template):
+            raise ValueError("Base name cannot be empty.")
+        if self.sort not in SORT_MODES:
+            raise ValueError(f"Unknown sort mode: {self.sort}")
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type: {self.index_type}")
+        if self.index_pos not in INDEX_POSITIONS:
+            raise ValueError(f"Unknown index position: {self.index_pos}")
+        if self.scan_workers < 1:
+            raise ValueError("Scan threads must be at least 1.")
+        if self.max_depth is not None and self.max_depth < 0:
+            raise ValueError("Subfolder depth cannot be negative.")
+        self.scan_filter()  # raises ValueError on a bad rule
+        from .template import compile_template
+        compile_template(self, 1)  # raises TemplateError (a ValueError) with the reason
+
+    def to_dict(self) -> dict:
+        """Every option as a JSON-ready dict (plan file headers, saved profiles)."""
+        d = {f.name: getattr(self, f.name) for f in fields(self)}
+        d["folder"] = str(self.folder)
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "RenameOptions":
+        """Inverse of to_dict(). Missing keys take their defaults; unknown ones
+        (written by a newer version) are ignored."""
+        known = {f.name for f in fields(cls)}
+        return cls(**{"folder": "", "base": "", **{k: v for k, v in d.items() if k in known}})
+
+    def scan_filter(self):
+        """The compiled smartrename.filters.ScanFilter, or None when nothing is filtered."""
+        if not (self.extensions.strip() or self.include.strip() or self.exclude.strip() or self.skip_hidden
+                or self.min_size is not None or self.max_size is not None
+                or self.newer_than is not None or self.older_than is not None):
+            return None
+        from .filters import ScanFilter, split_extensions, split_rules
+        return ScanFilter(self.folder, split_extensions(self.extensions), split_rules(self.include),
+                          split_rules(self.exclude), self.skip_hidden, self.min_size, self.max_size,
+                          self.newer_than, self.older_than)
+
+    def needs_stat(self) -> bool:
+        """True when the sort key or the template reads size / mtime (or the
+        capture date, which falls back to mtime), duplicates are looked for,
+        or a filter bounds size / mtime."""
+        if self.sort != "name" or self.find_dupes:
+            return True
+        if (self.min_size is not None or self.max_size is not None
+                or self.newer_than is not None or self.older_than is not None):
+            return True
+        from .template import STAT_FIELDS, fields_of
+        return bool(self.template) and bool(fields_of(self.template) & STAT_FIELDS)
+
+    def needs_taken(self) -> bool:
+        """True when the sort key or the template reads the EXIF capture date."""
+        if self.sort == "taken":
+            return True
+        from .template import fields_of
+        return bool(self.template) and "taken" in fields_of(self.template)
+
+
+# ---------- helpers (index formats)
+def int_to_letters(n: int) -> str:
+    """1 -> A, 26 -> Z, 27 -> AA (Excel-style)."""
+    s = ""
+    while n > 0:
+        n, rem = divmod(n - 1, 26)
+        s = chr(65 + rem) + s
+    return s or "A"
+
+def int_to_roman(n: int) -> str:
+    if n <= 0 or n >= 4000:
+        return str(n)
+    vals = [
+        (1000, "M"), (900, "CM"), (500, "D"), (400, "CD"),
+        (100, "C"), (90, "XC"), (50, "L"), (40, "XL"),
+        (10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I"),
+    ]
+    out = []
+    for v, sym in vals:
+        while n >= v:
+            out.append(sym)
+            n -= v
+    return "".join(out)
+
+def format_index(index_type: str, seq: int, pad: int) -> str:
+    if index_type == "none":
+        return ""
+    if index_type == "numbers":
+        return str(seq).zfill(pad)
+    if index_type == "letters":
+        # seq 0 => A (treat 0 as 1)
+        return int_to_letters(max(1, seq))
+    if index_type == "roman":
+        return int_to_roman(max(1, seq))
+    return str(seq).zfill(pad)
+
+def decide_pad(index_type: str, pad_mode: str, start: int, count: int) -> int:
+    if index_type != "numbers":
+        return 0
+    if pad_mode != "auto":
+        try:
+            d = int(pad_mode)
+            return max(1, min(d, 6))
+        except Exception:
+            return 2
+    # Auto
+    end = start + max(count - 1, 0)
+    return max(1, min(len(str(end)), 6))
+
+
+# ---------- helpers (names)
+def apply_case(s: str, mode: str) -> str:
+    if mode == "lower":
+        return s.lower()
+    if mode == "upper":
+        return s.upper()
+    if mode == "title":
+        return s.title()
+    return s
+
+def apply_ext_mode(ext: str, mode: str) -> str:
+    if mode == "lower":
+        return ext.lower()
+    if mode == "upper":
+        return ext.upper()
+    return ext
+
+def sanitize(name: str) -> str:
+    s = re.sub(ILLEGAL_WIN_CHARS, "_", name).strip().rstrip(".")
+    return s[:240] or "untitled"
+
+def build_name(opts: RenameOptions, index_token: str, ext: str) -> str:
+    """Base + index (+ separator) -> sanitized file name with the extension applied.
+    Classic layout only; planning goes through the compiled template instead."""
+    parts = []
+    if opts.index_pos == "before":
+        if index_token:
+            parts.append(index_token)
+        parts.append(opts.base)
+    else:
+        parts.append(opts.base)
+        if index_token:
+            parts.append(index_token)
+    stem = opts.sep.join([s for s in parts if s != ""])
+    stem = apply_case(stem, opts.case)
+    return sanitize(stem) + apply_ext_mode(ext, opts.ext_mode)
+
+def sample_name(opts: RenameOptions, count: int = 1, orig_name: str = "IMG_0001.jpg") -> str:
+    """What the first file of a run would be called (for the live sample label)."""
+    from .template import compile_template
+    now = time.time_ns()
+    rec = FileRecord(str(opts.folder), orig_name, 0, now, 0,
+                     taken=calendar.timegm(time.localtime(now // 1_000_000_000)))
+    return compile_template(opts, max(count, 1)).make(rec, opts.start)
+
+
+# ---------- plan
+class PlanRow:
+    """One planned rename. `dup_of` is the file a Duplicate row is a copy of;
+    `ident` the file's (inode, size) when the scan knew it (FileRecord.ident)."""
+    __slots__ = ("old_path", "new_name", "target_path", "status", "dup_of", "ident")
+
+    def __init__(self, old_path: Path, new_name: str, target_path: Path, status: str,
+                 dup_of: Optional[Path] = None, ident: Optional[Tuple[int, Optional[int]]] = None):
+        self.old_path = old_path
+        self.new_name = new_name
+        self.target_path = target_path
+        self.status = status
+        self.dup_of = dup_of
+        self.ident = ident
+
+    @property
+    def tag(self) -> str:
+        return STATUS_TAGS.get(self.status, "ok")
+
+    def as_dict(self) -> dict:
+        d = {
+            "old_path": str(self.old_path),
+            "new_name": self.new_name,
+            "target_path": str(self.target_path),
+            "status": self.status,
+        }
+        if self.dup_of is not None:
+            d["dup_of"] = str(self.dup_of)
+        return d
+
+
+def scan(opts: RenameOptions, metrics=NO_METRICS, meta=None) -> ScanResult:
+    """List the files to rename, sorted by parent folder then the chosen sort key.
+    Files are only stat'd when the sort key (or the template) needs size or mtime.
+    `meta` is an optional MetaCache (smartrename.metacache) that saves re-reading
+    photo headers (and re-hashing content) of files unchanged since an earlier run."""
+    with metrics.phase("scan"):
+        result = scan_tree(opts.folder, recursive=opts.include_sub, with_stat=opts.needs_stat(),
+                           workers=opts.scan_workers, max_depth=opts.max_depth, filt=opts.scan_filter())
+    if opts.needs_taken():
+        from .exif import fill_taken
+        with metrics.phase("exif"):
+            found, read = fill_taken(result.records, cache=meta)
+        metrics.add("exif_dates", found)
+        metrics.add("exif_reads", read)
+    with metrics.phase("sort"):
+        sort_records(opts, result.records)
+    if opts.find_dupes:
+        # after sorting, so the copy that comes first in the plan is the one kept
+        from .dupes import find_duplicates
+        result.dup_of = find_duplicates(result.records, cache=meta, metrics=metrics)
+    metrics.add("stat", result.stat_calls)
+    metrics.add("scandir", result.scandir_calls)
+    metrics.add("filtered", result.filtered)
+    metrics.add("pruned", result.pruned)
+    return result
+
+
+def update_scan(opts: RenameOptions, scanned: ScanResult, changes: dict, meta=None,
+                metrics=NO_METRICS) -> int:
+    """Fold live changes ({path: "add"|"remove"|"adddir"|"rmdir"}, see
+    smartrename.inotify) into `scanned` in place: only the changed paths are
+    stat'ed (a new folder is scanned), then the records are re-sorted.
+    The options' scan filters apply as in scan(). Returns how many records were added or removed."""
+    names_by_dir = scanned.names_by_dir
+    with_stat = opts.needs_stat()
+    filt = opts.scan_filter()
+    gone = set()          # (parent, name) of records to drop
+    dropped = set()       # folders no longer there (records inside them go too)
+    added: Dict[Tuple[str, str], FileRecord] = {}
+
+    def drop_tree(top: str):
+        inside = top + os.sep
+        for d in [d for d in names_by_dir if d == top or d.startswith(inside)]:
+            del names_by_dir[d]
+            scanned.dir_mtimes.pop(d, None)
+            dropped.add(d)
+
+    def add_tree(top: str):
+        drop_tree(top)  # a folder can come back under a name we still list
+        depth = None
+        if opts.max_depth is not None:
+            depth = opts.max_depth - len(Path(top).relative_to(opts.folder).parts)
+            if depth < 0:
+                return  # below the depth limit: listed in its parent, never scanned
+        sub = scan_tree(top, recursive=True, with_stat=with_stat, workers=opts.scan_workers, max_depth=depth,
+                        filt=filt)
+        names_by_dir.update(sub.names_by_dir)
+        scanned.dir_mtimes.update(sub.dir_mtimes)
+        dropped.difference_update(sub.names_by_dir)
+        for r in sub.records:
+            added[(r.parent, r.name)] = r
+
+    from .filters import PathEntry
+    with metrics.phase("live"):
+        for path, op in changes.items():
+            parent, name = os.path.split(path)
+            names = names_by_dir.get(parent)
+            if names is None:
+                continue  # not a listed folder (a subfolder without include_sub, or one that went away)
+            if op == "remove":
+                names.discard(name)
+                gone.add((parent, name))
+                added.pop((parent, name), None)
+                continue
+            if op == "rmdir":
+                names.discard(name)
+                drop_tree(path)
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                names.discard(name)  # gone again before we got to it
+                gone.add((parent, name))
+                added.pop((parent, name), None)
+                continue
+            names.add(name)
+            if stat.S_ISDIR(st.st_mode):
+                if opts.include_sub and (filt is None or not filt.skip_dir(PathEntry(path))):
+                    add_tree(path)
+            elif stat.S_ISREG(st.st_mode):
+                gone.add((parent, name))  # replaces any record we had for it
+                if filt is not None and (filt.skip_name(PathEntry(path)) or filt.skip_stat(st)):
+                    added.pop((parent, name), None)
+                elif with_stat:
+                    added[(parent, name)] = FileRecord(parent, name, st.st_size, st.st_mtime_ns, st.st_ino,
+                                                       dev=st.st_dev)
+                else:
+                    added[(parent, name)] = FileRecord(parent, name, -1, -1, st.st_ino)
+
+        kept = [r for r in scanned.records if r.parent not in dropped and (r.parent, r.name) not in gone]
+        removed = len(scanned.records) - len(kept)
+        new = [r for r in added.values() if r.parent not in dropped]
+        if new and opts.needs_taken():
+            from .exif import fill_taken
+            fill_taken(new, cache=meta)
+        kept.extend(new)
+        sort_records(opts, kept)
+        scanned.records = kept
+        if opts.find_dupes:
+            from .dupes import find_duplicates
+            scanned.dup_of = find_duplicates(kept, cache=meta)
+    metrics.add("stat", len(changes))
+    return removed + len(new)
+
+
+def sort_records(opts: RenameOptions, items: List[FileRecord]):
+    """Sort scanned records in place: by parent folder, then the chosen sort key."""
+    if opts.sort == "mtime":
+        items.sort(key=lambda r: (r.parent.lower(), r.mtime_ns))
+    elif opts.sort == "size":
+        items.sort(key=lambda r: (r.parent.lower(), r.size))
+    elif opts.sort == "taken":
+        items.sort(key=lambda r: (r.parent.lower(), r.taken is None, r.taken or 0))
+    else:
+        items.sort(key=lambda r: (r.parent.lower(), r.name.lower()))
+
+
+def iter_plan(opts: RenameOptions, scanned: ScanResult, metrics=NO_METRICS) -> Iterator[PlanRow]:
+    """Yield one PlanRow per scanned file, in order.
+
+    Names of files that are themselves being renamed in this batch count as
+    free, so re-numbering an already numbered folder (or swapping two names)
+    plans one rename per file instead of "(1)" suffixes; the apply step orders
+    those chains (see smartrename.chains).
+
+    Duplicates found by the scan keep their names and take no index number;
+    they come out as STATUS_DUPLICATE rows in their place in the order.
+    """
+    records = scanned.records
+    for r, new_name, status, dup in iter_planned(opts, scanned, metrics):
+        p = r.path
+        yield PlanRow(p, new_name, p.with_name(new_name), status,
+                      dup_of=None if dup is None else records[dup].path, ident=r.ident)
+
+
+def iter_planned(opts: RenameOptions, scanned: ScanResult,
+                 metrics=NO_METRICS) -> Iterator[Tuple[FileRecord, str, str, Optional[int]]]:
+    """iter_plan() without building PlanRows or Paths: (record, new name,
+    status, index of the record it duplicates or None) per scanned file."""
+    records = scanned.records
+    dup_of = scanned.dup_of
+    items = [r for i, r in enumerate(records) if i not in dup_of] if dup_of else records
+    index = NameIndex(scanned.names_by_dir, case_insensitive=opts.case_insensitive)
+    with metrics.phase("names"):
+        wanted = generate_names(opts, items, index)
+    with metrics.phase("resolve"):
+        names, statuses = claim_targets(opts, items, wanted, index)
+    metrics.add("files", len(records))
+    metrics.add("listdir", index.listdir_calls)
+    if not dup_of:
+        for r, new_name, status in zip(items, names, statuses):
+            yield r, new_name, status, None
+        return
+    planned = zip(names, statuses)
+    for i, r in enumerate(records):
+        j = dup_of.get(i)
+        if j is not None:
+            yield r, r.name, STATUS_DUPLICATE, j
+        else:
+            new_name, status = next(planned)
+            yield r, new_name, status, None
+
+
+def generate_names(opts: RenameOptions, items: Sequence[FileRecord], index: NameIndex) -> List[str]:
+    """Pass 1: the wanted name of every record. Every file that moves frees its
+    current name in `index`."""
+    from .template import compile_template
+
+    start = opts.start
+    per_folder_counter = {}
+    global_counter = start
+    make = compile_template(opts, len(items)).make
+    vacate = index.vacate
+    reset = opts.reset_per_folder
+
+    wanted = []
+    for r in items:
+        if reset:
+            seq = per_folder_counter.get(r.parent, start)
+            per_folder_counter[r.parent] = seq + 1
+        else:
+            seq = global_counter
+            global_counter += 1
+        new_name = make(r, seq)
+        wanted.append(new_name)
+        if new_name != r.name:
+            vacate(r.parent, r.name)
+    return wanted
+
+
+def claim_targets(opts: RenameOptions, items: Sequence[FileRecord], wanted: Sequence[str],
+                  index: NameIndex) -> Tuple[List[str], List[str]]:
+    """Pass 2: claim targets in order, resolving or flagging collisions.
+    Returns (final names, statuses)."""
+    names = []
+    statuses = []
+    for r, new_name in zip(items, wanted):
+        parent_key = r.parent
+        status = STATUS_OK
+        if new_name == r.name:
+            status = STATUS_SKIP
+        elif index.is_taken(parent_key, new_name):
+            if opts.auto_resolve:
+                ext = apply_ext_mode(r.suffix, opts.ext_mode)
+                stem = new_name[:len(new_name) - len(ext)] if ext else new_name
+                new_name = index.resolve(parent_key, stem, ext)
+            else:
+                status = STATUS_CONFLICT
+                index.reserve(parent_key, new_name)
+        else:
+            index.reserve(parent_key, new_name)
+        names.append(new_name)
+        statuses.append(status)
+
+    if not opts.auto_resolve:
+        _settle_conflicts(items, names, statuses, index)
+    return names, statuses
+
+
+def _settle_conflicts(items, names, statuses, index: NameIndex):
+    """A Conflict row stays where it is, so its name is not vacated after all;
+    any OK row that was counting on that name becomes a Conflict too."""
+    target_of = {}
+    for i, (r, name, status) in enumerate(zip(items, names, statuses)):
+        if status == STATUS_OK:
+            target_of[(r.parent, index.fold(name))] = i
+    stuck = [i for i, status in enumerate(statuses) if status == STATUS_CONFLICT]
+    while stuck:
+        i = stuck.pop()
+        r = items[i]
+        index.occupy(r.parent, r.name)
+        j = target_of.pop((r.parent, index.fold(r.name)), None)
+        if j is not None and j != i:
+            statuses[j] = STATUS_CONFLICT
+            stuck.append(j)
+
+
+def plan(opts: RenameOptions) -> List[PlanRow]:
+    opts.validate()
+    return list(iter_plan(opts, scan(opts)))
+
+
+# ---------- apply
+# on_result(src, dst, error) is called once per row; error is None on success
+ResultCallback = Callable[[Path, Path, Optional[BaseException]], None]
+# cancel() is polled between files; returning True stops the batch cleanly
+CancelCheck = Callable[[], bool]
+
+def apply_renames(rows: Iterable[PlanRow],
+                  on_result: Optional[ResultCallback] = None,
+                  cancel: Optional[CancelCheck] = None,
+                  undo_map: Optional[List[Tuple[Path, Path]]] = None,
+                  workers: int = 1,
+                  auto_resolve: bool = False,
+                  ) -> Tuple[int, int, List[Tuple[Path, Path]]]:
+    """Rename every OK row. Returns (ok, failed, undo_map) where undo_map is a list of
+    (dst, src) pairs in the order the renames happened. Pass your own `undo_map`
+    list to see it fill up while the batch runs.
+
+    Rows are put in chain order first (see smartrename.chains); a name swap is
+    one atomic exchange where the system supports it (reported as two mirrored
+    moves), otherwise it goes through a temporary name, which shows up in
+    undo_map but not in on_result (one call per file). Targets are never overwritten: a name taken since
+    the preview fails the row, or with `auto_resolve` gets a " (N)" suffix."""
+    from .renameat import open_renamer
+    with open_renamer() as renamer:
+        steps = order_renames([r for r in rows if r.status == STATUS_OK], exchange=renamer.can_exchange)
+        return apply_steps(steps, on_result, cancel, undo_map, workers, renamer, auto_resolve)
+
+
+def apply_steps(steps: Sequence[Step],
+                on_result: Optional[ResultCallback] = None,
+                cancel: Optional[CancelCheck] = None,
+                undo_map: Optional[List[Tuple[Path, Path]]] = None,
+                workers: int = 1,
+                renamer=None,
+                resolve: bool = False,
+                on_step=None,
+                ) -> Tuple[int, int, List[Tuple[Path, Path]]]:
+    """Run already ordered steps with a smartrename.renameat backend (one is
+    opened for the call when `renamer` is None). ok/failed count files and
+    on_result is called once per file (see chains.StepRunner, which also
+    describes on_step); cancel() is not honoured while a cycle has a file
+    parked on a temporary name.
+
+    With workers > 1 the steps go through the concurrent executor (see
+    smartrename.executor); callbacks are still delivered one at a time."""
+    if renamer is None:
+        from .renameat import open_renamer
+        with open_renamer() as renamer:
+            return apply_steps(steps, on_result, cancel, undo_map, workers, renamer, resolve, on_step)
+    if workers > 1:
+        from .executor import apply_parallel
+        return apply_parallel(steps, workers, on_result, cancel, undo_map, renamer, resolve, on_step)
+
+    ok, fail = 0, 0
+    runner = StepRunner(renamer, resolve, undo_map, on_result, on_step)
+    blocked = BlockedNames()
+    for st in steps:
+        if cancel and not runner.cycle_open and cancel():
+            break
+        err = runner.run(st, skipped_error(st) if blocked.blocks(st) else None)
+        if err is None:
+            ok += st.files
+        else:
+            fail += st.files
+            blocked.add(st)
+    return ok, fail, runner.undo_map
+
+
+def patch_rows(rows: Iterable[PlanRow], moves: Iterable[Tuple[Path, Path]],
+               errors: Dict[Path, BaseException]) -> Tuple[int, int]:
+    """Bring plan rows up to date after renames (or their undo) ran, without
+    rescanning: only the rows passed in are looked at.
+
+    `moves` are the (from, to) renames that succeeded, in the order they
+    were reported (one per file, both halves of an exchange included); `errors`
+    maps the source path of every failed rename to its error. A row that ends at its target becomes
+    STATUS_SKIP; one that ended up elsewhere (put back by undo, or stranded on
+    a temporary name) points at where it now is; a row whose step failed is
+    STATUS_FAILED. Returns (rows now at their target, failed rows)."""
+    where = {r.old_path: r for r in rows}
+    swapped = {}  # row at the target of an exchange, until its mirrored move comes
+    for src, dst in moves:
+        r = swapped.pop(src, None) or where.pop(src, None)
+        if r is not None:
+            other = where.get(dst)
+            if other is not None:
+                swapped[dst] = other
+            where[dst] = r
+    done = failed = 0
+    for loc, r in where.items():
+        moved = loc != r.old_path
+        r.old_path = loc
+        if loc == r.target_path:
+            r.new_name = loc.name
+            r.status = STATUS_SKIP
+            done += 1
+        elif loc in errors:
+            r.status = STATUS_FAILED
+            failed += 1
+        elif moved:
+            r.status = STATUS_OK
+    return done, failed
+
+
+def undo_renames(undo_map: List[Tuple[Path, Path]],
+                 on_result: Optional[ResultCallback] = None,
+                 cancel: Optional[CancelCheck] = None) -> Tuple[int, int]:
+    """Revert an undo map produced by apply_renames (last rename first). A
+    mirrored pair of entries is an exchange and is swapped back in one go;
+    nothing is renamed onto a name that is taken again. Counts and on_result
+    are per file, as for apply_renames: a file that goes back through a
+    temporary name is reported once, and cancel() is not honoured while one
+    is parked there. On return `undo_map` holds only the entries that were
+    never attempted (all of them reverted: empty)."""
+    from .renameat import open_renamer
+    ok, fail = 0, 0
+    parked = {}  # temporary name -> (where the file was, error if it couldn't get there)
+    i = len(undo_map) - 1
+    with open_renamer() as renamer:
+        while i >= 0:
+            if cancel and not parked and cancel():
+                break
+            dst, src = undo_map[i]
+            swap = i > 0 and undo_map[i - 1] == (src, dst)
+            i -= 2 if swap else 1
+            origin, err = dst, None
+            if dst in parked:
+                origin, err = parked.pop(dst)
+            try:
+                if err is not None:
+                    raise err
+                if swap:
+                    renamer.swap(dst, src, temp_path(dst))
+                else:
+                    try:
+                        renamer.rename(dst, src)
+                    except FileNotFoundError:
+                        raise FileNotFoundError(f"{dst} (cannot revert)") from None
+                    except FileExistsError:
+                        raise FileExistsError(f"{src} exists again (cannot revert)") from None
+            except OSError as e:
+                if is_temp(src):
+                    parked[src] = (dst, e)  # reported with the hop off the temporary name
+                    continue
+                if origin != dst and e is not err:
+                    e = OSError(f"{e}; the file was left at {dst}")
+                fail += 1 + swap
+                if on_result:
+                    on_result(origin, src, e)
+                    if swap:
+                        on_result(src, dst, e)
+                continue
+            if is_temp(src):
+                parked[src] = (dst, None)
+                continue
+            ok += 1 + swap
+            if on_result:
+                on_result(origin, src, None)
+                if swap:
+                    on_result(src, dst, None)
+    del undo_map[i + 1:]
+    return ok, fail
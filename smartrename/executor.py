@@ -0,0 +1,103 @@
+"""Concurrent rename executor for high-latency filesystems (NFS/SMB).
+
+Steps are split into *lanes*: within a directory, steps whose source and target
+names touch each other (a -> b, b -> c, or the two halves of a swap through a
+temporary name) share a lane and keep their order; unrelated steps get their
+own lanes. A fixed pool of threads pulls lanes from a
+shared queue, so independent renames overlap their round trips while chains
+never clobber each other.
+"""
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .chains import StepRunner
+
+MAX_WORKERS = 64
+
+
+def build_lanes(rows: Sequence) -> List[list]:
+    """Group steps (with .old_path / .target_path) into independent ordered lanes.
+
+    Names are compared case-folded so that case-insensitive shares are never
+    raced; at worst that serializes a few rows that could have run in parallel.
+    """
+    parent: Dict[tuple, tuple] = {}
+
+    def find(x):
+        root = x
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while x != root:  # path compression
+            parent[x], x = root, parent.get(x, x)
+        return root
+
+    keys = []
+    for r in rows:
+        d = str(r.old_path.parent)
+        a = (d, r.old_path.name.casefold())
+        b = (d, r.target_path.name.casefold())
+        keys.append(a)
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[rb] = ra
+
+    lanes: Dict[tuple, list] = {}
+    for r, k in zip(rows, keys):
+        lanes.setdefault(find(k), []).append(r)
+    return list(lanes.values())
+
+
+def apply_parallel(rows: Sequence, workers: int,
+                   on_result: Optional[Callable[[Path, Path, Optional[BaseException]], None]] = None,
+                   cancel: Optional[Callable[[], bool]] = None,
+                   undo_map: Optional[List[Tuple[Path, Path]]] = None,
+                   renamer=None, resolve: bool = False, on_step=None,
+                   ) -> Tuple[int, int, List[Tuple[Path, Path]]]:
+    """Run ordered steps (see smartrename.chains) with up to `workers` threads,
+    sharing one smartrename.renameat backend (its directory fds are thread-safe).
+
+    Same contract as engine.apply_steps: returns (ok, failed, undo_map), and
+    on_result / on_step / undo_map updates are serialized, so callers need no
+    locking. A cycle lives in one lane, and its lane finishes (or unwinds) it
+    before honouring cancel().
+    """
+    if renamer is None:
+        from .renameat import open_renamer
+        with open_renamer() as renamer:
+            return apply_parallel(rows, workers, on_result, cancel, undo_map, renamer, resolve, on_step)
+    if undo_map is None:
+        undo_map = []
+    lanes = deque(build_lanes(rows))
+    workers = max(1, min(workers, MAX_WORKERS, len(lanes) or 1))
+    lock = threading.Lock()
+    counts = [0, 0]  # ok, fail
+
+    def run():
+        while True:
+            try:
+                lane = lanes.popleft()
+            except IndexError:
+                return
+            runner = StepRunner(renamer, resolve, undo_map, on_result, on_step, lock)
+            broken = None
+            for r in lane:
+                if cancel and not runner.cycle_open and cancel():
+                    return
+                skip = None
+                if broken is not None:
+                    # later links of a chain depend on the failed one: don't run them
+                    skip = OSError(f"skipped, depends on failed rename of {broken}")
+                err = runner.run(r, skip)
+                if err is not None and broken is None:
+                    broken = r.old_path
+                with lock:
+                    counts[0 if err is None else 1] += r.files
+
+    threads = [threading.Thread(target=run, name=f"rename-{i}", daemon=True) for i in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return counts[0], counts[1], undo_map
@@ -0,0 +1,359 @@
+"""Capture date ("date taken") from photo headers, without third-party packages.
+
+Only the first HEAD_BYTES of a file are read up front; the few structures that
+live further in (a TIFF IFD, a HEIC Exif item) cost one extra small seek+read.
+Supported containers:
+
+    JPEG         APP1 "Exif" segment
+    TIFF         plain TIFF and TIFF-based raws (DNG, CR2, NEF, ARW, ORF, ...)
+    HEIC / HEIF  ISO-BMFF `meta` box: iinf (find the Exif item) + iloc (where it is)
+
+Dates are EXIF wall-clock times without a zone. They are returned as seconds
+from calendar.timegm(), i.e. "naive time encoded as UTC", so they sort
+correctly and format back with time.gmtime() to exactly what the camera wrote
+(negative for dates before 1970; "no date" is None).
+
+read_many() fans the work out over a pool: threads for small batches, a
+process pool (spawned, so it is safe to start from the GUI's worker thread) for
+large ones, where parsing rather than I/O would otherwise serialize on the GIL.
+"""
+import calendar
+import os
+import struct
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+from .metacache import NO_DATE
+
+HEAD_BYTES = 64 * 1024
+CHUNK = 256                  # paths per pool task
+PROCESS_POOL_MIN = 4096      # below this many files threads are cheaper than spawning
+MAX_ENTRIES = 1024           # sanity cap on IFD entry / box counts
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# extensions worth opening; everything else falls back to its mtime without a read
+EXIF_EXTS = {
+    ".jpg", ".jpeg", ".jpe", ".jfif",
+    ".tif", ".tiff", ".dng", ".cr2", ".nef", ".nrw", ".arw", ".sr2", ".orf", ".rw2",
+    ".pef", ".srw", ".raf", ".3fr", ".erf", ".kdc", ".mos", ".iiq",
+    ".heic", ".heif", ".hif", ".avif",
+}
+
+TAG_EXIF_IFD = 0x8769
+TAG_DATETIME = 0x0132
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_DATETIME_DIGITIZED = 0x9004
+
+
+class _Source:
+    """Random access over one open file, served from the header buffer when possible."""
+    __slots__ = ("f", "head")
+
+    def __init__(self, f, head: bytes):
+        self.f = f
+        self.head = head
+
+    def read(self, off: int, n: int) -> bytes:
+        if off < 0 or n < 0:
+            return b""
+        end = off + n
+        if end <= len(self.head):
+            return self.head[off:end]
+        self.f.seek(off)
+        return self.f.read(n)
+
+
+def parse_date(raw: bytes) -> Optional[int]:
+    """b"2023:07:14 18:02:31" -> timegm seconds (None for blank / zeroed dates)."""
+    s = raw.split(b"\0", 1)[0].strip()
+    if len(s) < 19:
+        return None
+    try:
+        y, mo, d = int(s[0:4]), int(s[5:7]), int(s[8:10])
+        h, mi, sec = int(s[11:13]), int(s[14:16]), int(s[17:19])
+    except ValueError:
+        return None
+    if y < 1800 or not (1 <= mo <= 12 and 1 <= d <= 31 and h < 24 and mi < 60 and sec < 61):
+        return None
+    return calendar.timegm((y, mo, d, h, mi, min(sec, 59), 0, 0, 0))
+
+
+# ---------- TIFF / EXIF
+def _ifd_entries(src: _Source, base: int, off: int, e: str) -> dict:
+    """tag -> (type, count, raw 4-byte value field, field's file offset)."""
+    raw = src.read(base + off, 2)
+    if len(raw) < 2:
+        return {}
+    n = min(struct.unpack(e + "H", raw)[0], MAX_ENTRIES)
+    data = src.read(base + off + 2, n * 12)
+    out = {}
+    for i in range(len(data) // 12):
+        tag, typ, count = struct.unpack_from(e + "HHI", data, i * 12)
+        out[tag] = (typ, count, data[i * 12 + 8:i * 12 + 12])
+    return out
+
+
+def _ascii(src: _Source, base: int, e: str, entry) -> Optional[int]:
+    typ, count, value = entry
+    if typ != 2 or count == 0:
+        return None
+    if count <= 4:
+        return parse_date(value[:count])
+    off = struct.unpack(e + "I", value)[0]
+    return parse_date(src.read(base + off, min(count, 64)))
+
+
+def parse_tiff(src: _Source, base: int) -> Optional[int]:
+    """DateTimeOriginal, else DateTimeDigitized, else IFD0 DateTime."""
+    hdr = src.read(base, 8)
+    if len(hdr) < 8:
+        return None
+    if hdr[:2] == b"II":
+        e = "<"
+    elif hdr[:2] == b"MM":
+        e = ">"
+    else:
+        return None
+    if struct.unpack(e + "H", hdr[2:4])[0] != 42:
+        return None  # BigTIFF and friends: not worth it for a date
+    ifd0 = _ifd_entries(src, base, struct.unpack(e + "I", hdr[4:8])[0], e)
+    ptr = ifd0.get(TAG_EXIF_IFD)
+    if ptr is not None:
+        exif = _ifd_entries(src, base, struct.unpack(e + "I", ptr[2])[0], e)
+        for tag in (TAG_DATETIME_ORIGINAL, TAG_DATETIME_DIGITIZED):
+            if tag in exif:
+                t = _ascii(src, base, e, exif[tag])
+                if t is not None:
+                    return t
+    if TAG_DATETIME in ifd0:
+        return _ascii(src, base, e, ifd0[TAG_DATETIME])
+    return None
+
+
+# ---------- JPEG
+def parse_jpeg(src: _Source) -> Optional[int]:
+    pos = 2
+    for _ in range(MAX_ENTRIES):
+        hdr = src.read(pos, 4)
+        if len(hdr) < 4 or hdr[0] != 0xFF:
+            return None
+        marker = hdr[1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # standalone markers
+            pos += 2
+            continue
+        if marker in (0xD9, 0xDA):  # end of image / start of scan: no metadata after this
+            return None
+        seglen = struct.unpack(">H", hdr[2:4])[0]
+        if marker == 0xE1 and src.read(pos + 4, 6) == b"Exif\0\0":
+            return parse_tiff(src, pos + 10)
+        pos += 2 + seglen
+    return None
+
+
+# ---------- HEIC / HEIF (ISO base media file format)
+def _boxes(src: _Source, start: int, end: int):
+    """Yield (type, payload_start, box_end) for the boxes in [start, end)."""
+    pos = start
+    for _ in range(MAX_ENTRIES):
+        if pos + 8 > end:
+            return
+        hdr = src.read(pos, 16)
+        if len(hdr) < 8:
+            return
+        size, typ = struct.unpack(">I4s", hdr[:8])
+        payload = pos + 8
+        if size == 1:
+            if len(hdr) < 16:
+                return
+            size = struct.unpack(">Q", hdr[8:16])[0]
+            payload = pos + 16
+        elif size == 0:
+            size = end - pos
+        if size < payload - pos:
+            return
+        yield typ, payload, pos + size
+        pos += size
+
+
+def _uint(data: bytes, off: int, size: int) -> int:
+    return int.from_bytes(data[off:off + size], "big") if size else 0
+
+
+def _exif_item_id(src: _Source, start: int, end: int) -> Optional[int]:
+    data = src.read(start, min(end - start, HEAD_BYTES))
+    version = data[0] if data else 0
+    pos = 4 + (2 if version == 0 else 4)
+    while pos + 8 <= len(data):
+        size, typ = struct.unpack_from(">I4s", data, pos)
+        if size < 8:
+            return None
+        if typ == b"infe":
+            v = data[pos + 8]
+            if v >= 2:
+                id_size = 2 if v == 2 else 4
+                item_id = _uint(data, pos + 12, id_size)
+                item_type = data[pos + 12 + id_size + 2:pos + 12 + id_size + 6]
+                if item_type == b"Exif":
+                    return item_id
+        pos += size
+    return None
+
+
+def _item_offset(src: _Source, start: int, end: int, want: int) -> Optional[int]:
+    data = src.read(start, min(end - start, HEAD_BYTES))
+    if len(data) < 8:
+        return None
+    version = data[0]
+    offset_size, length_size = data[4] >> 4, data[4] & 15
+    base_offset_size, index_size = data[5] >> 4, data[5] & 15
+    if version in (1, 2):
+        count_size, pos = (2, 6) if version == 1 else (4, 6)
+    else:
+        count_size, pos = 2, 6
+        index_size = 0
+    count = _uint(data, pos, count_size)
+    pos += count_size
+    id_size = 4 if version == 2 else 2
+    for _ in range(min(count, MAX_ENTRIES)):
+        item_id = _uint(data, pos, id_size)
+        pos += id_size
+        method = 0
+        if version in (1, 2):
+            method = _uint(data, pos, 2) & 15
+            pos += 2
+        pos += 2  # data_reference_index
+        base = _uint(data, pos, base_offset_size)
+        pos += base_offset_size
+        extents = _uint(data, pos, 2)
+        pos += 2
+        first = None
+        for _ in range(min(extents, MAX_ENTRIES)):
+            pos += index_size
+            off = _uint(data, pos, offset_size)
+            pos += offset_size + length_size
+            if first is None:
+                first = off
+        if item_id == want:
+            return base + (first or 0) if method == 0 else None
+        if pos > len(data):
+            return None
+    return None
+
+
+def parse_heif(src: _Source, size: int) -> Optional[int]:
+    for typ, start, end in _boxes(src, 0, size):
+        if typ != b"meta":
+            continue
+        start += 4  # FullBox version + flags
+        iinf = iloc = None
+        for t, s, e in _boxes(src, start, end):
+            if t == b"iinf":
+                iinf = (s, e)
+            elif t == b"iloc":
+                iloc = (s, e)
+        if iinf is None or iloc is None:
+            return None
+        item = _exif_item_id(src, *iinf)
+        if item is None:
+            return None
+        off = _item_offset(src, iloc[0], iloc[1], item)
+        if off is None:
+            return None
+        # Exif item payload: 4-byte offset to the TIFF header, then the header
+        skip = src.read(off, 4)
+        if len(skip) < 4:
+            return None
+        return parse_tiff(src, off + 4 + struct.unpack(">I", skip)[0])
+    return None
+
+
+# ---------- entry points
+def read_taken(path) -> Optional[int]:
+    """Capture time of one file (timegm seconds) or None when it has none."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(HEAD_BYTES)
+            src = _Source(f, head)
+            if head[:2] == b"\xff\xd8":
+                return parse_jpeg(src)
+            if head[:4] in (b"II*\0", b"MM\0*"):
+                return parse_tiff(src, 0)
+            if head[4:8] == b"ftyp":
+                return parse_heif(src, os.fstat(f.fileno()).st_size)
+    except (OSError, struct.error, IndexError, ValueError):
+        pass
+    return None
+
+
+def wall_clock(sec: int) -> int:
+    """POSIX seconds -> local wall-clock time, encoded like EXIF dates (timegm seconds)."""
+    t = _EPOCH + timedelta(seconds=sec)
+    try:
+        offset = t.astimezone().utcoffset()
+    except (OSError, OverflowError, ValueError):
+        # Windows can't look up the zone before 1970: use today's offset
+        offset = datetime.now(timezone.utc).astimezone().utcoffset()
+    return sec + int(offset.total_seconds())
+
+
+def _read_chunk(paths: Sequence[str]) -> List[Optional[int]]:
+    return [read_taken(p) for p in paths]
+
+
+def read_many(paths: Sequence[str], workers: Optional[int] = None) -> List[Optional[int]]:
+    """read_taken() for every path, in order, spread over a pool."""
+    if not paths:
+        return []
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+    chunks = [paths[i:i + CHUNK] for i in range(0, len(paths), CHUNK)]
+    if len(chunks) == 1 or workers <= 1:
+        return _read_chunk(paths)
+
+    out: List[Optional[int]] = []
+    if len(paths) >= PROCESS_POOL_MIN and (os.cpu_count() or 1) > 1:
+        import multiprocessing
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, os.cpu_count() or 1),
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                for part in pool.map(_read_chunk, chunks):
+                    out.extend(part)
+            return out
+        except (OSError, RuntimeError, NotImplementedError):
+            out = []  # no usable process pool here (sandbox, frozen app, ...): use threads
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="exif") as pool:
+        for part in pool.map(_read_chunk, chunks):
+            out.extend(part)
+    return out
+
+
+def fill_taken(records, workers: Optional[int] = None, cache=None) -> Tuple[int, int]:
+    """Set `taken` on every FileRecord: the EXIF capture time when the file has
+    one, else its mtime as local wall-clock time (same encoding, see
+    wall_clock). Records must carry mtime_ns (scan with stat). With a MetaCache, files whose size and
+    mtime are unchanged since a previous run are not opened at all.
+    Returns (dates that came from EXIF, files actually read)."""
+    todo = [r for r in records if os.path.splitext(r.name)[1].lower() in EXIF_EXTS]
+    found = 0
+    read = 0
+    if todo:
+        known = cache.get(todo, "taken") if cache is not None else [None] * len(todo)
+        misses = [r for r, k in zip(todo, known) if k is None]
+        if misses:
+            dates = read_many([os.path.join(r.parent, r.name) for r in misses], workers)
+            read = len(misses)
+            if cache is not None:
+                cache.put(misses, "taken", [NO_DATE if t is None else t for t in dates])
+            got = iter(dates)
+            known = [next(got) if k is None else k for k in known]
+        for r, t in zip(todo, known):
+            if t is not None and t != NO_DATE:
+                r.taken = t
+                found += 1
+    for r in records:
+        if r.taken is None and r.size >= 0:  # size -1: scanned without stat (mtime may be < 0 for real)
+            r.taken = wall_clock(r.mtime_ns // 1_000_000_000)
+    return found, read
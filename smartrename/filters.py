@@ -0,0 +1,183 @@
+"""Include/exclude rules evaluated by the scanner while it walks.
+
+Rules are checked as cheaply as possible, in this order:
+
+    folders   hidden / excluded folders are pruned: never listed, never descended into
+    names     hidden files, the extension allowlist, exclude and include rules are
+              decided from the directory entry alone, so a rejected file is never stat'ed
+    stat      min/max size and modified-time bounds, only for files that passed the above
+
+A rule is a glob (`*.tmp`, `IMG_????.*`) or, with a `re:` prefix, a regular
+expression. Globs without a `/` match the entry's name; globs with one, and
+all regexes (searched, not anchored), match the path relative to the scanned
+folder with `/` separators (`raw/*`, `re:^2019/`). Exclude rules apply to
+folders and files; include rules to files only (folders are still walked).
+
+Excluded files keep their names in the scan's per-folder name sets: a planned
+name can still collide with them.
+"""
+import fnmatch
+import os
+import re
+import stat
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+_SIZE = re.compile(r"\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*", re.I)
+_UNITS = {"": 1, "k": 2**10, "m": 2**20, "g": 2**30, "t": 2**40}
+_CASE_FLAGS = re.I if os.name == "nt" else 0   # same case rules as fnmatch on this system
+
+
+def split_rules(text: str) -> List[str]:
+    """'node_modules; *.tmp' -> ['node_modules', '*.tmp'] (';' or newline separated)."""
+    return [p.strip() for p in re.split(r"[;\n]", text or "") if p.strip()]
+
+
+def split_extensions(text: str) -> List[str]:
+    """'jpg, .HEIC png' -> ['.jpg', '.heic', '.png']."""
+    return ["." + e.lower().lstrip(".") for e in re.split(r"[\s,;]+", text or "") if e.strip(".")]
+
+
+def parse_size(text: str) -> Optional[int]:
+    """'' -> None, '512' -> 512, '10M' / '1.5 GB' -> bytes (binary units)."""
+    if not (text or "").strip():
+        return None
+    m = _SIZE.fullmatch(text)
+    if not m:
+        raise ValueError(f"Not a size: {text!r} (e.g. 500K, 10M, 2G)")
+    return int(float(m.group(1)) * _UNITS[m.group(2).lower()])
+
+
+def format_size(size: Optional[int]) -> str:
+    """Inverse of parse_size: None -> '', 10485760 -> '10M', 1500 -> '1500'."""
+    if size is None:
+        return ""
+    for unit in "TGMK":
+        n = _UNITS[unit.lower()]
+        if size >= n and size % n == 0:
+            return f"{size // n}{unit}"
+    return str(size)
+
+
+def parse_date(text: str) -> Optional[float]:
+    """'' -> None, 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM' (local time) -> epoch seconds."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    for fmt in ("%Y-%m-%d", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return time.mktime(time.strptime(text, fmt))
+        except ValueError:
+            continue
+    raise ValueError(f"Not a date: {text!r} (use YYYY-MM-DD or YYYY-MM-DD HH:MM)")
+
+
+def format_date(ts: Optional[float]) -> str:
+    """Inverse of parse_date (local time): None -> '', midnight -> 'YYYY-MM-DD'."""
+    if ts is None:
+        return ""
+    t = time.localtime(ts)
+    fmt = "%Y-%m-%d %H:%M:%S" if t.tm_sec else "%Y-%m-%d %H:%M" if t.tm_hour or t.tm_min else "%Y-%m-%d"
+    return time.strftime(fmt, t)
+
+
+def _compile(rule: str) -> Tuple[bool, Callable]:
+    """(matches the relative path, matcher) for one rule."""
+    if rule.startswith("re:"):
+        try:
+            return True, re.compile(rule[3:]).search
+        except re.error as e:
+            raise ValueError(f"Invalid filter regex {rule[3:]!r}: {e}") from None
+    glob = rule.strip("/")
+    return "/" in glob, re.compile(fnmatch.translate(glob), _CASE_FLAGS).match
+
+
+def _any(rules, name: str, rel: str) -> bool:
+    return any(match(rel if on_path else name) for on_path, match in rules)
+
+
+class ScanFilter:
+    """Compiled rules for one scan of `root` (see the module docstring)."""
+    __slots__ = ("root", "extensions", "include", "exclude", "skip_hidden",
+                 "min_size", "max_size", "min_mtime_ns", "max_mtime_ns", "_cut")
+
+    def __init__(self, root, extensions: Sequence[str] = (), include: Sequence[str] = (),
+                 exclude: Sequence[str] = (), skip_hidden: bool = False,
+                 min_size: Optional[int] = None, max_size: Optional[int] = None,
+                 newer_than: Optional[float] = None, older_than: Optional[float] = None):
+        self.root = str(root)
+        self._cut = len(os.path.join(self.root, ""))
+        self.extensions = frozenset(e.lower() for e in extensions) or None
+        self.include = [_compile(r) for r in include]
+        self.exclude = [_compile(r) for r in exclude]
+        self.skip_hidden = skip_hidden
+        self.min_size = min_size
+        self.max_size = max_size
+        self.min_mtime_ns = None if newer_than is None else int(newer_than * 1e9)
+        self.max_mtime_ns = None if older_than is None else int(older_than * 1e9)
+        if min_size is not None and max_size is not None and min_size > max_size:
+            raise ValueError("Minimum size is larger than maximum size.")
+        if newer_than is not None and older_than is not None and newer_than > older_than:
+            raise ValueError("'Newer than' date is after the 'older than' date.")
+
+    def needs_stat(self) -> bool:
+        return (self.min_size is not None or self.max_size is not None
+                or self.min_mtime_ns is not None or self.max_mtime_ns is not None)
+
+    def rel(self, path: str) -> str:
+        """Path relative to the scanned folder, '/'-separated."""
+        rel = path[self._cut:] if len(path) >= self._cut else ""
+        return rel.replace(os.sep, "/") if os.sep != "/" else rel
+
+    # ---------- checks (True = leave it out)
+    def skip_dir(self, entry) -> bool:
+        if self.skip_hidden and _hidden(entry):
+            return True
+        return bool(self.exclude) and _any(self.exclude, entry.name, self.rel(entry.path))
+
+    def skip_name(self, entry) -> bool:
+        name = entry.name
+        if self.skip_hidden and _hidden(entry):
+            return True
+        if self.extensions is not None:
+            i = name.rfind(".")
+            if not 0 < i < len(name) - 1 or name[i:].lower() not in self.extensions:
+                return True
+        if self.exclude or self.include:
+            rel = self.rel(entry.path)
+            if self.exclude and _any(self.exclude, name, rel):
+                return True
+            if self.include and not _any(self.include, name, rel):
+                return True
+        return False
+
+    def skip_stat(self, st) -> bool:
+        size, mtime_ns = st.st_size, st.st_mtime_ns
+        return ((self.min_size is not None and size < self.min_size)
+                or (self.max_size is not None and size > self.max_size)
+                or (self.min_mtime_ns is not None and mtime_ns < self.min_mtime_ns)
+                or (self.max_mtime_ns is not None and mtime_ns >= self.max_mtime_ns))  # "before": the bound itself is out
+
+
+class PathEntry:
+    """The DirEntry attributes the checks read, for a bare path (live updates)."""
+    __slots__ = ("name", "path")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+
+    def stat(self, follow_symlinks=True):
+        return os.stat(self.path, follow_symlinks=follow_symlinks)
+
+
+def _hidden(entry) -> bool:
+    if entry.name.startswith("."):
+        return True
+    if os.name == "nt":
+        # free on Windows: the attributes come with the directory listing
+        try:
+            return bool(entry.stat(follow_symlinks=False).st_file_attributes & stat.FILE_ATTRIBUTE_HIDDEN)
+        except OSError:
+            return False
+    return False
@@ -0,0 +1,243 @@
+"""Linux inotify watcher (ctypes, no extra packages) feeding live previews.
+
+A Watcher follows one folder (and its subfolders when recursive) on a daemon
+thread and folds raw events into a bounded, coalesced change set keyed by
+path: a file created and deleted between two drains nets out to "remove", a
+burst of writes to one file is one "add". Consumers call drain() on their own
+schedule and get
+
+    {path: "add" | "remove" | "adddir" | "rmdir"}, overflowed
+
+where overflowed means events were lost (kernel queue overflow, more than
+MAX_PENDING distinct paths, a watched root going away) and only a rescan can
+be trusted. Moves are a "remove" of the old path plus an "add" of the new one.
+
+available() is False off Linux (or without libc's inotify); Watcher() then
+raises OSError.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+from typing import Dict, Tuple
+
+MAX_PENDING = 100_000   # distinct changed paths held between drains before giving up (-> rescan)
+READ_BYTES = 256 * 1024
+POLL_S = 0.25           # how often the thread checks for stop()
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_EXCL_UNLINK)
+
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; then len bytes of NUL-padded name
+
+_libc = None
+
+
+def _load():
+    global _libc
+    if _libc is None:
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        _libc = libc
+    return _libc
+
+
+def available() -> bool:
+    try:
+        _load()
+    except (OSError, AttributeError):
+        return False
+    return True
+
+
+class Watcher:
+    def __init__(self, root, recursive: bool = False):
+        self.root = os.path.abspath(str(root))
+        self.recursive = recursive
+        self._libc = _load()
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            e = ctypes.get_errno()
+            raise OSError(e, os.strerror(e))
+        self._fd = fd
+        self._dirs: Dict[int, str] = {}      # watch descriptor -> folder
+        self._lock = threading.Lock()
+        self._pending: Dict[str, str] = {}
+        self._overflow = False
+        self.events = 0                      # raw events read, for the metrics line
+        self._stop = threading.Event()
+        try:
+            self._watch_tree(self.root, announce=False)
+        except OSError:
+            os.close(fd)
+            raise
+        if not self._dirs:
+            os.close(fd)
+            raise OSError(errno.ENOENT, f"cannot watch {self.root}")
+        self._thread = threading.Thread(target=self._run, name="inotify", daemon=True)
+        self._thread.start()
+
+    # ---------- watches
+    def _add_watch(self, d: str) -> bool:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(d), WATCH_MASK)
+        if wd < 0:
+            e = ctypes.get_errno()
+            if e == errno.ENOSPC:
+                # out of inotify watches (fs.inotify.max_user_watches): can't follow the whole tree
+                self._lost()
+            return False
+        self._dirs[wd] = d
+        return True
+
+    def _watch_tree(self, top: str, announce: bool):
+        """Watch `top` (and below it when recursive). With `announce`, files
+        already in a new subtree are reported too: they may have landed before
+        its watch existed."""
+        stack = [top]
+        while stack:
+            d = stack.pop()
+            if not self._add_watch(d):
+                continue
+            try:
+                with os.scandir(d) as it:
+                    for entry in it:
+                        try:
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            continue
+                        if is_dir and self.recursive:
+                            stack.append(entry.path)
+                        elif announce and not is_dir:
+                            self._note(entry.path, "add")
+            except OSError:
+                continue
+            if not self.recursive:
+                break
+
+    def _unwatch_tree(self, top: str):
+        """Drop the watches of a folder that moved away, so its events don't
+        arrive under the old path (a move back in re-adds them)."""
+        inside = top + os.sep
+        for wd, d in list(self._dirs.items()):
+            if d == top or d.startswith(inside):
+                del self._dirs[wd]
+                self._libc.inotify_rm_watch(self._fd, wd)
+
+    # ---------- change set
+    def _note(self, path: str, op: str):
+        with self._lock:
+            if self._overflow:
+                return
+            self._pending[path] = op
+            if len(self._pending) > MAX_PENDING:
+                self._overflow = True
+                self._pending.clear()
+
+    def _lost(self):
+        with self._lock:
+            self._overflow = True
+            self._pending.clear()
+
+    def drain(self) -> Tuple[Dict[str, str], bool]:
+        """(changes since the last drain, overflowed)."""
+        with self._lock:
+            changes, overflow = self._pending, self._overflow
+            self._pending = {}
+            self._overflow = False
+        return changes, overflow
+
+    # ---------- reader thread
+    def _run(self):
+        fd = self._fd
+        while not self._stop.is_set():
+            try:
+                ready, _, _ = select.select([fd], [], [], POLL_S)
+            except (OSError, ValueError):
+                break
+            if not ready:
+                continue
+            try:
+                buf = os.read(fd, READ_BYTES)
+            except BlockingIOError:
+                continue
+            except OSError:
+                break
+            self._parse(buf)
+
+    def _parse(self, buf: bytes):
+        off, end = 0, len(buf)
+        size = _EVENT.size
+        n = 0
+        while off + size <= end:
+            wd, mask, _cookie, length = _EVENT.unpack_from(buf, off)
+            name = buf[off + size:off + size + length].rstrip(b"\0")
+            off += size + length
+            n += 1
+            if mask & IN_Q_OVERFLOW:
+                self._lost()
+                continue
+            d = self._dirs.get(wd)
+            if d is None:
+                continue
+            if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                if d == self.root and mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    self._lost()  # the folder itself went away or moved
+                continue
+            if not name:
+                continue
+            path = os.path.join(d, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._note(path, "adddir")
+                    if self.recursive:
+                        self._watch_tree(path, announce=True)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._note(path, "rmdir")
+                    if mask & IN_MOVED_FROM and self.recursive:
+                        self._unwatch_tree(path)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._note(path, "remove")
+            else:
+                self._note(path, "add")
+        self.events += n
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2 * POLL_S)
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
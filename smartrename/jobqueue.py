@@ -0,0 +1,222 @@
+"""A queue of folders, each renamed with its own options, run concurrently.
+
+A Job is one folder plus its RenameOptions (usually from a saved profile, see
+smartrename.profiles): scan, plan and, when the queue applies, rename. The
+Scheduler starts jobs in queue order under two limits:
+
+    per_device   jobs at once on one filesystem (st_dev of the folder). A disk or a
+                 network share gets slower, not faster, with many scans and renames
+                 hammering it, while folders on different devices run side by side.
+    max_jobs     jobs at once overall
+
+A job waiting for its device doesn't hold up jobs behind it on another device.
+A job that fails (missing folder, bad options, conflicts without auto-resolve,
+any exception) keeps its error and the queue moves on; a file that fails to
+rename only counts against its job.
+
+Job fields (state, files, done, ok, failed, ...) are plain attributes written
+by the job's thread; a UI may read them at any time to show progress.
+"""
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from . import engine
+
+JOB_QUEUED = "queued"
+JOB_SCANNING = "scanning"
+JOB_PLANNING = "planning"
+JOB_RENAMING = "renaming"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+
+class Job:
+    """One folder of the queue. `files` is what the scan found, `to_rename`
+    the OK rows of its plan, `done` the renames reported so far."""
+    __slots__ = ("opts", "profile", "device", "state", "error", "files", "to_rename", "conflicts",
+                 "done", "ok", "failed", "batch_id", "started", "renaming_since", "finished")
+
+    def __init__(self, opts: engine.RenameOptions, profile: str = ""):
+        self.opts = opts
+        self.profile = profile
+        self.device = None
+        self.state = JOB_QUEUED
+        self.error = ""
+        self.files = 0
+        self.to_rename = 0
+        self.conflicts = 0
+        self.done = 0
+        self.ok = 0
+        self.failed = 0
+        self.batch_id = None
+        self.started = 0.0
+        self.renaming_since = 0.0
+        self.finished = 0.0
+
+    @property
+    def folder(self):
+        return self.opts.folder
+
+    @property
+    def elapsed(self) -> float:
+        if not self.started:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def rate(self) -> float:
+        """Files per second: renamed while renaming, else scanned."""
+        if self.renaming_since:
+            t = (self.finished or time.perf_counter()) - self.renaming_since
+            return self.done / t if t > 0 else 0.0
+        t = self.elapsed
+        return self.files / t if t > 0 else 0.0
+
+    def progress(self) -> float:
+        """0..1 for this job."""
+        if self.state in FINISHED:
+            return 1.0
+        if self.state == JOB_RENAMING and self.to_rename:
+            return min(1.0, self.done / self.to_rename)
+        return 0.0
+
+    def summary(self) -> str:
+        head = f"[{self.state}] {self.folder}"
+        if self.profile:
+            head += f" ({self.profile})"
+        if self.error:
+            return f"{head}: {self.error}"
+        parts = [f"{self.files} file(s)", f"{self.to_rename} to rename"]
+        if self.renaming_since:
+            parts += [f"{self.ok} renamed", f"{self.failed} failed", f"{self.rate:.0f} files/s"]
+        return f"{head}: " + ", ".join(parts)
+
+
+def _device(folder) -> object:
+    try:
+        return os.stat(folder).st_dev
+    except OSError:
+        return ("missing", str(folder))  # fails fast on its own
+
+
+class Scheduler:
+    """Runs `jobs` (see the module docstring). `apply=False` only scans and
+    plans. on_update(job) is called from job threads at every state change.
+    cancel() is polled between jobs and inside renames; jobs not started yet
+    end as JOB_CANCELLED. With `journal_dir` every job's renames are a
+    journaled batch (smartrename.journal)."""
+
+    def __init__(self, jobs: List[Job], apply: bool = False, per_device: int = 1, max_jobs: int = 4,
+                 journal_dir=None, on_update: Optional[Callable[[Job], None]] = None,
+                 on_result: Optional[Callable] = None, cancel: Optional[Callable[[], bool]] = None):
+        if per_device < 1 or max_jobs < 1:
+            raise ValueError("Jobs per device and jobs at once must be at least 1.")
+        self.jobs = jobs
+        self.apply = apply
+        self.per_device = per_device
+        self.max_jobs = max_jobs
+        self.journal_dir = journal_dir
+        self.on_update = on_update
+        self.on_result = on_result   # on_result(job, src, dst, err) per rename
+        self.cancel = cancel
+
+    def _cancelled(self) -> bool:
+        return bool(self.cancel and self.cancel())
+
+    def _set(self, job: Job, state: str):
+        job.state = state
+        if self.on_update:
+            self.on_update(job)
+
+    def run(self) -> List[Job]:
+        """Run every job to completion (blocking). Returns the jobs."""
+        for job in self.jobs:
+            job.device = _device(job.folder)
+        pending = [j for j in self.jobs if j.state == JOB_QUEUED]
+        running = {}   # device -> jobs running on it
+        active = 0
+        finished: "queue.SimpleQueue" = queue.SimpleQueue()
+        with ThreadPoolExecutor(max_workers=self.max_jobs, thread_name_prefix="job") as pool:
+            while pending or active:
+                if self._cancelled():
+                    for job in pending:
+                        self._set(job, JOB_CANCELLED)
+                    pending = []
+                waiting = []
+                for job in pending:
+                    if active < self.max_jobs and running.get(job.device, 0) < self.per_device:
+                        running[job.device] = running.get(job.device, 0) + 1
+                        active += 1
+                        pool.submit(self._run, job, finished)
+                    else:
+                        waiting.append(job)
+                pending = waiting
+                if active:
+                    job = finished.get()
+                    running[job.device] -= 1
+                    active -= 1
+        return self.jobs
+
+    def _run(self, job: Job, finished: "queue.SimpleQueue"):
+        job.started = time.perf_counter()
+        try:
+            self.run_job(job)
+        except Exception as e:  # one job's failure never stops the queue
+            job.error = " ".join(str(e).split()) or type(e).__name__
+            job.finished = time.perf_counter()
+            self._set(job, JOB_FAILED)
+        finally:
+            finished.put(job)
+
+    def run_job(self, job: Job):
+        opts = job.opts
+        self._set(job, JOB_SCANNING)
+        opts.validate()
+        scanned = engine.scan(opts)
+        job.files = len(scanned)
+        if self._cancelled():
+            job.finished = time.perf_counter()
+            self._set(job, JOB_CANCELLED)
+            return
+
+        self._set(job, JOB_PLANNING)
+        to_apply = []
+        for row in engine.iter_plan(opts, scanned):
+            if row.status == engine.STATUS_OK:
+                to_apply.append(row)
+            elif row.status == engine.STATUS_CONFLICT:
+                job.conflicts += 1
+        del scanned
+        job.to_rename = len(to_apply)
+        if not self.apply:
+            job.finished = time.perf_counter()
+            self._set(job, JOB_DONE)
+            return
+        if job.conflicts and not opts.auto_resolve:
+            raise ValueError(f"{job.conflicts} name conflict(s); nothing was renamed")
+
+        def on_result(src, dst, err):
+            job.done += 1
+            if err is None:
+                job.ok += 1
+            else:
+                job.failed += 1
+            if self.on_result:
+                self.on_result(job, src, dst, err)
+
+        job.renaming_since = time.perf_counter()
+        self._set(job, JOB_RENAMING)
+        if self.journal_dir is not None:
+            from .journal import apply_journaled
+            job.batch_id = apply_journaled(to_apply, opts.folder, on_result, self.cancel, workers=opts.workers,
+                                           directory=self.journal_dir, auto_resolve=opts.auto_resolve)[3]
+        else:
+            engine.apply_renames(to_apply, on_result, self.cancel, workers=opts.workers,
+                                 auto_resolve=opts.auto_resolve)
+        job.finished = time.perf_counter()
+        self._set(job, JOB_CANCELLED if self._cancelled() else JOB_DONE)
@@ -0,0 +1,485 @@
+"""Append-only on-disk rename journal (one JSONL file per batch).
+
+Layout of a batch file, in write order:
+
+    {"op": "begin", "batch": ID, "root": ROOT, "count": N, "time": T}
+    {"op": "plan", "i": 0, "src": "a.jpg", "dst": "x_1.jpg", "ino": 1234, "size": 5678}
+                                                                  (N lines, paths relative to ROOT,
+                                                                   ROOT absolute; "ino"/"size" identify
+                                                                   the file at src; "tmp": 1 marks half
+                                                                   of a swap, "xchg": 1 an atomic swap
+                                                                   of src and dst)
+    {"op": "intent", "from": 0, "to": 512}                        before a chunk runs
+    {"op": "done", "i": 0}  /  {"op": "fail", "i": 1, "err": "..."}
+                                                                  ("dst" on a done record: the target
+                                                                   was taken, the file got this name)
+    ...
+    {"op": "end", "ok": .., "fail": .., "cancelled": false}
+    {"op": "undone", "i": 0} ... {"op": "undo_end"}               after an undo/rollback
+
+A batch applied from a plan file (smartrename.planfile) has no "count" and
+adds its plan lines folder by folder, each part before its first intent.
+
+fsync is batched: the completions of chunk k and the intent of chunk k+1 are
+made durable with a single fsync *before* chunk k+1 touches the filesystem.
+After a crash, only rows of the last intended chunk can lack a completion
+record, and those are settled by looking at the filesystem. Undo only moves a
+file back while the name it got still holds the same inode and size, so a
+name that a later batch (or anything else) reused is left alone.
+"""
+import json
+import os
+import stat
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .chains import Step, cycle_safe_chunks, is_temp, order_renames, temp_path
+from .renameat import open_renamer
+
+JOURNAL_BATCH = 512  # renames per fsync group
+
+# recovered row states
+ROW_PENDING = "pending"   # never ran (or failed): can be resumed
+ROW_DONE = "done"         # renamed: can be undone
+ROW_UNDONE = "undone"     # renamed and reverted
+ROW_UNKNOWN = "unknown"   # both or neither name exist: left alone
+
+
+def default_dir() -> Path:
+    env = os.environ.get("SMARTRENAME_JOURNAL")
+    if env:
+        return Path(env)
+    return Path.home() / ".smartrename" / "journal"
+
+
+def _identity(path) -> Optional[Tuple[int, int]]:
+    """(inode, size) of `path`, or None if it can't be read."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size
+
+
+def _holds(path, ident: Tuple[int, Optional[int]]) -> bool:
+    """Whether `path` is still the file `ident` was taken from (size None: not recorded)."""
+    for look in (os.lstat, os.stat):  # a scan stats through a symlink: it may hold the target's
+        try:
+            st = look(path)
+        except OSError:
+            return False
+        if st.st_ino == ident[0] and ident[1] in (None, st.st_size):
+            return True
+        if not stat.S_ISLNK(st.st_mode):
+            return False
+    return False
+
+
+def _fsync_dir(path: Path):
+    try:
+        fd = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return  # not supported (e.g. Windows)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class Journal:
+    """Writer for one batch file."""
+
+    def __init__(self, path: Path, root: str):
+        self.path = Path(path)
+        self.root = root
+        self._prefix = root.rstrip(os.sep) + os.sep
+        self._f = open(self.path, "a", encoding="utf-8")
+        self._pending: List[str] = []
+        self._rows = 0            # plan rows written by this writer
+        self.undo_map: List[Tuple[Path, Path]] = []
+
+    @classmethod
+    def create(cls, directory: Path, root, steps: Sequence[Step]) -> "Journal":
+        """Start a batch: write the header and the whole (ordered) plan, durably."""
+        j = cls.begin(directory, root, len(steps))
+        j.add_plan(steps)
+        j.sync()
+        return j
+
+    @classmethod
+    def begin(cls, directory: Path, root, count: Optional[int] = None) -> "Journal":
+        """Start a batch whose plan is added in parts (add_plan), e.g. while
+        streaming a plan file; `count` is unknown then."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        batch = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:8]
+        j = cls(directory / f"{batch}.jsonl", os.path.abspath(str(root)))
+        rec = {"op": "begin", "batch": batch, "root": j.root, "time": time.time()}
+        if count is not None:
+            rec["count"] = count
+        j._write(rec)
+        j.sync()
+        _fsync_dir(directory)
+        return j
+
+    def add_plan(self, steps: Sequence[Step]) -> range:
+        """Append plan rows for `steps`; returns their row numbers. They become
+        durable with the next intent(), before any of them runs."""
+        start = self._rows
+        parked = {}  # temporary name -> identity of the file that will be parked there
+        for i, st in enumerate(steps, start):
+            rec = {"op": "plan", "i": i, "src": self._rel(st.old_path), "dst": self._rel(st.target_path)}
+            if st.temp:
+                rec["tmp"] = 1
+            if st.exchange:
+                rec["xchg"] = 1
+            # the scan's inode/size when the row carries it: no extra stat per file
+            ident = parked.pop(str(st.old_path), None) or getattr(st.row, "ident", None) or _identity(st.old_path)
+            if ident is not None:
+                rec["ino"], rec["size"] = ident
+                if st.temp:
+                    parked[str(st.target_path)] = ident
+            self._write(rec)
+        self._rows = start + len(steps)
+        return range(start, self._rows)
+
+    @property
+    def batch_id(self) -> str:
+        return self.path.stem
+
+    def _rel(self, p) -> str:
+        s = os.path.abspath(str(p))
+        return s[len(self._prefix):] if s.startswith(self._prefix) else s
+
+    def _write(self, rec: dict):
+        self._f.write(json.dumps(rec, separators=(",", ":")) + "\n")
+
+    def intent(self, start: int, stop: int):
+        """Durably record that rows [start, stop) are about to run."""
+        self._flush_pending()
+        self._write({"op": "intent", "from": start, "to": stop})
+        self.sync()
+
+    def result(self, i: int, err: Optional[BaseException] = None, op: str = "done", dst=None):
+        """Buffer a completion record; it becomes durable with the next intent/sync.
+        `dst` is the name the file really got, when it differs from the plan."""
+        if err is None:
+            rec = {"op": op, "i": i}
+            if dst is not None:
+                rec["dst"] = self._rel(dst)
+            self._pending.append(json.dumps(rec, separators=(",", ":")))
+        else:
+            self._pending.append(json.dumps({"op": "fail", "i": i, "err": str(err)}, separators=(",", ":")))
+
+    def mark(self, rec: dict):
+        self._flush_pending()
+        self._write(rec)
+        self.sync()
+
+    def _flush_pending(self):
+        if self._pending:
+            self._f.write("\n".join(self._pending) + "\n")
+            self._pending.clear()
+
+    def sync(self):
+        self._flush_pending()
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self):
+        if not self._f.closed:
+            self.sync()
+            self._f.close()
+
+
+class BatchState:
+    """A batch file read back: the plan plus what is known to have happened."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.batch_id = self.path.stem
+        self.root = ""
+        self.time = 0.0
+        self.plan: List[Tuple[str, str]] = []
+        self.temp = set()         # rows that are the first half of a swap
+        self.exchange = set()     # rows that swap src and dst atomically
+        self.ident: Dict[int, Tuple[int, Optional[int]]] = {}  # row -> (inode, size) of the file at src
+        self.done = set()
+        self.failed: Dict[int, str] = {}
+        self.undone = set()
+        self.intended = 0         # rows [0, intended) were allowed to run
+        self.ended = False
+        self.undo_ended = False
+        self.cancelled = False
+        self.last_op = ""
+
+    @property
+    def torn(self) -> bool:
+        """Interrupted (crash / kill) before the batch or its undo finished."""
+        return self.last_op not in ("end", "undo_end")
+
+    def paths(self, i: int) -> Tuple[Path, Path]:
+        src, dst = self.plan[i]
+        return Path(self.root, src), Path(self.root, dst)
+
+    def step(self, i: int) -> Step:
+        src, dst = self.paths(i)
+        return Step(src, dst, None, temp=i in self.temp, exchange=i in self.exchange)
+
+    def row_state(self, i: int) -> str:
+        if i in self.undone:
+            return ROW_UNDONE
+        if i in self.done:
+            return ROW_DONE
+        if i in self.failed or i >= self.intended:
+            return ROW_PENDING
+        # intended but no completion record: ask the filesystem
+        src, dst = self.paths(i)
+        ident = self.ident.get(i)
+        if ident is not None:
+            # follow the file that was at src (for a swap both names exist either way)
+            if _holds(dst, ident):
+                return ROW_DONE
+            if _holds(src, ident):
+                return ROW_PENDING
+            return ROW_UNKNOWN
+        if i in self.exchange:
+            return ROW_UNKNOWN
+        src_there, dst_there = os.path.lexists(src), os.path.lexists(dst)
+        if dst_there and not src_there:
+            return ROW_DONE
+        if src_there and not dst_there:
+            return ROW_PENDING
+        return ROW_UNKNOWN
+
+    def summary(self) -> str:
+        state = "torn" if self.torn else "undone" if self.undo_ended else \
+            "partly undone" if self.undone - self.temp else "cancelled" if self.cancelled else "complete"
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.time))
+        files = len(self.plan) - len(self.temp) + len(self.exchange)
+        renamed = len(self.done - self.temp) + len(self.done & self.exchange)
+        return f"{when}  {self.batch_id}  {renamed}/{files} renamed  [{state}]  {self.root}"
+
+
+def load(path) -> BatchState:
+    st = BatchState(path)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                break  # torn tail from a crash mid-write
+            op = rec.get("op")
+            st.last_op = op
+            if op == "plan":
+                if rec.get("tmp"):
+                    st.temp.add(len(st.plan))
+                if rec.get("xchg"):
+                    st.exchange.add(len(st.plan))
+                if rec.get("ino"):
+                    st.ident[len(st.plan)] = (rec["ino"], rec.get("size"))
+                st.plan.append((rec["src"], rec["dst"]))
+            elif op == "done":
+                st.done.add(rec["i"])
+                if "dst" in rec:
+                    st.plan[rec["i"]] = (st.plan[rec["i"]][0], rec["dst"])
+                st.failed.pop(rec["i"], None)
+            elif op == "fail":
+                st.failed[rec["i"]] = rec.get("err", "")
+            elif op == "intent":
+                st.intended = max(st.intended, rec["to"])
+            elif op == "undone":
+                st.undone.add(rec["i"])
+            elif op == "begin":
+                st.root = rec["root"]
+                st.time = rec.get("time", 0.0)
+            elif op == "end":
+                st.ended = True
+                st.cancelled = bool(rec.get("cancelled"))
+            elif op == "undo_end":
+                st.undo_ended = not rec.get("cancelled")
+    return st
+
+
+def _tail_op(path: Path) -> str:
+    """The op of the last complete record, read from the end of the file only."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 4096))
+        lines = f.read().splitlines()
+    for line in reversed(lines):
+        try:
+            return json.loads(line).get("op", "")
+        except ValueError:
+            continue
+    return ""
+
+
+def list_batches(directory: Optional[Path] = None) -> List[BatchState]:
+    """All batches in the journal directory, newest first."""
+    directory = Path(directory or default_dir())
+    if not directory.is_dir():
+        return []
+    paths = sorted(directory.glob("*.jsonl"), reverse=True)
+    return [load(p) for p in paths]
+
+
+def find_batch(batch_id: str, directory: Optional[Path] = None) -> Optional[BatchState]:
+    p = Path(directory or default_dir()) / f"{batch_id}.jsonl"
+    return load(p) if p.exists() else None
+
+
+# ---------- journaled operations
+ResultCallback = Callable[[Path, Path, Optional[BaseException]], None]
+
+def _run_chunks(journal: Journal, indices: Sequence[int], steps: Sequence[Step],
+                on_result: Optional[ResultCallback], cancel, workers: int,
+                renamer, resolve: bool = False) -> Tuple[int, int, bool]:
+    """Run ordered `steps` (row numbers `indices` in the journal) chunk by chunk."""
+    from . import engine
+
+    ok = fail = 0
+    cancelled = False
+    for start, stop in cycle_safe_chunks(steps, JOURNAL_BATCH):
+        if cancel and cancel():
+            cancelled = True
+            break
+        chunk_idx = indices[start:stop]
+        chunk = steps[start:stop]
+        journal.intent(chunk_idx[0], chunk_idx[-1] + 1)
+        index_of = {st: (i, str(st.target_path)) for i, st in zip(chunk_idx, chunk)}
+
+        def record(st, err, undone):
+            i, planned = index_of[st]
+            if undone:
+                journal.result(i, op="undone")  # a parked file put back on its own name
+            else:
+                journal.result(i, err, dst=st.target_path if err is None and str(st.target_path) != planned else None)
+
+        o, f_, _ = engine.apply_steps(chunk, on_result, cancel, journal.undo_map, workers, renamer, resolve, record)
+        ok += o
+        fail += f_
+    else:
+        cancelled = bool(cancel and cancel())
+    return ok, fail, cancelled
+
+
+def apply_journaled(rows, root, on_result: Optional[ResultCallback] = None,
+                    cancel=None, undo_map: Optional[list] = None, workers: int = 1,
+                    directory: Optional[Path] = None, auto_resolve: bool = False):
+    """engine.apply_renames with a durable journal. Returns (ok, fail, undo_map, batch_id)."""
+    from . import engine
+
+    with open_renamer() as renamer:
+        steps = order_renames([r for r in rows if r.status == engine.STATUS_OK], exchange=renamer.can_exchange)
+        journal = Journal.create(directory or default_dir(), root, steps)
+        journal.undo_map = undo_map if undo_map is not None else []
+        try:
+            ok, fail, cancelled = _run_chunks(journal, range(len(steps)), steps, on_result, cancel, workers,
+                                              renamer, auto_resolve)
+            journal.mark({"op": "end", "ok": ok, "fail": fail, "cancelled": cancelled})
+        finally:
+            journal.close()
+    return ok, fail, journal.undo_map, journal.batch_id
+
+
+def resume_batch(state: BatchState, on_result: Optional[ResultCallback] = None,
+                 cancel=None, workers: int = 1):
+    """Run the rows of an interrupted/cancelled batch that never happened, in
+    their journaled order. Returns (ok, fail, skipped_unknown)."""
+    todo = []
+    unknown = 0
+    for i in range(len(state.plan)):
+        s = state.row_state(i)
+        if s == ROW_PENDING:
+            todo.append(i)
+        elif s == ROW_UNKNOWN:
+            unknown += 1
+    steps = [state.step(i) for i in todo]
+    journal = Journal(state.path, state.root)
+    try:
+        with open_renamer() as renamer:
+            ok, fail, cancelled = _run_chunks(journal, todo, steps, on_result, cancel, workers, renamer)
+        journal.mark({"op": "end", "ok": len(state.done) + ok, "fail": fail,
+                      "cancelled": cancelled, "resumed": True})
+    finally:
+        journal.close()
+    return ok, fail, unknown
+
+
+def undo_batch(state: BatchState, on_result: Optional[ResultCallback] = None, cancel=None):
+    """Revert every renamed row of a batch (last first); also rolls back torn batches.
+    Counts and on_result are per file, as for engine.undo_renames. Returns (ok, fail)."""
+    done = [i for i in range(len(state.plan)) if state.row_state(i) == ROW_DONE]
+    journal = Journal(state.path, state.root)
+    ok = fail = 0
+    cancelled = False
+    parked = {}  # temporary name -> (where the file was, error if it couldn't get there)
+    try:
+        with open_renamer() as renamer:
+            for n, i in enumerate(reversed(done)):
+                if cancel and not parked and cancel():
+                    cancelled = True
+                    break
+                if n % JOURNAL_BATCH == 0:
+                    journal.sync()
+                src, dst = state.paths(i)
+                files = 2 if i in state.exchange else 0 if is_temp(src) else 1
+                origin, err = parked.pop(dst, (dst, None))
+                ident = state.ident.get(i)
+                try:
+                    if err is not None:
+                        raise err
+                    if ident is not None and not _holds(dst, ident):
+                        raise OSError(f"{dst} changed since the batch (not reverted)")
+                    if i in state.exchange:
+                        renamer.swap(dst, src, temp_path(dst))
+                    else:
+                        try:
+                            renamer.rename(dst, src)
+                        except FileNotFoundError:
+                            raise FileNotFoundError(f"{dst} (cannot revert)") from None
+                        except FileExistsError:
+                            raise FileExistsError(f"{src} exists again (cannot revert)") from None
+                except OSError as e:
+                    if is_temp(src):
+                        parked[src] = (dst, e)  # reported with the hop off the temporary name
+                        continue
+                    if origin != dst and e is not err:
+                        e = OSError(f"{e}; the file was left at {dst}")
+                    fail += files
+                    if on_result:
+                        on_result(origin, src, e)
+                        if i in state.exchange:
+                            on_result(src, dst, e)
+                    continue
+                journal.result(i, op="undone")
+                if is_temp(src):
+                    parked[src] = (dst, None)
+                    continue
+                ok += files
+                if on_result:
+                    on_result(origin, src, None)
+                    if i in state.exchange:
+                        on_result(src, dst, None)
+        journal.mark({"op": "undo_end", "ok": ok, "fail": fail, "cancelled": cancelled})
+    finally:
+        journal.close()
+    return ok, fail
+
+
+def find_torn(directory: Optional[Path] = None) -> List[BatchState]:
+    """Batches interrupted mid-run or mid-undo. Only torn files are parsed in full."""
+    directory = Path(directory or default_dir())
+    if not directory.is_dir():
+        return []
+    out = []
+    for p in sorted(directory.glob("*.jsonl"), reverse=True):
+        if _tail_op(p) not in ("end", "undo_end"):
+            out.append(load(p))
+    return out
@@ -0,0 +1,155 @@
+"""Bounded, batched log model behind the Log panel.
+
+Any thread can write(); text is split into lines once and kept in a ring
+buffer of the last `max_lines` lines (plus a separate ring of error lines), so
+memory stays flat however many files a batch touches. The UI drains the
+pending lines on a timer and appends them to the Text widget in one insert.
+Every line is also streamed to a size-rotated log file on disk, so nothing is
+lost when old lines fall off the buffer.
+
+Nothing here touches tkinter.
+"""
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+MAX_LINES = 5000             # lines kept for the Log panel
+MAX_ERROR_LINES = 5000       # error lines kept for the errors-only view
+LOG_MAX_BYTES = 5 * 2**20    # rotate the log file at this size
+LOG_BACKUPS = 3              # smartrename.log.1 .. .3
+
+# lines written by the rename / undo jobs for failures
+ERROR_PREFIXES = ("[OS error]", "[Permission denied]", "[Error]", "[Missing]", "[Undo error]")
+
+
+def default_path() -> Path:
+    """Log file: $SMARTRENAME_LOG, else ~/.smartrename/logs/smartrename.log."""
+    env = os.environ.get("SMARTRENAME_LOG")
+    if env:
+        return Path(env)
+    return Path.home() / ".smartrename" / "logs" / "smartrename.log"
+
+
+def is_error(line: str) -> bool:
+    return line.startswith(ERROR_PREFIXES)
+
+
+class RotatingFile:
+    """Append-only text file that rolls over to .1, .2, ... past max_bytes."""
+
+    def __init__(self, path, max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "a", encoding="utf-8")
+        self._size = self._f.tell()
+
+    def write(self, text: str):
+        if self._size >= self.max_bytes:
+            self._rotate()
+        self._f.write(text)
+        self._size += len(text)  # characters, close enough to bytes for a rotation threshold
+
+    def _rotate(self):
+        self._f.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self._f = open(self.path, "a", encoding="utf-8")
+        self._size = 0
+
+    def flush(self):
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+class LogSink:
+    def __init__(self, max_lines: int = MAX_LINES, path=None,
+                 max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS):
+        self.lines: deque = deque(maxlen=max_lines)
+        self.errors: deque = deque(maxlen=MAX_ERROR_LINES)
+        self.error_count = 0       # all errors so far, including ones the ring dropped
+        # lines not yet shown; the panel can only ever show the last max_lines of them
+        self._pending: deque = deque(maxlen=max_lines)
+        self._pending_total = 0
+        self._partial = ""         # text after the last newline, waiting for the rest
+        self._lock = threading.Lock()
+        self._stamp = (0, "")      # (second, formatted) so strftime runs once per second
+        self.file: Optional[RotatingFile] = None
+        if path is not None:
+            try:
+                self.file = RotatingFile(path, max_bytes, backups)
+            except OSError:
+                self.file = None  # read-only home etc.: keep logging to the panel only
+
+    def write(self, text: str):
+        """Add text (one or more lines; a missing trailing newline is held back)."""
+        if not text:
+            return
+        with self._lock:
+            text = self._partial + text
+            parts = text.split("\n")
+            self._partial = parts.pop()
+            if not parts:
+                return
+            self.lines.extend(parts)
+            self._pending.extend(parts)
+            self._pending_total += len(parts)
+            errs = [p for p in parts if p.startswith(ERROR_PREFIXES)]
+            if errs:
+                self.errors.extend(errs)
+                self.error_count += len(errs)
+            if self.file is not None:
+                sec = int(time.time())
+                if sec != self._stamp[0]:
+                    self._stamp = (sec, time.strftime("%Y-%m-%d %H:%M:%S ", time.localtime(sec)))
+                stamp = self._stamp[1]
+                try:
+                    self.file.write("".join(stamp + p + "\n" for p in parts))
+                except OSError:
+                    self.file = None
+
+    def drain(self) -> Tuple[List[str], int]:
+        """(lines written since the last drain, how many earlier ones were skipped
+        because the ring overflowed in between). Also flushes the log file."""
+        with self._lock:
+            pending = list(self._pending)
+            dropped = self._pending_total - len(pending)
+            self._pending.clear()
+            self._pending_total = 0
+            if self.file is not None:
+                try:
+                    self.file.flush()
+                except OSError:
+                    self.file = None
+        return pending, dropped
+
+    def snapshot(self, errors_only: bool = False) -> List[str]:
+        with self._lock:
+            return list(self.errors if errors_only else self.lines)
+
+    def clear(self):
+        """Forget the buffered lines (the log file keeps them)."""
+        with self._lock:
+            self.lines.clear()
+            self.errors.clear()
+            self.error_count = 0
+            self._pending.clear()
+            self._pending_total = 0
+
+    def close(self):
+        with self._lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
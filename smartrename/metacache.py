@@ -0,0 +1,175 @@
+"""Persistent per-file metadata cache (SQLite) for things that cost a file read.
+
+Rows are keyed by (device, inode) and only trusted while the file's size and
+mtime_ns still match, so any edit, truncation or replacement invalidates the
+entry automatically; a stale row is simply overwritten. Lookups go one
+directory at a time (one indexed SELECT per folder, matched in Python), and
+writes are batched into one transaction per call.
+
+Eviction: rows unused for `max_age_days` are dropped, and past `max_rows` the
+least recently used go first. Both run on close(), so a preview never waits on
+them.
+
+Stored per file: `taken` (EXIF capture date; NO_DATE = read, has none) and `hash`
+(content hash, filled by the duplicate finder). NULL means "not known yet".
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+MAX_ROWS = 2_000_000       # ~150 MB of cache at the cap
+MAX_AGE_DAYS = 90
+SCHEMA_VERSION = 2         # 2: NO_DATE instead of -1, which is a valid (1969) date
+NO_DATE = -(1 << 63)       # `taken` of a file that has no capture date; below any real one
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    dev      INTEGER NOT NULL,
+    inode    INTEGER NOT NULL,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    dir      TEXT    NOT NULL,
+    taken    INTEGER,
+    hash     TEXT,
+    used     INTEGER NOT NULL,
+    PRIMARY KEY (dev, inode)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS meta_dir ON meta (dir);
+CREATE INDEX IF NOT EXISTS meta_used ON meta (used);
+"""
+
+COLUMNS = ("taken", "hash")
+
+
+def default_path() -> Path:
+    """Cache file: $SMARTRENAME_CACHE, else ~/.smartrename/meta.sqlite."""
+    env = os.environ.get("SMARTRENAME_CACHE")
+    if env:
+        return Path(env)
+    return Path.home() / ".smartrename" / "meta.sqlite"
+
+
+def cacheable(r) -> bool:
+    # Windows DirEntry.stat() reports inode 0: such records can't be keyed
+    return r.inode > 0 and r.size >= 0 and r.mtime_ns >= 0
+
+
+class MetaCache:
+    def __init__(self, path=None, max_rows: int = MAX_ROWS, max_age_days: float = MAX_AGE_DAYS):
+        self.path = Path(path) if path is not None else default_path()
+        self.max_rows = max_rows
+        self.max_age_days = max_age_days
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # the GUI opens it on the Tk thread and uses it from the worker thread
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._db.execute("DROP TABLE IF EXISTS meta")
+                self._db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self._db.executescript(_SCHEMA)
+
+    # ---------- reads
+    def get(self, records: Sequence, column: str) -> List[Optional[object]]:
+        """Cached `column` for each record (None = unknown), one query per folder.
+        Hit rows get their LRU stamp refreshed."""
+        if column not in COLUMNS:
+            raise ValueError(f"unknown cache column: {column}")
+        out: List[Optional[object]] = [None] * len(records)
+        by_dir: Dict[str, List[int]] = defaultdict(list)
+        for i, r in enumerate(records):
+            if cacheable(r):
+                by_dir[r.parent].append(i)
+        now = int(time.time())
+        with self._lock:
+            cur = self._db.cursor()
+            cur.execute("BEGIN")
+            try:
+                for d, idx in by_dir.items():
+                    rows = {(dev, ino): (size, mt, val) for dev, ino, size, mt, val in cur.execute(
+                        f"SELECT dev, inode, size, mtime_ns, {column} FROM meta WHERE dir = ?", (d,))}
+                    if not rows:
+                        continue
+                    hit = False
+                    for i in idx:
+                        r = records[i]
+                        got = rows.get((r.dev, r.inode))
+                        if got is not None and got[0] == r.size and got[1] == r.mtime_ns:
+                            out[i] = got[2]
+                            hit = hit or got[2] is not None
+                    if hit:
+                        cur.execute("UPDATE meta SET used = ? WHERE dir = ?", (now, d))
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+        found = sum(1 for v in out if v is not None)
+        self.hits += found
+        self.misses += len(records) - found
+        return out
+
+    # ---------- writes
+    def put(self, records: Sequence, column: str, values: Sequence):
+        """Store `column` for each record (None values are skipped), one transaction.
+        A row whose size/mtime changed is reset, dropping its other columns."""
+        if column not in COLUMNS:
+            raise ValueError(f"unknown cache column: {column}")
+        now = int(time.time())
+        rows = [(r.dev, r.inode, r.size, r.mtime_ns, r.parent, v, now)
+                for r, v in zip(records, values) if v is not None and cacheable(r)]
+        if not rows:
+            return
+        others = ", ".join(f"{c} = CASE WHEN meta.size = excluded.size AND meta.mtime_ns = excluded.mtime_ns "
+                           f"THEN meta.{c} ELSE NULL END" for c in COLUMNS if c != column)
+        sql = (f"INSERT INTO meta (dev, inode, size, mtime_ns, dir, {column}, used) VALUES (?, ?, ?, ?, ?, ?, ?) "
+               f"ON CONFLICT (dev, inode) DO UPDATE SET {others}, size = excluded.size, "
+               f"mtime_ns = excluded.mtime_ns, dir = excluded.dir, {column} = excluded.{column}, used = excluded.used")
+        with self._lock:
+            cur = self._db.cursor()
+            cur.execute("BEGIN")
+            try:
+                cur.executemany(sql, rows)
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+
+    # ---------- housekeeping
+    def evict(self) -> int:
+        """Drop rows older than max_age_days, then the least recently used beyond
+        max_rows. Returns how many rows went."""
+        cutoff = int(time.time() - self.max_age_days * 86400)
+        with self._lock:
+            cur = self._db.cursor()
+            cur.execute("DELETE FROM meta WHERE used < ?", (cutoff,))
+            gone = cur.rowcount
+            total = cur.execute("SELECT COUNT(*) FROM meta").fetchone()[0]
+            if total > self.max_rows:
+                cur.execute("DELETE FROM meta WHERE (dev, inode) IN "
+                            "(SELECT dev, inode FROM meta ORDER BY used LIMIT ?)", (total - self.max_rows,))
+                gone += cur.rowcount
+        return gone
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM meta").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM meta")
+
+    def close(self):
+        try:
+            self.evict()
+        finally:
+            with self._lock:
+                self._db.close()
@@ -0,0 +1,147 @@
+"""Per-run instrumentation: phase wall times, syscall / UI counters, profiling.
+
+A Metrics object is threaded through one preview or rename run. Phases are
+timed with `with m.phase("scan"):` and counters are added in bulk at phase
+boundaries (`m.add("stat", n)`), never per file, so an enabled run costs a few
+perf_counter() calls. Code that takes an optional metrics argument defaults to
+NO_METRICS, whose methods do nothing.
+
+`capture(path_prefix)` wraps one run in cProfile + tracemalloc and writes
+`<prefix>.prof` (open with pstats / snakeviz) and `<prefix>.mem.txt`.
+"""
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+def default_path() -> str:
+    """Metrics file: $SMARTRENAME_METRICS, else ~/.smartrename/metrics.jsonl."""
+    env = os.environ.get("SMARTRENAME_METRICS")
+    if env:
+        return env
+    return os.path.join(os.path.expanduser("~"), ".smartrename", "metrics.jsonl")
+
+
+# counters shown in the summary line, in this order (others are still recorded)
+SUMMARY_COUNTERS = ("files", "stat", "scandir", "listdir", "filtered", "pruned", "exif_dates", "exif_reads", "dupes",
+                    "exists", "rename", "ui_items", "log_lines")
+
+
+class Metrics:
+    def __init__(self, kind: str):
+        self.kind = kind  # "preview" | "rename" | "undo" | ...
+        self.started = time.time()
+        self.phases: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self._t0 = time.perf_counter()
+        self.wall = 0.0
+        self.extra: Dict[str, object] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - t0
+
+    def add(self, name: str, n: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def finish(self) -> "Metrics":
+        self.wall = time.perf_counter() - self._t0
+        return self
+
+    def throughput(self) -> Dict[str, float]:
+        """MB/s for every phase that counted `<phase>_bytes` read."""
+        out = {}
+        for name, secs in self.phases.items():
+            n = self.counts.get(name + "_bytes")
+            if n and secs > 0:
+                out[name] = n / secs / 1e6
+        return out
+
+    def summary(self) -> str:
+        """One line for the Log panel / stderr."""
+        wall = self.wall or time.perf_counter() - self._t0
+        phases = " ".join(f"{k} {v:.3f}s" for k, v in self.phases.items())
+        counts = " ".join(f"{k}={self.counts[k]:,}" for k in SUMMARY_COUNTERS if self.counts.get(k))
+        rates = " ".join(f"{k} {v:,.1f} MB/s" for k, v in self.throughput().items())
+        line = f"[metrics] {self.kind} {wall:.3f}s | {phases or '-'} | {counts or '-'}"
+        return f"{line} | {rates}" if rates else line
+
+    def as_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "started": self.started,
+            "wall_s": round(self.wall, 6),
+            "phases_s": {k: round(v, 6) for k, v in self.phases.items()},
+            "counts": dict(self.counts),
+            "throughput_mb_s": {k: round(v, 3) for k, v in self.throughput().items()},
+            **self.extra,
+        }
+
+    def write(self, path: str):
+        """Append this run as one JSON line to `path`."""
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.as_dict()) + "\n")
+
+
+class _NoMetrics:
+    """Stand-in used when instrumentation is off: every method is a no-op."""
+    __slots__ = ()
+    _null = nullcontext()
+
+    def __bool__(self):
+        return False
+
+    def phase(self, name: str):
+        return self._null
+
+    def add(self, name: str, n: int = 1):
+        pass
+
+
+NO_METRICS = _NoMetrics()
+
+
+# ---------- profiling
+@contextmanager
+def capture(prefix: str, top: int = 25):
+    """cProfile + tracemalloc around one run on the *current* thread.
+    Yields a list that receives the written file paths on exit."""
+    written: List[str] = []
+    d = os.path.dirname(os.path.abspath(prefix))
+    os.makedirs(d, exist_ok=True)
+    prof = cProfile.Profile()
+    started_tm = not tracemalloc.is_tracing()
+    if started_tm:
+        tracemalloc.start(10)
+    prof.enable()
+    try:
+        yield written
+    finally:
+        prof.disable()
+        snap = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if started_tm:
+            tracemalloc.stop()
+        prof_path = prefix + ".prof"
+        prof.dump_stats(prof_path)
+        mem_path = prefix + ".mem.txt"
+        with open(mem_path, "w", encoding="utf-8") as f:
+            f.write(f"current {current / 2**20:.1f} MiB, peak {peak / 2**20:.1f} MiB\n\n")
+            for stat in snap.statistics("lineno")[:top]:
+                f.write(f"{stat}\n")
+        written.extend([prof_path, mem_path])
+
+
+def capture_prefix(directory: Optional[str], kind: str) -> str:
+    """<directory>/<kind>-YYYYmmdd-HHMMSS, default directory ~/.smartrename/profiles."""
+    directory = directory or os.path.join(os.path.expanduser("~"), ".smartrename", "profiles")
+    return os.path.join(directory, f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}")
@@ -0,0 +1,88 @@
+"""Per-directory index of existing and planned names.
+
+Built once from a scan, it answers "is this name taken?" and "what is the next
+free `name (N).ext`?" in O(1) without touching the filesystem. Names can be
+compared case-insensitively for SMB/NTFS-backed shares.
+"""
+import os
+from typing import Dict, Set
+
+
+class NameIndex:
+    def __init__(self, names_by_dir: Dict[str, Set[str]], case_insensitive: bool = False):
+        self.case_insensitive = case_insensitive
+        self._scanned = names_by_dir
+        self._existing: Dict[str, Set[str]] = {}
+        self._planned: Dict[str, Set[str]] = {}
+        # existing names whose file is itself being renamed away in this batch
+        self._vacated: Dict[str, Set[str]] = {}
+        # (dir, folded "stem\0ext") -> next suffix number to try
+        self._next_suffix: Dict[tuple, int] = {}
+        self.listdir_calls = 0
+
+    def fold(self, name: str) -> str:
+        return name.casefold() if self.case_insensitive else name
+
+    def _existing_in(self, parent: str) -> Set[str]:
+        names = self._existing.get(parent)
+        if names is None:
+            raw = self._scanned.get(parent)
+            if raw is None:
+                # a directory the scan didn't list: read it once
+                self.listdir_calls += 1
+                try:
+                    raw = set(os.listdir(parent))
+                except OSError:
+                    raw = set()
+            names = {self.fold(n) for n in raw} if self.case_insensitive else raw
+            self._existing[parent] = names
+        return names
+
+    def _planned_in(self, parent: str) -> Set[str]:
+        names = self._planned.get(parent)
+        if names is None:
+            names = self._planned[parent] = set()
+        return names
+
+    def is_taken(self, parent: str, name: str) -> bool:
+        key = self.fold(name)
+        if key in self._planned_in(parent):
+            return True
+        if key in self._existing_in(parent):
+            vacated = self._vacated.get(parent)
+            return vacated is None or key not in vacated
+        return False
+
+    def vacate(self, parent: str, name: str):
+        """Mark an existing name as free: its file moves away in this batch."""
+        names = self._vacated.get(parent)
+        if names is None:
+            names = self._vacated[parent] = set()
+        names.add(self.fold(name))
+
+    def occupy(self, parent: str, name: str):
+        """Undo vacate(): the file stays after all (e.g. its row is a conflict)."""
+        names = self._vacated.get(parent)
+        if names is not None:
+            names.discard(self.fold(name))
+
+    def is_planned(self, parent: str, name: str) -> bool:
+        return self.fold(name) in self._planned_in(parent)
+
+    def reserve(self, parent: str, name: str):
+        self._planned_in(parent).add(self.fold(name))
+
+    def resolve(self, parent: str, stem: str, ext: str) -> str:
+        """Return the first free `stem (N)ext` (N >= 1) and reserve it.
+
+        The per-stem counter remembers where the last search stopped, so
+        thousands of files colliding on one stem cost O(1) each."""
+        key = (parent, self.fold(stem + "\0" + ext))
+        i = self._next_suffix.get(key, 1)
+        cand = f"{stem} ({i}){ext}"
+        while self.is_taken(parent, cand):
+            i += 1
+            cand = f"{stem} ({i}){ext}"
+        self._next_suffix[key] = i + 1
+        self.reserve(parent, cand)
+        return cand
@@ -0,0 +1,405 @@
+"""Plan files: a preview saved to disk, reviewed (or edited) elsewhere, applied later.
+
+Two formats, picked by the file extension, both written and read one row at a
+time, so a multi-million-file plan never has to fit in memory:
+
+    .jsonl  {"smartrename_plan": 1, "root": "/photos", "created": "...", "options": {...}}
+            {"src": "2019/IMG_0001.JPG", "dst": "Trip_001.JPG", "status": "OK",
+             "size": 2048311, "mtime_ns": 1561212345000000000}
+            ...
+    .csv    # smartrename plan 1 {"root": "/photos", "created": "...", "options": {...}}
+            src,dst,status,size,mtime_ns,dup_of
+            2019/IMG_0001.JPG,Trip_001.JPG,OK,2048311,1561212345000000000,
+            ...
+
+`root` is absolute; `src` (and `dup_of`) are relative to it with `/` separators, `dst` is the
+new name in the same folder; size / mtime_ns are the file's fingerprint when
+the plan was made (empty or -1 when unknown). The header records the options
+that produced the plan.
+
+apply_plan() streams a plan back: only OK rows are renamed, one folder at a
+time (rows of a folder are consecutive in an exported plan, so memory is
+bounded by the largest folder, not the plan; a folder whose rows are spread
+out, e.g. by hand editing, is held back and run whole at the end), and each file's current size and mtime
+are checked against its fingerprint right before that folder runs: a file that
+changed since the export fails with StaleError instead of being renamed. The
+names in the plan are what was reviewed, so a target that exists fails its row
+rather than getting a " (N)" suffix.
+"""
+import csv
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+FORMAT_VERSION = 1
+FIELDS = ("src", "dst", "status", "size", "mtime_ns", "dup_of")
+_CSV_MAGIC = "# smartrename plan "
+
+
+class StaleError(OSError):
+    """The file changed (size or mtime) since the plan was exported."""
+
+
+class PlanEntry:
+    """One row of a plan file."""
+    __slots__ = ("src", "dst", "status", "size", "mtime_ns", "dup_of")
+
+    def __init__(self, src: str, dst: str, status: str, size: int = -1, mtime_ns: int = -1, dup_of: str = ""):
+        self.src = src
+        self.dst = dst
+        self.status = status
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.dup_of = dup_of
+
+    @property
+    def folder(self) -> str:
+        return self.src.rpartition("/")[0]
+
+
+def format_for(path) -> str:
+    """'csv' or 'jsonl', from the extension."""
+    ext = os.path.splitext(str(path))[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    raise ValueError(f"Unknown plan format {ext or str(path)!r} (use .csv or .jsonl)")
+
+
+def _rel(root_prefix: str, path: str) -> str:
+    rel = path[len(root_prefix):] if path.startswith(root_prefix) else path
+    return rel.replace(os.sep, "/") if os.sep != "/" else rel
+
+
+# ---------- writing
+class PlanWriter:
+    """Streams rows to a plan file. Use as a context manager."""
+
+    def __init__(self, path, root, options: Optional[dict] = None):
+        self.path = Path(path)
+        self.fmt = format_for(path)
+        self.root = os.path.abspath(str(root))
+        self._prefix = os.path.join(self.root, "")
+        self.rows = 0
+        options = dict(options or {})
+        if "folder" in options:
+            options["folder"] = self.root
+        header = {"smartrename_plan": FORMAT_VERSION, "root": self.root,
+                  "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "options": options}
+        self._f = open(self.path, "w", newline="", encoding="utf-8")
+        if self.fmt == "csv":
+            del header["smartrename_plan"]
+            self._f.write(f"{_CSV_MAGIC}{FORMAT_VERSION} {json.dumps(header, ensure_ascii=False)}\n")
+            self._csv = csv.writer(self._f)
+            self._csv.writerow(FIELDS)
+        else:
+            self._write_json(header)
+
+    def _write_json(self, rec: dict):
+        self._f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def write(self, parent: str, name: str, new_name: str, status: str,
+              size: int = -1, mtime_ns: int = -1, dup_of: Optional[str] = None):
+        """One file: its folder and name, planned name and status, fingerprint
+        (-1 = stat it now) and the path of the file it duplicates, if any."""
+        path = os.path.abspath(os.path.join(parent, name))
+        if size < 0 or mtime_ns < 0:
+            try:
+                st = os.stat(path)
+                size, mtime_ns = st.st_size, st.st_mtime_ns
+            except OSError:
+                size = mtime_ns = -1
+        src = _rel(self._prefix, path)
+        dup = _rel(self._prefix, os.path.abspath(dup_of)) if dup_of else ""
+        if self.fmt == "csv":
+            self._csv.writerow((src, new_name, status, "" if size < 0 else size,
+                                "" if mtime_ns < 0 else mtime_ns, dup))
+        else:
+            rec = {"src": src, "dst": new_name, "status": status, "size": size, "mtime_ns": mtime_ns}
+            if dup:
+                rec["dup_of"] = dup
+            self._write_json(rec)
+        self.rows += 1
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------- reading
+class PlanReader:
+    """Streams a plan file: `header` is read on open, iterating yields
+    PlanEntries. `position` / `size` (bytes) are there for progress bars.
+    A malformed row raises ValueError naming its line."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.fmt = format_for(path)
+        self.size = os.path.getsize(self.path)
+        self.position = 0
+        self.line = 0
+        self._f = open(self.path, "rb")
+        first = self._next_line()
+        try:
+            if self.fmt == "csv":
+                if not first.startswith(_CSV_MAGIC):
+                    # re-saved by a spreadsheet: the line was split at its commas and quoted
+                    first = ",".join(next(csv.reader([first]), [])).rstrip(",")
+                if not first.startswith(_CSV_MAGIC):
+                    raise ValueError
+                version, _, header = first[len(_CSV_MAGIC):].partition(" ")
+                self.header = json.loads(header)
+                self.header["smartrename_plan"] = int(version)
+            else:
+                self.header = json.loads(first)
+            version = self.header["smartrename_plan"]
+            self.root = self.header["root"] = os.path.abspath(self.header["root"])  # older plans may hold a relative one
+        except (ValueError, KeyError, TypeError):
+            self._f.close()
+            raise ValueError(f"{self.path} is not a smartrename plan file") from None
+        if version > FORMAT_VERSION:
+            self._f.close()
+            raise ValueError(f"{self.path} was written by a newer version (plan format {version})")
+        self.options = self.header.get("options") or {}
+        self.created = self.header.get("created", "")
+
+    def _next_line(self) -> str:
+        raw = self._f.readline()
+        self.position += len(raw)
+        self.line += 1
+        return raw.decode("utf-8-sig").rstrip("\r\n")  # a BOM, if a spreadsheet added one
+
+    def _lines(self) -> Iterator[str]:
+        while True:
+            raw = self._f.readline()
+            if not raw:
+                return
+            self.position += len(raw)
+            self.line += 1
+            yield raw.decode("utf-8")
+
+    def __iter__(self) -> Iterator[PlanEntry]:
+        if self.fmt == "csv":
+            rows = csv.reader(self._lines())
+            head = next(rows, None)
+            if head is None:
+                return
+            cols = {name: i for i, name in enumerate(head)}
+            if "src" not in cols or "dst" not in cols:
+                raise ValueError(f"{self.path}:{self.line}: the column header needs 'src' and 'dst'")
+            for row in rows:
+                if not row:
+                    continue
+                yield self._entry({k: row[i] for k, i in cols.items() if i < len(row)})
+        else:
+            for line in self._lines():
+                if not line.strip():
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{self.path}:{self.line}: {e}") from None
+                yield self._entry(rec)
+
+    def _entry(self, rec: dict) -> PlanEntry:
+        try:
+            size, mtime_ns = rec.get("size"), rec.get("mtime_ns")
+            entry = PlanEntry(rec["src"], rec["dst"], rec.get("status") or "OK",
+                              -1 if size in (None, "") else int(size),
+                              -1 if mtime_ns in (None, "") else int(mtime_ns),
+                              rec.get("dup_of") or "")
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"{self.path}:{self.line}: bad row ({e})") from None
+        problem = _check_entry(entry)
+        if problem:
+            raise ValueError(f"{self.path}:{self.line}: {problem}")
+        return entry
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _check_entry(e: PlanEntry) -> str:
+    """Why a row can't be applied safely (paths outside the root, a target in
+    another folder), or ''."""
+    parts = e.src.split("/")
+    if not e.src or e.src.startswith("/") or os.path.isabs(e.src) or ".." in parts or "" in parts:
+        return f"source must be a path inside the plan's folder: {e.src!r}"
+    bad = ("/", "\\", "\0") if os.name == "nt" else ("/", "\0")
+    if not e.dst or e.dst in (".", "..") or any(c in e.dst for c in bad):
+        return f"new name must be a plain file name: {e.dst!r}"
+    return ""
+
+
+def read_header(path) -> dict:
+    """The header of a plan file (root, created, options), without reading the rows."""
+    with PlanReader(path) as r:
+        return r.header
+
+
+def check_plan(path) -> Tuple[int, int]:
+    """Parse a whole plan without touching any file: (rows, rows to rename).
+    Raises ValueError at the first malformed row."""
+    return _check(path)[:2]
+
+
+def _check(path) -> Tuple[int, int, Set[str]]:
+    """check_plan, plus the folders whose rows to rename are not all consecutive."""
+    from .engine import STATUS_OK
+    rows = todo = 0
+    seen: Set[str] = set()
+    split: Set[str] = set()
+    folder = None
+    with PlanReader(path) as r:
+        for e in r:
+            rows += 1
+            if e.status != STATUS_OK or e.dst == e.src.rpartition("/")[2]:
+                continue
+            todo += 1
+            if e.folder != folder:
+                folder = e.folder
+                if folder in seen:
+                    split.add(folder)
+                seen.add(folder)
+    return rows, todo, split
+
+
+# ---------- applying
+def _folders(reader: PlanReader, split: Set[str] = frozenset()) -> Iterator[Tuple[str, List[PlanEntry]]]:
+    """OK rows grouped by folder: consecutive runs as they come, the folders
+    in `split` (rows spread over the file) whole, after everything else."""
+    from .engine import STATUS_OK
+    group: List[PlanEntry] = []
+    held: Dict[str, List[PlanEntry]] = {}
+    folder = None
+    for e in reader:
+        if e.status != STATUS_OK or e.dst == e.src.rpartition("/")[2]:
+            continue
+        if e.folder in split:
+            held.setdefault(e.folder, []).append(e)
+            continue
+        if e.folder != folder and group:
+            yield folder, group
+            group = []
+        folder = e.folder
+        group.append(e)
+    if group:
+        yield folder, group
+    yield from held.items()
+
+
+def _verify(path: Path, e: PlanEntry) -> Tuple[int, int]:
+    """Check the fingerprint; returns the file's (inode, size) for the journal."""
+    st = os.stat(path)
+    if (e.size >= 0 and st.st_size != e.size) or (e.mtime_ns >= 0 and st.st_mtime_ns != e.mtime_ns):
+        raise StaleError(f"{path} changed since the plan was made (size/mtime differ)")
+    return st.st_ino, st.st_size
+
+
+def apply_plan(path, on_result=None, cancel=None, root=None, workers: int = 1,
+               journal_dir=None, undo_map: Optional[list] = None, reader: Optional[PlanReader] = None):
+    """Rename the OK rows of a plan file under `root` (default: the root in its
+    header). Returns (ok, failed, stale, batch_id); stale rows are also counted
+    as failed and reported to on_result with a StaleError.
+
+    With `journal_dir` the batch is journaled like an interactive rename
+    (smartrename.journal) and can be undone from History / --undo-batch;
+    batch_id is None otherwise. `undo_map` (optional) collects (dst, src)
+    pairs like engine.apply_renames; leave it out to keep memory flat.
+    The file is checked in full first (check_plan), so a malformed plan
+    renames nothing. Pass an open `reader` to follow its `position`."""
+    from . import engine
+    from .chains import order_renames
+    from .journal import Journal, _run_chunks
+    from .renameat import open_renamer
+
+    split = _check(path)[2]
+    own = reader is None
+    if own:
+        reader = PlanReader(path)
+    base = Path(os.path.abspath(root if root is not None else reader.root))
+    ok = fail = stale = 0
+    journal = Journal.begin(journal_dir, base) if journal_dir is not None else None
+    cancelled = False
+    try:
+        with open_renamer() as renamer:
+            for folder, entries in _folders(reader, split):
+                if cancel and cancel():
+                    cancelled = True
+                    break
+                rows = []
+                for e in entries:
+                    src = base.joinpath(*e.src.split("/"))
+                    try:
+                        ident = _verify(src, e)
+                    except OSError as err:
+                        fail += 1
+                        stale += isinstance(err, StaleError)
+                        if on_result:
+                            on_result(src, src.with_name(e.dst), err)
+                        continue
+                    rows.append(engine.PlanRow(src, e.dst, src.with_name(e.dst), engine.STATUS_OK, ident=ident))
+                steps = order_renames(rows, exchange=renamer.can_exchange)
+                moved = undo_map if undo_map is not None else []  # a fresh list per folder: memory stays flat
+                if journal is not None:
+                    journal.undo_map = moved
+                    o, f_, cancelled = _run_chunks(journal, journal.add_plan(steps), steps, on_result, cancel,
+                                                   workers, renamer)
+                else:
+                    o, f_, _ = engine.apply_steps(steps, on_result, cancel, moved, workers, renamer)
+                ok += o
+                fail += f_
+                if cancelled:
+                    break
+            else:
+                cancelled = bool(cancel and cancel())
+            if journal is not None:
+                journal.mark({"op": "end", "ok": ok, "fail": fail, "cancelled": cancelled})
+    finally:
+        if journal is not None:
+            journal.close()
+        if own:
+            reader.close()
+    return ok, fail, stale, None if journal is None else journal.batch_id
+
+
+def write_rows(path, opts, rows, records=None, progress=None, cancel=None) -> Optional[int]:
+    """Export preview rows (PlanRows or a RowStore) to a plan file. `records`
+    (the scan's FileRecords, one per row in the same order) supplies the
+    fingerprints; rows without one, or that moved since, are stat'ed.
+    progress(done, total) is called per row. Returns the number of rows
+    written, or None when cancelled (the partial file is removed)."""
+    total = len(rows)
+    with PlanWriter(path, opts.folder, opts.to_dict()) as w:
+        for i, row in enumerate(rows):
+            if cancel and cancel():
+                break
+            old = row.old_path
+            parent, name = str(old.parent), old.name
+            size = mtime_ns = -1
+            if records is not None:
+                r = records[i]
+                if r.name == name and r.parent == parent:
+                    size, mtime_ns = r.size, r.mtime_ns
+            dup = row.dup_of
+            w.write(parent, name, row.new_name, row.status, size, mtime_ns, None if dup is None else str(dup))
+            if progress:
+                progress(i + 1, total)
+        else:
+            return w.rows
+    os.remove(path)
+    return None
@@ -0,0 +1,86 @@
+"""Named option profiles: every RenameOptions field except the folder, kept in one JSON file.
+
+    ~/.smartrename/profiles.json  (or $SMARTRENAME_PROFILES)
+    {"version": 1, "profiles": {"Camera import": {"base": "Trip", "include_sub": true, ...}}}
+
+The GUI saves and loads them from the Profile row; the CLI takes them with
+--use-profile and the job queue (smartrename.jobqueue) pairs each folder with
+one. Writes go through a temporary file and os.replace, so a crash never
+leaves a half-written file behind.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .engine import RenameOptions
+
+VERSION = 1
+
+
+def default_path() -> Path:
+    """Profiles file: $SMARTRENAME_PROFILES, else ~/.smartrename/profiles.json."""
+    env = os.environ.get("SMARTRENAME_PROFILES")
+    if env:
+        return Path(env)
+    return Path.home() / ".smartrename" / "profiles.json"
+
+
+def load(path: Optional[Path] = None) -> Dict[str, dict]:
+    """name -> saved options (no folder). A missing file is no profiles."""
+    path = Path(path or default_path())
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        raise ValueError(f"Profiles file {path} is damaged: {e}") from None
+    return dict(data.get("profiles") or {})
+
+
+def _store(profiles: Dict[str, dict], path: Optional[Path] = None):
+    path = Path(path or default_path())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": VERSION, "profiles": profiles}, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def names(path: Optional[Path] = None) -> List[str]:
+    return sorted(load(path), key=str.lower)
+
+
+def get(name: str, path: Optional[Path] = None) -> dict:
+    try:
+        return load(path)[name]
+    except KeyError:
+        raise ValueError(f"No such profile: {name}") from None
+
+
+def save(name: str, opts: RenameOptions, path: Optional[Path] = None):
+    """Save (or replace) `name` with every option of `opts` but the folder."""
+    name = name.strip()
+    if not name:
+        raise ValueError("Profile name cannot be empty.")
+    profiles = load(path)
+    d = opts.to_dict()
+    del d["folder"]
+    profiles[name] = d
+    _store(profiles, path)
+
+
+def delete(name: str, path: Optional[Path] = None) -> bool:
+    profiles = load(path)
+    if profiles.pop(name, None) is None:
+        return False
+    _store(profiles, path)
+    return True
+
+
+def options(name: str, folder, path: Optional[Path] = None) -> RenameOptions:
+    """The options of profile `name`, for `folder`."""
+    return RenameOptions.from_dict({**get(name, path), "folder": folder})
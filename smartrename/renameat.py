@@ -0,0 +1,314 @@
+"""No-clobber renames: a target that appeared after the preview is never overwritten.
+
+POSIX rename() silently replaces an existing target, so "check, then rename"
+leaves a window in which a file created by someone else is lost. Here the
+kernel does the check as part of the rename:
+
+    Linux     renameat2(RENAME_NOREPLACE) through ctypes, relative to one
+              directory fd per folder (opened once, kept in a small LRU);
+              two-name swaps are one renameat2(RENAME_EXCHANGE)
+    macOS     renamex_np(RENAME_EXCL / RENAME_SWAP)
+    Windows   os.rename, which already refuses an existing target
+    other     lexists() check, then os.rename (the old, racy behaviour)
+
+A filesystem that rejects the flags (EINVAL, e.g. some FUSE or network mounts)
+falls back to the checked rename for that device. A rename whose target is the
+source itself under another case (a case-only rename on a case-insensitive
+filesystem) is done with a plain rename; a target that is another hard link to
+the source fails like any existing target (POSIX rename() would do nothing).
+
+open_renamer() picks the best backend; use it as a context manager so the
+directory fds are closed.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import platform
+import sys
+import threading
+from collections import OrderedDict
+from typing import Set
+
+RENAME_NOREPLACE = 1   # Linux
+RENAME_EXCHANGE = 2
+RENAME_SWAP = 0x2      # macOS renamex_np
+RENAME_EXCL = 0x4
+AT_FDCWD = -100
+MAX_DIR_FDS = 256
+
+# renameat2 syscall numbers, for a libc (glibc < 2.28, some musl) without the wrapper
+_SYS_RENAMEAT2 = {"x86_64": 316, "aarch64": 276, "riscv64": 276, "i386": 353, "i686": 353,
+                  "armv7l": 382, "ppc64le": 357, "s390x": 347}
+
+_UNSUPPORTED = (errno.EINVAL, errno.ENOSYS, errno.ENOTSUP, getattr(errno, "EOPNOTSUPP", errno.ENOTSUP))
+
+_FS_ENC, _FS_ERR = sys.getfilesystemencoding(), sys.getfilesystemencodeerrors()
+
+_renameat2 = None
+_renamex_np = None
+
+
+def _load_renameat2():
+    global _renameat2
+    if _renameat2 is None:
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "renameat2 is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        try:
+            fn = libc.renameat2
+            fn.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+        except AttributeError:
+            nr = _SYS_RENAMEAT2.get(platform.machine())
+            if nr is None:
+                raise OSError(errno.ENOSYS, "no renameat2 on this platform") from None
+            syscall = libc.syscall
+            syscall.argtypes = [ctypes.c_long, ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p,
+                                ctypes.c_uint]
+
+            def fn(olddir, old, newdir, new, flags):
+                return syscall(nr, olddir, old, newdir, new, flags)
+        _renameat2 = fn
+    return _renameat2
+
+
+def _load_renamex_np():
+    global _renamex_np
+    if _renamex_np is None:
+        if sys.platform != "darwin":
+            raise OSError(errno.ENOSYS, "renamex_np is only available on macOS")
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fn = libc.renamex_np  # macOS 10.12+
+        fn.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_uint]
+        _renamex_np = fn
+    return _renamex_np
+
+
+def _error(src, dst) -> OSError:
+    e = ctypes.get_errno()
+    return OSError(e, os.strerror(e), os.fspath(src), None, os.fspath(dst))
+
+
+def _same_file(a, b) -> bool:
+    try:
+        return os.path.samestat(os.lstat(a), os.lstat(b))
+    except OSError:
+        return False
+
+
+def _case_only(src, dst) -> bool:
+    """dst is src itself under another case (a case-insensitive filesystem),
+    not a second hard link to the same file."""
+    sdir, sname = os.path.split(os.fspath(src))
+    ddir, dname = os.path.split(os.fspath(dst))
+    if sname == dname or sname.lower() != dname.lower() or os.path.normcase(sdir) != os.path.normcase(ddir):
+        return False
+    try:
+        st = os.lstat(src)
+        if not os.path.samestat(st, os.lstat(dst)):
+            return False
+        if st.st_nlink <= 1:
+            return True  # a file with one name: dst can only be that name
+        return dname not in os.listdir(ddir or ".")  # a hard link is listed under its own name
+    except OSError:
+        return False
+
+
+def _exists(src, dst) -> FileExistsError:
+    msg = "target is a hard link to the same file" if _same_file(src, dst) else os.strerror(errno.EEXIST)
+    return FileExistsError(errno.EEXIST, msg, os.fspath(src), None, os.fspath(dst))
+
+
+class Renamer:
+    """Portable backend (see the module docstring). rename() raises
+    FileExistsError instead of replacing a target; swap() exchanges two names."""
+    can_exchange = False
+    name = "checked"
+
+    def rename(self, src, dst):
+        if os.name != "nt" and os.path.lexists(dst) and not _case_only(src, dst):
+            raise _exists(src, dst)
+        os.rename(src, dst)
+
+    def exchange(self, a, b):
+        raise OSError(errno.ENOTSUP, "atomic exchange is not supported here", os.fspath(a), None, os.fspath(b))
+
+    def swap(self, a, b, tmp):
+        """Exchange the names a and b: atomically when the backend can, else
+        through the free name `tmp` (three no-clobber renames)."""
+        if self.can_exchange:
+            try:
+                self.exchange(a, b)
+                return
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+        self.rename(a, tmp)
+        try:
+            self.rename(b, a)
+        except OSError:
+            self.rename(tmp, a)  # put a back; b is untouched
+            raise
+        self.rename(tmp, b)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _DirFds:
+    """O_DIRECTORY fds per folder, shared by threads. An fd is only closed (to
+    stay under MAX_DIR_FDS) while no rename is using it."""
+
+    def __init__(self, cap: int = MAX_DIR_FDS):
+        self.cap = cap
+        self._fds: "OrderedDict[str, int]" = OrderedDict()
+        self._busy = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, d: str) -> int:
+        with self._lock:
+            fd = self._fds.get(d)
+            if fd is None:
+                fd = self._fds[d] = os.open(d, os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC)
+                self._trim()
+            else:
+                self._fds.move_to_end(d)
+            self._busy[d] = self._busy.get(d, 0) + 1
+            return fd
+
+    def release(self, d: str):
+        with self._lock:
+            n = self._busy[d] - 1
+            if n:
+                self._busy[d] = n
+            else:
+                del self._busy[d]
+
+    def _trim(self):
+        if len(self._fds) <= self.cap:
+            return
+        # down to 3/4 of the cap in one go, so walking a deep tree doesn't trim on every folder
+        excess = len(self._fds) - self.cap * 3 // 4
+        idle = [d for d in self._fds if d not in self._busy]  # oldest first
+        for d in idle[:excess]:
+            os.close(self._fds.pop(d))
+
+    def close(self):
+        with self._lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
+
+
+class LinuxRenamer(Renamer):
+    can_exchange = True
+    name = "renameat2"
+
+    def __init__(self):
+        self._call = _load_renameat2()
+        self._dirs = _DirFds()
+        self._no_flags: Set[int] = set()   # st_dev of filesystems that reject the flags
+
+    def _at(self, src, dst, flags: int):
+        # hot path: plain string slicing and one fd lookup for the usual same-folder rename
+        src, dst = os.fspath(src), os.fspath(dst)
+        i, j = src.rfind("/"), dst.rfind("/")
+        if i <= 0 or j <= 0:  # relative or directly under /: let the kernel resolve it
+            rc = self._call(AT_FDCWD, os.fsencode(src), AT_FDCWD, os.fsencode(dst), flags)
+        else:
+            sd, dd = src[:i], dst[:j]
+            dirs = self._dirs
+            sfd = dirs.acquire(sd)
+            try:
+                if dd == sd:
+                    rc = self._call(sfd, src[i + 1:].encode(_FS_ENC, _FS_ERR), sfd,
+                                    dst[j + 1:].encode(_FS_ENC, _FS_ERR), flags)
+                else:
+                    dfd = dirs.acquire(dd)
+                    try:
+                        rc = self._call(sfd, src[i + 1:].encode(_FS_ENC, _FS_ERR), dfd,
+                                        dst[j + 1:].encode(_FS_ENC, _FS_ERR), flags)
+                    finally:
+                        dirs.release(dd)
+            finally:
+                dirs.release(sd)
+        if rc != 0:
+            raise _error(src, dst)
+
+    def _unsupported(self, src) -> bool:
+        try:
+            return os.lstat(os.path.dirname(os.fspath(src))).st_dev in self._no_flags
+        except OSError:
+            return False
+
+    def _mark_unsupported(self, src):
+        try:
+            self._no_flags.add(os.lstat(os.path.dirname(os.fspath(src))).st_dev)
+        except OSError:
+            pass
+
+    def rename(self, src, dst):
+        if self._no_flags and self._unsupported(src):
+            return Renamer.rename(self, src, dst)
+        try:
+            self._at(src, dst, RENAME_NOREPLACE)
+        except OSError as e:
+            if e.errno == errno.EEXIST:
+                if not _case_only(src, dst):
+                    raise _exists(src, dst) from None
+                os.rename(src, dst)  # case-only rename on a case-insensitive filesystem
+            elif e.errno in _UNSUPPORTED:
+                self._mark_unsupported(src)
+                Renamer.rename(self, src, dst)
+            else:
+                raise
+
+    def exchange(self, a, b):
+        self._at(a, b, RENAME_EXCHANGE)
+
+    def close(self):
+        self._dirs.close()
+
+
+class MacRenamer(Renamer):
+    can_exchange = True
+    name = "renamex_np"
+
+    def __init__(self):
+        self._call = _load_renamex_np()
+
+    def _np(self, src, dst, flags: int):
+        if self._call(os.fsencode(src), os.fsencode(dst), flags) != 0:
+            raise _error(src, dst)
+
+    def rename(self, src, dst):
+        try:
+            self._np(src, dst, RENAME_EXCL)
+        except OSError as e:
+            if e.errno == errno.EEXIST:
+                if not _case_only(src, dst):
+                    raise _exists(src, dst) from None
+                os.rename(src, dst)  # case-only rename on APFS/HFS+
+            elif e.errno in _UNSUPPORTED:
+                Renamer.rename(self, src, dst)
+            else:
+                raise
+
+    def exchange(self, a, b):
+        self._np(a, b, RENAME_SWAP)
+
+
+def open_renamer() -> Renamer:
+    """The best no-clobber backend for this system."""
+    for cls in (LinuxRenamer, MacRenamer):
+        try:
+            return cls()
+        except (OSError, AttributeError):
+            continue
+    return Renamer()
@@ -0,0 +1,166 @@
+"""Compact, column-wise storage for preview rows.
+
+A list of PlanRows costs a few hundred bytes per file (the row object, two
+Path objects and their parts), i.e. gigabytes for a million-file preview.
+Here a row is a position in a handful of parallel columns:
+
+    dir_ids    array('I')   index into `dirs`, each parent folder stored once
+    old_names  list[str]    current file name (the scan's string, not a copy)
+    new_names  list[str]    planned name
+    statuses   array('B')   index into STATUSES
+    dup_of     dict         row -> row it duplicates (sparse)
+
+store[i] returns a Row: a two-slot view with the PlanRow attributes
+(old_path, new_name, target_path, status, tag, dup_of, ident). Path objects
+are only built when one of those is read, which the table does for visible
+rows only; sorting and filtering go through old_name / status, which need none.
+
+`records`, when set, is the scan the rows were planned from (one FileRecord
+per row, same order); a row's ident comes from it while the row still names
+that file.
+"""
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .engine import (STATUS_CONFLICT, STATUS_DUPLICATE, STATUS_FAILED, STATUS_OK, STATUS_SKIP, STATUS_TAGS,
+                     PlanRow)
+
+STATUSES = (STATUS_OK, STATUS_SKIP, STATUS_CONFLICT, STATUS_DUPLICATE, STATUS_FAILED)
+CODES = {s: i for i, s in enumerate(STATUSES)}
+
+
+class RowStore:
+    __slots__ = ("dirs", "_dir_ids", "dir_ids", "old_names", "new_names", "statuses", "dup_of", "records")
+
+    def __init__(self):
+        self.dirs: List[str] = []
+        self._dir_ids: Dict[str, int] = {}
+        self.dir_ids = array("I")
+        self.old_names: List[str] = []
+        self.new_names: List[str] = []
+        self.statuses = array("B")
+        self.dup_of: Dict[int, int] = {}
+        self.records: Optional[list] = None
+
+    def dir_id(self, parent: str) -> int:
+        i = self._dir_ids.get(parent)
+        if i is None:
+            i = self._dir_ids[parent] = len(self.dirs)
+            self.dirs.append(parent)
+        return i
+
+    def append(self, parent: str, old_name: str, new_name: str, status: str, dup_of: Optional[int] = None):
+        if dup_of is not None:
+            self.dup_of[len(self.old_names)] = dup_of
+        self.dir_ids.append(self.dir_id(parent))
+        self.old_names.append(old_name)
+        # an unchanged name shares the old string
+        self.new_names.append(old_name if new_name == old_name else new_name)
+        self.statuses.append(CODES[status])
+
+    def append_row(self, row: PlanRow):
+        """Add a PlanRow (dup_of is dropped: it's a path, the store keeps row numbers)."""
+        self.append(str(row.old_path.parent), row.old_path.name, row.new_name, row.status)
+
+    def __len__(self):
+        return len(self.old_names)
+
+    def __getitem__(self, i: int) -> "Row":
+        if not 0 <= i < len(self.old_names):
+            raise IndexError(i)
+        return Row(self, i)
+
+    def __iter__(self) -> Iterator["Row"]:
+        for i in range(len(self.old_names)):
+            yield Row(self, i)
+
+    # ---------- column queries (no Row objects)
+    def count(self, status: str) -> int:
+        return self.statuses.count(CODES[status])
+
+    def indices(self, status: str) -> List[int]:
+        code = CODES[status]
+        return [i for i, c in enumerate(self.statuses) if c == code]
+
+    def rows(self, status: str) -> List["Row"]:
+        return [Row(self, i) for i in self.indices(status)]
+
+    def parent(self, i: int) -> str:
+        return self.dirs[self.dir_ids[i]]
+
+
+class Row:
+    """One row of a RowStore, shaped like engine.PlanRow."""
+    __slots__ = ("store", "i")
+
+    def __init__(self, store: RowStore, i: int):
+        self.store = store
+        self.i = i
+
+    @property
+    def old_name(self) -> str:
+        return self.store.old_names[self.i]
+
+    @property
+    def old_path(self) -> Path:
+        s = self.store
+        return Path(s.dirs[s.dir_ids[self.i]], s.old_names[self.i])
+
+    @old_path.setter
+    def old_path(self, path: Path):
+        s = self.store
+        s.dir_ids[self.i] = s.dir_id(str(path.parent))
+        s.old_names[self.i] = path.name
+
+    @property
+    def new_name(self) -> str:
+        return self.store.new_names[self.i]
+
+    @new_name.setter
+    def new_name(self, name: str):
+        self.store.new_names[self.i] = name
+
+    @property
+    def target_path(self) -> Path:
+        s = self.store
+        return Path(s.dirs[s.dir_ids[self.i]], s.new_names[self.i])
+
+    @target_path.setter
+    def target_path(self, path: Path):
+        # targets stay in the row's folder: only the name is stored
+        self.store.new_names[self.i] = path.name
+
+    @property
+    def status(self) -> str:
+        return STATUSES[self.store.statuses[self.i]]
+
+    @status.setter
+    def status(self, status: str):
+        self.store.statuses[self.i] = CODES[status]
+
+    @property
+    def tag(self) -> str:
+        return STATUS_TAGS.get(self.status, "ok")
+
+    @property
+    def dup_of(self) -> Optional[Path]:
+        j = self.store.dup_of.get(self.i)
+        return None if j is None else Row(self.store, j).old_path
+
+    @property
+    def ident(self) -> Optional[Tuple[int, Optional[int]]]:
+        s, i = self.store, self.i
+        if s.records is None or i >= len(s.records):
+            return None
+        r = s.records[i]
+        return r.ident if r.name == s.old_names[i] and r.parent == s.dirs[s.dir_ids[i]] else None
+
+    def as_dict(self) -> dict:
+        return PlanRow(self.old_path, self.new_name, self.target_path, self.status, self.dup_of).as_dict()
+
+    def __eq__(self, other):
+        return isinstance(other, Row) and other.store is self.store and other.i == self.i
+
+    def __hash__(self):
+        return hash((id(self.store), self.i))
@@ -0,0 +1,75 @@
+"""Keeps the last scan (already sorted) so naming-only changes can re-plan
+without listing, stat'ing or sorting the tree again.
+
+The cache is keyed on what shapes the scan — folder, include-subfolders and
+sort mode — and is validated by re-stat'ing only the scanned *directories*:
+adding, removing or renaming an entry bumps its folder's mtime. Like git's
+"racy clean" rule, a folder modified within RACY_NS of the scan is never
+trusted, because coarse filesystem timestamps could hide a later change.
+"""
+import os
+from typing import Optional
+
+from . import engine
+from .metrics import NO_METRICS
+from .scanner import ScanResult
+
+RACY_NS = 2_000_000_000  # FAT timestamps are 2 s coarse
+
+
+class ScanCache:
+    def __init__(self):
+        self._key = None
+        self._result: Optional[ScanResult] = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(opts: engine.RenameOptions) -> tuple:
+        # a template reading mtime/size/taken needs a stat'ed (and EXIF-read) scan even when sorting by
+        # name; duplicate detection and the scan filters also live in the cached scan. scan_workers
+        # only changes how fast the same result is listed, so it is not part of the key
+        return (str(opts.folder), opts.include_sub, opts.max_depth if opts.include_sub else None, opts.sort,
+                opts.needs_stat(), opts.needs_taken(), opts.find_dupes,
+                opts.extensions, opts.include, opts.exclude, opts.skip_hidden,
+                opts.min_size, opts.max_size, opts.newer_than, opts.older_than)
+
+    def is_fresh(self, result: ScanResult) -> bool:
+        racy_after = result.scanned_at_ns - RACY_NS
+        for d, mtime_ns in result.dir_mtimes.items():
+            try:
+                now = os.stat(d).st_mtime_ns
+            except OSError:
+                return False
+            if now != mtime_ns or now >= racy_after:
+                return False
+        return True
+
+    def lookup(self, opts: engine.RenameOptions) -> Optional[ScanResult]:
+        """The cached scan for these options if it is still valid, else None."""
+        if self._result is None or self._key != self.key_for(opts):
+            return None
+        if not self.is_fresh(self._result):
+            self.invalidate()
+            return None
+        return self._result
+
+    def scan(self, opts: engine.RenameOptions, metrics=NO_METRICS, meta=None) -> ScanResult:
+        """engine.scan(opts), served from the cache when nothing changed on disk."""
+        if self._result is not None and self._key == self.key_for(opts):
+            metrics.add("stat", len(self._result.dir_mtimes))  # is_fresh() re-stats every folder
+        with metrics.phase("revalidate"):
+            cached = self.lookup(opts)
+        if cached is not None:
+            self.hits += 1
+            metrics.add("cache_hit")
+            return cached
+        self.misses += 1
+        result = engine.scan(opts, metrics, meta)
+        self._key = self.key_for(opts)
+        self._result = result
+        return result
+
+    def invalidate(self):
+        self._key = None
+        self._result = None
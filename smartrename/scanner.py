@@ -0,0 +1,251 @@
+"""os.scandir-based file scanner.
+
+Every directory is listed once and every file is stat'd at most once; the
+results are kept in compact FileRecords so the sort and conflict stages never
+have to touch the filesystem again.
+"""
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class FileRecord:
+    """One scanned file. `size`/`mtime_ns` are -1 when the scan ran without stat
+    (and `dev` is then 0); `taken` (capture time, see smartrename.exif) is None
+    until something fills it."""
+    __slots__ = ("parent", "name", "size", "mtime_ns", "inode", "taken", "dev")
+
+    def __init__(self, parent: str, name: str, size: int, mtime_ns: int, inode: int, taken: Optional[int] = None,
+                 dev: int = 0):
+        self.parent = parent
+        self.name = name
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.inode = inode
+        self.taken = taken
+        self.dev = dev
+
+    @property
+    def path(self) -> Path:
+        return Path(self.parent, self.name)
+
+    @property
+    def mtime(self) -> float:
+        return self.mtime_ns / 1e9
+
+    @property
+    def ident(self) -> Optional[Tuple[int, Optional[int]]]:
+        """(inode, size or None without stat) identifying the file, as the
+        journal records it; None when the scan got no inode (Windows)."""
+        if self.inode <= 0:
+            return None
+        return self.inode, self.size if self.size >= 0 else None
+
+    @property
+    def suffix(self) -> str:
+        # same rules as PurePath.suffix
+        i = self.name.rfind(".")
+        if 0 < i < len(self.name) - 1:
+            return self.name[i:]
+        return ""
+
+    def __repr__(self):
+        return f"FileRecord({os.path.join(self.parent, self.name)!r}, size={self.size}, mtime_ns={self.mtime_ns})"
+
+
+class ScanResult:
+    """Files found by a scan plus the names of *every* entry per listed directory
+    (files, folders, links), which is what a rename target can collide with.
+    `dir_mtimes` holds each listed directory's st_mtime_ns, taken just before
+    it was listed, so callers can tell cheaply whether the listing is stale.
+    `stat_calls` / `scandir_calls` count the syscalls the scan made, `filtered` /
+    `pruned` the files and folders a ScanFilter left out. `dup_of`
+    maps a record index to the index of an earlier byte-identical record when
+    duplicate detection ran (see smartrename.dupes)."""
+    __slots__ = ("records", "names_by_dir", "dir_mtimes", "scanned_at_ns", "stat_calls", "scandir_calls",
+                 "filtered", "pruned", "dup_of")
+
+    def __init__(self, records: List[FileRecord], names_by_dir: Dict[str, Set[str]],
+                 dir_mtimes: Dict[str, int] = None, scanned_at_ns: int = 0):
+        self.records = records
+        self.names_by_dir = names_by_dir
+        self.dir_mtimes = dir_mtimes if dir_mtimes is not None else {}
+        self.scanned_at_ns = scanned_at_ns
+        self.stat_calls = 0
+        self.scandir_calls = 0
+        self.filtered = 0
+        self.pruned = 0
+        self.dup_of: Dict[int, int] = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def exists(self, parent: str, name: str) -> bool:
+        names = self.names_by_dir.get(parent)
+        if names is None:
+            # not a scanned directory: fall back to the filesystem
+            return os.path.lexists(os.path.join(parent, name))
+        return name in names
+
+
+class _Listing:
+    """One directory's share of a scan."""
+    __slots__ = ("mtime_ns", "records", "names", "subdirs", "key", "depth", "ancestors", "stats", "filtered",
+                 "pruned")
+
+    def __init__(self, mtime_ns: int, key: Tuple[int, int], depth: int, ancestors: Tuple):
+        self.mtime_ns = mtime_ns
+        self.key = key
+        self.depth = depth
+        self.ancestors = ancestors  # (dev, inode) of every folder above, for the loop guard
+        self.records: List[FileRecord] = []
+        self.names: Optional[Set[str]] = None
+        self.subdirs: List[str] = []
+        self.stats = 0      # files stat'ed (rejected ones included)
+        self.filtered = 0
+        self.pruned = 0
+
+
+def _list_dir(d: str, with_stat: bool, recursive: bool, depth: int, ancestors: Tuple,
+              filt=None) -> Optional[_Listing]:
+    """stat + scandir one folder; None if it can't be stat'ed or is its own
+    ancestor (a symlink loop). `names` stays None when it can't be listed.
+    Every entry's name is kept, but files and folders `filt` rejects are not
+    recorded (and, when rejected by name, not stat'ed)."""
+    try:
+        st = os.stat(d)
+    except OSError:
+        return None
+    key = (st.st_dev, st.st_ino)
+    if key in ancestors:
+        return None
+    out = _Listing(st.st_mtime_ns, key, depth, ancestors)
+    try:
+        it = os.scandir(d)
+    except OSError:
+        return out
+    names = set()
+    records = out.records
+    subdirs = out.subdirs
+    with it:
+        for entry in it:
+            names.add(entry.name)
+            try:
+                if entry.is_file():
+                    if filt is not None and filt.skip_name(entry):
+                        out.filtered += 1
+                        continue
+                    if with_stat:
+                        st = entry.stat()
+                        out.stats += 1
+                        if filt is not None and filt.skip_stat(st):
+                            out.filtered += 1
+                            continue
+                        records.append(FileRecord(d, entry.name, st.st_size, st.st_mtime_ns, st.st_ino,
+                                                  dev=st.st_dev))
+                    else:
+                        records.append(FileRecord(d, entry.name, -1, -1, entry.inode()))
+                elif recursive and entry.is_dir():
+                    if filt is not None and filt.skip_dir(entry):
+                        out.pruned += 1
+                        continue
+                    subdirs.append(entry.path)
+            except OSError:
+                # vanished or unreadable between listing and stat
+                continue
+    out.names = names
+    return out
+
+
+def scan_tree(root, recursive: bool = False, with_stat: bool = True, workers: int = 1,
+              max_depth: Optional[int] = None, filt=None) -> ScanResult:
+    """List files under `root` (and its subfolders when `recursive`, at most
+    `max_depth` levels below root; None = no limit).
+
+    With `with_stat` each file costs exactly one stat (through DirEntry.stat(),
+    which the entry caches); without it only the directory listing is read.
+    Like pathlib's glob, symlinks to files and folders are followed, except
+    into a folder that is its own ancestor (a symlink loop).
+
+    With workers > 1 folders are listed concurrently by a thread pool (each
+    listing is a round trip on NFS/SMB). The result is identical to the
+    sequential walk: listings are put together in the same depth-first order.
+
+    `filt` is an optional smartrename.filters.ScanFilter (it must have
+    `with_stat` when it bounds size or mtime); excluded folders are pruned.
+    """
+    root = str(root)
+    scanned_at_ns = time.time_ns()
+    if not recursive:
+        max_depth = 0
+    listings: Dict[str, _Listing] = {}
+
+    def children(d: str, lst: _Listing):
+        if max_depth is not None and lst.depth >= max_depth:
+            return ()
+        ancestors = lst.ancestors + (lst.key,)
+        return [(sub, lst.depth + 1, ancestors) for sub in lst.subdirs]
+
+    if workers <= 1:
+        stack = [(root, 0, ())]
+        while stack:
+            d, depth, ancestors = stack.pop()
+            lst = _list_dir(d, with_stat, recursive, depth, ancestors, filt)
+            if lst is None:
+                continue
+            listings[d] = lst
+            stack.extend(reversed(children(d, lst)))
+    else:
+        # the pool's queue is the shared work queue; finished listings come back
+        # through `done` and the coordinating thread queues their subfolders
+        done: "queue.SimpleQueue" = queue.SimpleQueue()
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as pool:
+            def submit(d, depth, ancestors):
+                f = pool.submit(_list_dir, d, with_stat, recursive, depth, ancestors, filt)
+                f.add_done_callback(lambda f, d=d: done.put((d, f)))
+
+            submit(root, 0, ())
+            outstanding = 1
+            while outstanding:
+                d, f = done.get()
+                outstanding -= 1
+                lst = f.result()
+                if lst is None:
+                    continue
+                listings[d] = lst
+                for job in children(d, lst):
+                    submit(*job)
+                    outstanding += 1
+
+    # merge in depth-first listing order, exactly as the sequential walk visits folders
+    records: List[FileRecord] = []
+    names_by_dir: Dict[str, Set[str]] = {}
+    dir_mtimes: Dict[str, int] = {}
+    file_stats = filtered = pruned = 0
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        lst = listings.get(d)
+        if lst is None:
+            continue
+        dir_mtimes[d] = lst.mtime_ns
+        if lst.names is None:
+            continue
+        records.extend(lst.records)
+        names_by_dir[d] = lst.names
+        file_stats += lst.stats
+        filtered += lst.filtered
+        pruned += lst.pruned
+        if max_depth is None or lst.depth < max_depth:
+            # reversed so the stack pops folders in listing order
+            stack.extend(reversed(lst.subdirs))
+    result = ScanResult(records, names_by_dir, dir_mtimes, scanned_at_ns)
+    # one stat per listed folder (its mtime) plus one per file when stat'ing
+    result.stat_calls = len(dir_mtimes) + file_stats
+    result.scandir_calls = len(names_by_dir)
+    result.filtered = filtered
+    result.pruned = pruned
+    return result
@@ -0,0 +1,233 @@
+"""Name templates, compiled once per preview into a single Python function.
+
+A template is literal text with `{field}` / `{field:spec}` placeholders
+(`{{` and `}}` are literal braces):
+
+    {base}        the base name              {sep}        the separator
+    {index}       the running index (Numbers / Letters / Roman); `{index:4}` pads numbers to 4 digits
+    {parent}      name of the file's folder  {orig_stem}  original name without extension
+    {orig_name}   original file name         {size}       size in bytes
+    {mtime}       modified time, strftime spec (default %Y%m%d)
+    {taken}       EXIF capture date, strftime spec (default %Y%m%d); mtime when a file has none
+
+With no template the classic layout is used: `{base}{sep}{index}` (or
+`{index}{sep}{base}`, or just `{base}` when the index type is None).
+
+Compilation generates the body of `make(record, seq)` as straight-line string
+concatenation: constant parts are joined and sanitized ahead of time, index
+tokens for the whole run are precomputed in one go, and only fields that can
+carry illegal characters are sanitized per file.
+"""
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from .engine import ILLEGAL_WIN_CHARS, decide_pad, int_to_letters, int_to_roman
+
+_ILLEGAL = re.compile(ILLEGAL_WIN_CHARS)
+_FIELD = re.compile(r"\{\{|\}\}|\{([A-Za-z_]+)(?::([^{}]*))?\}|[{}]")
+_EPOCH = datetime(1970, 1, 1)
+
+# fields whose value needs a stat() of the file
+STAT_FIELDS = {"mtime", "size", "taken"}
+# fields whose value comes from the file system and may contain illegal characters
+UNSAFE_FIELDS = {"parent", "orig_stem", "orig_name", "mtime", "taken"}
+FIELDS = {"base", "sep", "index"} | STAT_FIELDS | UNSAFE_FIELDS
+
+
+class TemplateError(ValueError):
+    pass
+
+
+def parse(template: str) -> List[Tuple[str, str, str]]:
+    """Split a template into ("text", literal, "") and ("field", name, spec) parts."""
+    parts = []
+    pos = 0
+    for m in _FIELD.finditer(template):
+        if m.start() > pos:
+            parts.append(("text", template[pos:m.start()], ""))
+        tok = m.group(0)
+        if tok in ("{{", "}}"):
+            parts.append(("text", tok[0], ""))
+        elif m.group(1) is None:
+            raise TemplateError(f"Unbalanced '{tok}' in template at position {m.start() + 1}")
+        else:
+            name = m.group(1)
+            if name not in FIELDS:
+                raise TemplateError(f"Unknown template field {{{name}}}. "
+                                    f"Known: {', '.join(sorted(FIELDS))}")
+            parts.append(("field", name, m.group(2) or ""))
+        pos = m.end()
+    if pos < len(template):
+        parts.append(("text", template[pos:], ""))
+    return parts
+
+
+def fields_of(template: str) -> set:
+    return {v for kind, v, _ in parse(template) if kind == "field"}
+
+
+def legacy_template(index_type: str, index_pos: str) -> str:
+    if index_type == "none":
+        return "{base}"
+    return "{index}{sep}{base}" if index_pos == "before" else "{base}{sep}{index}"
+
+
+# ---------- index tokens
+def index_tokens(index_type: str, start: int, count: int, pad: int) -> List[str]:
+    """Formatted index for every seq in [start, start + count), computed in bulk."""
+    stop = start + max(count, 0)
+    if index_type == "none":
+        return [""] * (stop - start)
+    if index_type == "letters":
+        return [int_to_letters(max(1, n)) for n in range(start, stop)]
+    if index_type == "roman":
+        return [int_to_roman(max(1, n)) for n in range(start, stop)]
+    if pad > 1:
+        return [str(n).zfill(pad) for n in range(start, stop)]
+    return [str(n) for n in range(start, stop)]
+
+
+# ---------- runtime helpers used by generated code
+def _utc(sec: int) -> time.struct_time:
+    # time.gmtime() rejects dates before 1970 on Windows; datetime doesn't
+    return (_EPOCH + timedelta(seconds=sec)).timetuple()
+
+
+class _Memo(dict):
+    """dict that fills itself from `fn` (parent folder names, mtime strings)."""
+    __slots__ = ("fn",)
+
+    def __init__(self, fn):
+        super().__init__()
+        self.fn = fn
+
+    def __missing__(self, key):
+        v = self[key] = self.fn(key)
+        return v
+
+
+def _clean_edges(pieces, case) -> bool:
+    """True when strip / rstrip('.') / the 240-char cap / 'untitled' can't change
+    any stem built from `pieces`, so the generated code can skip them."""
+    if not pieces or any(code is not None and val is None for code, val in pieces):
+        return False
+    head, tail = pieces[0], pieces[-1]
+    if head[0] is None:
+        text = getattr(head[1], case)() if case else head[1]
+        if text[:1].isspace():
+            return False
+    if tail[0] is None:
+        text = getattr(tail[1], case)() if case else tail[1]
+        if text[-1:].isspace() or text.endswith("."):
+            return False
+    longest = sum(len(getattr(v, case)() if case else v) if c is None else v for c, v in pieces)
+    return longest <= 240
+
+
+class CompiledTemplate:
+    """`make(record, seq)` -> full new file name (sanitized, case and extension applied)."""
+
+    def __init__(self, opts, count: int):
+        self.template = opts.template or legacy_template(opts.index_type, opts.index_pos)
+        self.parts = parse(self.template)
+        self.fields = {v for kind, v, _ in self.parts if kind == "field"}
+        self.needs_stat = bool(self.fields & STAT_FIELDS)
+
+        start = opts.start
+        ns: Dict[str, object] = {}
+        # (code, value): code is None for literal text (value is the text); for code
+        # that always yields a non-blank token (index, size) value is its max length
+        pieces: List[Tuple[str, object]] = []
+        raw = False  # some piece is unsanitized file-system text: sanitize the whole stem per file
+        for kind, value, spec in self.parts:
+            if kind == "text":
+                pieces.append((None, value))
+            elif value == "base":
+                pieces.append((None, opts.base))
+            elif value == "sep":
+                pieces.append((None, opts.sep))
+            elif value == "index":
+                if spec and opts.index_type == "numbers":
+                    try:
+                        pad = max(1, min(int(spec), 12))
+                    except ValueError:
+                        raise TemplateError(f"Bad index width: {{index:{spec}}}") from None
+                else:
+                    pad = decide_pad(opts.index_type, opts.pad, start, count)
+                # reset-per-folder restarts at `start`, so `count` tokens always suffice
+                key = f"_tok{len(ns)}"
+                tokens = ns[key] = index_tokens(opts.index_type, start, count, pad)
+                longest = None
+                if tokens and opts.index_type != "none":
+                    # numbers and letters grow monotonically; roman numerals top out at 15 chars
+                    longest = max(len(tokens[0]), len(tokens[-1]), 15 if opts.index_type == "roman" else 0)
+                pieces.append((f"{key}[seq - {start}]" if start else f"{key}[seq]", longest))
+            elif value == "size":
+                pieces.append(("str(rec.size)", 20))
+            elif value == "parent":
+                # one basename + sanitize per folder, not per file
+                key = f"_par{len(ns)}"
+                ns[key] = _Memo(lambda d: _ILLEGAL.sub("_", os.path.basename(d)))
+                pieces.append((f"{key}[rec.parent]", None))
+            elif value == "mtime":
+                fmt = spec or "%Y%m%d"
+                key = f"_mt{len(ns)}"
+                # keyed by whole seconds: files from one import share a handful of values
+                ns[key] = _Memo(lambda sec, fmt=fmt: _ILLEGAL.sub("_", time.strftime(fmt, time.localtime(sec))))
+                pieces.append((f"{key}[rec.mtime_ns // 1000000000]", None))
+            elif value == "taken":
+                fmt = spec or "%Y%m%d"
+                key = f"_tk{len(ns)}"
+                # capture dates are wall-clock times stored as UTC seconds (see smartrename.exif)
+                ns[key] = _Memo(lambda sec, fmt=fmt: _ILLEGAL.sub("_", time.strftime(fmt, _utc(sec))))
+                pieces.append((f"{key}[rec.taken]", None))
+            elif value == "orig_stem":
+                pieces.append(("(n[:i] if 0 < i < len(n) - 1 else n)", None))
+                raw = True
+            elif value == "orig_name":
+                pieces.append(("n", None))
+                raw = True
+
+        find = opts.find
+        if find:
+            try:
+                ns["_find"] = re.compile(find)
+            except re.error as e:
+                raise TemplateError(f"Bad find pattern: {e}") from None
+            ns["_repl"] = opts.replace
+            raw = True
+
+        # merge adjacent literals; sanitize them now unless the whole stem is sanitized per file
+        merged: List[Tuple[str, object]] = []
+        for code, val in pieces:
+            if code is None and merged and merged[-1][0] is None:
+                merged[-1] = (None, merged[-1][1] + val)
+            else:
+                merged.append((code, val))
+        merged = [(c, v if c or raw else _ILLEGAL.sub("_", v)) for c, v in merged if c or v]
+        expr = " + ".join(c or repr(v) for c, v in merged) or "''"
+
+        case = opts.case if opts.case in ("lower", "upper", "title") else None
+        body = ["    n = rec.name", "    i = n.rfind('.')", f"    s = {expr}"]
+        if find:
+            body.append("    s = _find.sub(_repl, s)")
+        if case:
+            body.append(f"    s = s.{case}()")
+        if raw:
+            ns["_illegal_sub"] = _ILLEGAL.sub
+            body.append("    s = _illegal_sub('_', s)")
+        if raw or not _clean_edges(merged, case):
+            body.append("    s = s.strip().rstrip('.')[:240] or 'untitled'")
+        ext = "n[i:]" if opts.ext_mode not in ("lower", "upper") else f"n[i:].{opts.ext_mode}()"
+        body.append(f"    return s + {ext} if 0 < i < len(n) - 1 else s")
+        src = "def make(rec, seq):\n" + "\n".join(body) + "\n"
+        exec(compile(src, f"<template {self.template!r}>", "exec"), ns)
+        self.source = src
+        self.make: Callable[[object, int], str] = ns["make"]
+
+
+def compile_template(opts, count: int) -> CompiledTemplate:
+    return CompiledTemplate(opts, count)
@@ -0,0 +1,209 @@
+"""Virtual (windowed) view over a ttk.Treeview.
+
+The Treeview only ever holds as many items as fit on screen; scrolling re-fills
+those items from the backing row list. Filtering and sorting run on a list of
+row indices, never on widget items, so a million-row preview costs one Python
+list rather than a million Tcl items.
+"""
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, Dict, Optional, Sequence
+
+
+class VirtualTable:
+    def __init__(self, tree: ttk.Treeview, vsb: ttk.Scrollbar,
+                 values: Callable[[object], tuple],
+                 tag: Callable[[object], str],
+                 sort_keys: Dict[str, Callable[[object], object]]):
+        self.tree = tree
+        self.vsb = vsb
+        self._values = values
+        self._tag = tag
+        self._sort_keys = sort_keys
+        self._headings = {col: tree.heading(col, "text") for col in sort_keys}
+
+        self.rows: Sequence = []
+        self.view: Sequence[int] = range(0)   # row indices in display order
+        self.top = 0                           # view position of the first visible item
+        self._selected: Optional[int] = None   # row index
+        self._filter: Optional[Callable[[object], bool]] = None
+        self._sort: Optional[tuple] = None     # (column, reverse)
+        self.item_updates = 0                  # Treeview insert/item calls, for metrics
+
+        vsb.configure(command=self._on_scrollbar)
+        tree.configure(yscrollcommand="")
+        tree.bind("<Configure>", lambda e: self.render())
+        tree.bind("<MouseWheel>", self._on_wheel)
+        tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        tree.bind("<Button-5>", lambda e: self.scroll(3))
+        tree.bind("<<TreeviewSelect>>", self._on_select)
+        tree.bind("<Up>", lambda e: self._move(-1))
+        tree.bind("<Down>", lambda e: self._move(1))
+        tree.bind("<Prior>", lambda e: self._move(-self._capacity()))
+        tree.bind("<Next>", lambda e: self._move(self._capacity()))
+        tree.bind("<Home>", lambda e: self._move(-len(self.view)))
+        tree.bind("<End>", lambda e: self._move(len(self.view)))
+        for col in sort_keys:
+            tree.heading(col, command=lambda c=col: self.sort_by(c))
+
+    # ---------- data
+    def set_rows(self, rows: Sequence, keep_position: bool = False):
+        """Show a new backing list (keeps the current filter and sort). With
+        keep_position the scroll offset stays put, e.g. for a live update."""
+        self.rows = rows
+        if not keep_position:
+            self.top = 0
+        self._selected = None
+        self._rebuild_view()
+
+    def clear(self):
+        self.set_rows([])
+
+    def refresh(self):
+        """Re-apply filter/sort after rows were changed in place."""
+        self._rebuild_view()
+
+    def set_filter(self, pred: Optional[Callable[[object], bool]]):
+        self._filter = pred
+        self.top = 0
+        self._rebuild_view()
+
+    def sort_by(self, column: Optional[str], reverse: Optional[bool] = None):
+        """Sort by a column (clicking the same heading again flips the order);
+        column=None restores the original row order."""
+        if column is None:
+            self._sort = None
+        else:
+            if reverse is None:
+                reverse = bool(self._sort and self._sort[0] == column and not self._sort[1])
+            self._sort = (column, reverse)
+        for col, text in self._headings.items():
+            arrow = ""
+            if self._sort and self._sort[0] == col:
+                arrow = " ▼" if self._sort[1] else " ▲"
+            self.tree.heading(col, text=text + arrow)
+        self._rebuild_view()
+
+    def _rebuild_view(self):
+        rows = self.rows
+        if self._filter is None and self._sort is None:
+            self.view = range(len(rows))
+        else:
+            pred = self._filter
+            view = [i for i in range(len(rows)) if pred(rows[i])] if pred else list(range(len(rows)))
+            if self._sort:
+                key = self._sort_keys[self._sort[0]]
+                view.sort(key=lambda i: key(rows[i]), reverse=self._sort[1])
+            self.view = view
+        self.render()
+
+    def __len__(self):
+        return len(self.view)
+
+    # ---------- selection
+    def selected_row(self) -> Optional[int]:
+        """Index into `rows` of the selected row (None if nothing is selected)."""
+        return self._selected
+
+    def select_item(self, iid: str):
+        pos = self.top + int(iid)
+        if 0 <= pos < len(self.view):
+            self._selected = self.view[pos]
+            self.tree.selection_set(iid)
+
+    def _on_select(self, _event=None):
+        sel = self.tree.selection()
+        if sel:
+            pos = self.top + int(sel[0])
+            if pos < len(self.view):
+                self._selected = self.view[pos]
+
+    def _selected_pos(self) -> Optional[int]:
+        if self._selected is None:
+            return None
+        try:
+            return self.view.index(self._selected)
+        except ValueError:
+            return None
+
+    def _move(self, delta: int):
+        n = len(self.view)
+        if not n:
+            return "break"
+        pos = self._selected_pos()
+        pos = 0 if pos is None else max(0, min(n - 1, pos + delta))
+        self._selected = self.view[pos]
+        cap = self._capacity()
+        if pos < self.top:
+            self.top = pos
+        elif pos >= self.top + cap:
+            self.top = pos - cap + 1
+        self.render()
+        return "break"
+
+    # ---------- scrolling
+    def _capacity(self) -> int:
+        try:
+            rh = int(ttk.Style(self.tree).lookup("Treeview", "rowheight") or 20)
+        except (tk.TclError, ValueError):
+            rh = 20
+        h = self.tree.winfo_height()
+        if h <= 1:
+            # not mapped yet
+            return int(self.tree.cget("height"))
+        # one row's worth of space goes to the heading
+        return max(1, h // rh - 1)
+
+    def scroll(self, delta: int):
+        self.top += delta
+        self.render()
+        return "break"
+
+    def _on_wheel(self, event):
+        d = event.delta
+        steps = -(d // 120) if abs(d) >= 120 else -d
+        return self.scroll(steps * 3)
+
+    def _on_scrollbar(self, *args):
+        n = len(self.view)
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * n)
+        elif args[0] == "scroll":
+            step = int(args[1])
+            self.top += step * (self._capacity() if args[2] == "pages" else 1)
+        self.render()
+
+    # ---------- drawing
+    def render(self):
+        n = len(self.view)
+        cap = self._capacity()
+        slots = min(cap, n)
+        self.top = max(0, min(self.top, n - slots))
+
+        tree = self.tree
+        children = tree.get_children()
+        if len(children) > slots:
+            tree.delete(*children[slots:])
+        for i in range(len(children), slots):
+            tree.insert("", "end", iid=str(i))
+        self.item_updates += max(0, slots - len(children)) + slots
+
+        sel_iid = None
+        for i in range(slots):
+            pos = self.top + i
+            ri = self.view[pos]
+            row = self.rows[ri]
+            tree.item(str(i), values=self._values(row),
+                      tags=(self._tag(row), "row_even" if (pos + 1) % 2 == 0 else "row_odd"))
+            if ri == self._selected:
+                sel_iid = str(i)
+
+        if sel_iid is not None:
+            tree.selection_set(sel_iid)
+        elif tree.selection():
+            tree.selection_remove(*tree.selection())
+
+        if n:
+            self.vsb.set(self.top / n, (self.top + slots) / n)
+        else:
+            self.vsb.set(0.0, 1.0)
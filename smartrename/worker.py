@@ -0,0 +1,86 @@
+"""Background job runner used by the Tk app.
+
+A job runs on a daemon thread and talks to the UI only through `events`, a
+thread-safe queue the UI drains with `after()`. Progress is throttled on the
+worker side so the queue never carries more than ~20 updates per second.
+Nothing here touches tkinter.
+"""
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+PROGRESS_INTERVAL = 0.05  # seconds between progress events (~20 Hz)
+
+# event kinds
+EV_LOG = "log"
+EV_STATUS = "status"
+EV_PROGRESS = "progress"
+EV_DONE = "done"
+EV_ERROR = "error"
+
+
+class Worker:
+    def __init__(self, log_sink=None):
+        self.events: "queue.Queue[Tuple[str, object]]" = queue.Queue()
+        # when set (a smartrename.logsink.LogSink), log lines bypass the event queue
+        self.log_sink = log_sink
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_progress = 0.0
+
+    @property
+    def busy(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, fn: Callable, *args):
+        """Run fn(worker, *args) in the background. Its return value arrives as an
+        EV_DONE event; an exception arrives as EV_ERROR followed by EV_DONE(None)."""
+        if self.busy:
+            raise RuntimeError("a job is already running")
+        self._cancel.clear()
+        self._last_progress = 0.0
+
+        def run():
+            result = None
+            try:
+                result = fn(self, *args)
+            except Exception as e:  # surfaced to the UI, never lost in the thread
+                self.events.put((EV_ERROR, e))
+            finally:
+                self.events.put((EV_DONE, result))
+
+        self._thread = threading.Thread(target=run, name="renamer-worker", daemon=True)
+        self._thread.start()
+
+    # ---------- called from the UI thread
+    def cancel(self):
+        self._cancel.set()
+
+    def drain(self, limit: int = 50000) -> List[Tuple[str, object]]:
+        out = []
+        try:
+            while len(out) < limit:
+                out.append(self.events.get_nowait())
+        except queue.Empty:
+            pass
+        return out
+
+    # ---------- called from the job
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def log(self, msg: str):
+        if self.log_sink is not None:
+            self.log_sink.write(msg)
+        else:
+            self.events.put((EV_LOG, msg))
+
+    def status(self, text: str):
+        self.events.put((EV_STATUS, text))
+
+    def progress(self, done: int, total: int, force: bool = False):
+        now = time.monotonic()
+        if force or now - self._last_progress >= PROGRESS_INTERVAL:
+            self._last_progress = now
+            self.events.put((EV_PROGRESS, min(100.0, done / total * 100) if total else 100.0))
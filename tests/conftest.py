@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the package is used from a checkout (there is no install step)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
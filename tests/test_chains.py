@@ -0,0 +1,87 @@
+"""Swaps and cycles: apply, count per file, undo."""
+import os
+
+import pytest
+
+from smartrename import chains, engine, journal
+from smartrename.renameat import Renamer, open_renamer
+
+# a swap (a <-> b) and a 3-cycle (c -> d -> e -> c): five files
+PAIRS = [("a", "b"), ("b", "a"), ("c", "d"), ("d", "e"), ("e", "c")]
+
+
+def make_rows(folder):
+    for name in "abcde":
+        (folder / name).write_text(name)
+    return [engine.PlanRow(folder / src, dst, folder / dst, engine.STATUS_OK) for src, dst in PAIRS]
+
+
+def contents(folder):
+    return {name: (folder / name).read_text() for name in sorted(os.listdir(folder))}
+
+
+@pytest.mark.parametrize("atomic", [False, True])
+@pytest.mark.parametrize("workers", [1, 3])
+def test_swap_and_cycle_round_trip(tmp_path, atomic, workers):
+    rows = make_rows(tmp_path)
+    renamer = open_renamer() if atomic else Renamer()
+    with renamer:
+        steps = chains.order_renames(rows, exchange=renamer.can_exchange)
+        results = []
+        ok, fail, undo_map = engine.apply_steps(steps, lambda *r: results.append(r), None, None,
+                                                workers, renamer)
+    assert (ok, fail) == (5, 0)
+    assert len(results) == 5 and all(err is None for _, _, err in results)
+    assert contents(tmp_path) == {"a": "b", "b": "a", "c": "e", "d": "c", "e": "d"}
+
+    # the reported moves bring the preview rows up to date
+    assert engine.patch_rows(rows, [(s, d) for s, d, _ in results], {}) == (5, 0)
+
+    reverted = []
+    assert engine.undo_renames(undo_map, lambda *r: reverted.append(r)) == (5, 0)
+    assert len(reverted) == 5
+    assert undo_map == []
+    assert contents(tmp_path) == {n: n for n in "abcde"}
+
+
+def test_cancel_never_strands_a_file_on_a_temporary_name(tmp_path):
+    rows = make_rows(tmp_path)
+    steps = chains.order_renames(rows, exchange=False)
+    polls = []
+
+    def cancel():
+        polls.append(1)
+        return len(polls) > 1  # cancel right after the first step parked a file
+
+    ok, fail, undo_map = engine.apply_steps(steps, None, cancel, None, 1, Renamer())
+    assert (ok, fail) == (2, 0)
+    assert not any(chains.is_temp(n) for n in os.listdir(tmp_path))
+
+    assert engine.undo_renames(undo_map, cancel=lambda: True) == (0, 0)
+    assert len(undo_map) == 3  # nothing attempted: all of it can still be undone
+    assert engine.undo_renames(undo_map) == (2, 0)
+    assert contents(tmp_path) == {n: n for n in "abcde"}
+
+
+def test_failed_cycle_puts_the_parked_file_back(tmp_path):
+    rows = make_rows(tmp_path)[2:]
+    (tmp_path / "e").unlink()  # e -> c fails, so d -> e and the hop to d can't run
+    steps = chains.order_renames(rows, exchange=False)
+    results = []
+    ok, fail, undo_map = engine.apply_steps(steps, lambda *r: results.append(r), None, None, 1, Renamer())
+    assert (ok, fail) == (0, 3)
+    assert [src.name for src, _, err in results if err is not None] == ["e", "d", "c"]
+    assert sorted(os.listdir(tmp_path)) == ["a", "b", "c", "d"]
+    assert undo_map == []
+
+
+def test_journaled_cycle_undo_counts_files(tmp_path):
+    folder, jdir = tmp_path / "photos", tmp_path / "journal"
+    folder.mkdir()
+    rows = make_rows(folder)[2:]
+    ok, fail, _, batch = journal.apply_journaled(rows, folder, directory=jdir)
+    assert (ok, fail) == (3, 0)
+    results = []
+    assert journal.undo_batch(journal.find_batch(batch, jdir), lambda *r: results.append(r)) == (3, 0)
+    assert len(results) == 3
+    assert contents(folder) == {n: n for n in "abcde"}
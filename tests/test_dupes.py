@@ -0,0 +1,61 @@
+"""Duplicate detection: size buckets, partial hashes, full hashes."""
+from smartrename import dupes, engine
+from smartrename.metacache import MetaCache
+from smartrename.metrics import Metrics
+from smartrename.scanner import scan_tree
+
+BIG = 3 * dupes.PARTIAL_BYTES
+
+
+def make_files(folder):
+    files = {
+        "a1": b"same", "a2": b"same", "b": b"diff",   # one size: two copies and a different file
+        "e1": b"", "e2": b"",                         # empty files are never duplicates
+        "big1": b"x" * BIG, "big2": b"x" * BIG,
+        "big3": b"x" * (BIG // 2) + b"y" + b"x" * (BIG // 2 - 1),  # same size, head and tail as big1
+        "odd": b"unique size",
+    }
+    for name, data in files.items():
+        (folder / name).write_bytes(data)
+
+
+def named(records, dup_of):
+    return {records[i].name: records[j].name for i, j in dup_of.items()}
+
+
+def by_name(folder):
+    records = scan_tree(folder).records
+    records.sort(key=lambda r: r.name)
+    return records
+
+
+def test_only_identical_files_are_duplicates(tmp_path):
+    make_files(tmp_path)
+    records = by_name(tmp_path)
+    m = Metrics("preview")
+    assert named(records, dupes.find_duplicates(records, workers=2, metrics=m)) == {"a2": "a1", "big2": "big1"}
+    assert m.counts["dup_partial_files"] == 6   # the unique size is never read
+    assert m.counts["dup_full_files"] == 3      # the big files tie on their first and last bytes
+
+
+def test_cached_hashes_are_not_read_again(tmp_path):
+    folder = tmp_path / "files"
+    folder.mkdir()
+    make_files(folder)
+    cache = MetaCache(tmp_path / "meta.sqlite")
+    try:
+        first = dupes.find_duplicates(by_name(folder), cache=cache, workers=1)
+        records = by_name(folder)
+        m = Metrics("preview")
+        assert dupes.find_duplicates(records, cache=cache, workers=1, metrics=m) == first
+        assert m.counts["dup_partial_files"] == m.counts["dup_full_files"] == 0
+    finally:
+        cache.close()
+
+
+def test_plan_marks_copies(tmp_path):
+    make_files(tmp_path)
+    rows = engine.plan(engine.RenameOptions(folder=tmp_path, base="f", find_dupes=True))
+    dup = {r.old_path.name: r.dup_of.name for r in rows if r.status == engine.STATUS_DUPLICATE}
+    assert dup == {"a2": "a1", "big2": "big1"}
+    assert all(r.new_name == r.old_path.name for r in rows if r.status == engine.STATUS_DUPLICATE)
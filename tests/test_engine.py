@@ -0,0 +1,52 @@
+"""The shared planner and the headless CLI."""
+import json
+import os
+
+from smartrename import cli, engine
+
+
+def make_files(folder, *names):
+    folder.mkdir(exist_ok=True)
+    for n in names:
+        (folder / n).write_text(n)
+
+
+def test_plan_numbers_files_in_name_order(tmp_path):
+    make_files(tmp_path, "b.JPG", "a.jpg", "c.png")
+    rows = engine.plan(engine.RenameOptions(folder=tmp_path, base="Trip", sep="-", ext_mode="lower"))
+    assert [(r.old_path.name, r.new_name, r.status) for r in rows] == [
+        ("a.jpg", "Trip-1.jpg", engine.STATUS_OK),
+        ("b.JPG", "Trip-2.jpg", engine.STATUS_OK),
+        ("c.png", "Trip-3.png", engine.STATUS_OK),
+    ]
+
+
+def test_clashing_names_are_resolved_or_reported(tmp_path):
+    make_files(tmp_path, "a.jpg", "b.jpg")
+    rows = engine.plan(engine.RenameOptions(folder=tmp_path, base="Trip", template="{base}"))
+    assert [r.new_name for r in rows] == ["Trip.jpg", "Trip (1).jpg"]
+
+    rows = engine.plan(engine.RenameOptions(folder=tmp_path, base="Trip", template="{base}", auto_resolve=False))
+    assert engine.STATUS_CONFLICT in [r.status for r in rows]
+
+
+def test_cli_previews_then_applies(tmp_path, capsys):
+    make_files(tmp_path / "photos", "b.jpg", "a.jpg")
+    folder = str(tmp_path / "photos")
+    assert cli.main([folder, "--base", "Trip"]) == 0
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [r["new_name"] for r in rows] == ["Trip_1.jpg", "Trip_2.jpg"]
+    assert sorted(os.listdir(folder)) == ["a.jpg", "b.jpg"]  # a preview renames nothing
+
+    assert cli.main([folder, "--base", "Trip", "--apply", "--format", "none", "--no-journal"]) == 0
+    assert sorted(os.listdir(folder)) == ["Trip_1.jpg", "Trip_2.jpg"]
+    assert (tmp_path / "photos" / "Trip_1.jpg").read_text() == "a.jpg"
+
+
+def test_cli_requires_a_base(tmp_path, capsys):
+    try:
+        cli.main([str(tmp_path)])
+    except SystemExit as e:
+        assert e.code == 2
+    else:
+        raise AssertionError("no error without --base")
@@ -0,0 +1,55 @@
+"""Capture dates: EXIF when there is one, else the modified time, before 1970 too."""
+import os
+
+from smartrename import engine, exif
+from smartrename.metacache import MetaCache
+from smartrename.scanner import FileRecord
+
+OLD_MTIME = -34_560_000      # 1968-11-27
+NEW_MTIME = 1_700_000_000    # 2023-11-14
+
+
+def test_parse_date():
+    assert exif.parse_date(b"2023:07:14 18:02:31\0") == 1689357751
+    assert exif.parse_date(b"1965:03:04 10:11:12") < 0
+    assert exif.parse_date(b"0000:00:00 00:00:00") is None
+    assert exif.parse_date(b"") is None
+
+
+def test_capture_date_before_1970_from_the_cache(tmp_path):
+    (tmp_path / "old.jpg").write_bytes(b"\xff\xd8")
+    (tmp_path / "none.jpg").write_bytes(b"\xff\xd8")
+
+    def records():
+        out = []
+        for n in ("old.jpg", "none.jpg"):
+            st = os.stat(tmp_path / n)
+            out.append(FileRecord(str(tmp_path), n, st.st_size, st.st_mtime_ns, st.st_ino, dev=st.st_dev))
+        return out
+
+    cache = MetaCache(tmp_path / "meta.sqlite")
+    try:
+        first = records()
+        assert exif.fill_taken(first, cache=cache) == (0, 2)  # read both: neither has a date
+        cache.put(first[:1], "taken", [exif.parse_date(b"1965:03:04 10:11:12")])
+        again = records()
+        assert exif.fill_taken(again, cache=cache) == (1, 0)
+    finally:
+        cache.close()
+    assert again[0].taken == exif.parse_date(b"1965:03:04 10:11:12")
+    assert again[1].taken == first[1].taken  # no date: the modified time
+
+
+def test_modified_before_1970_is_a_date(tmp_path):
+    for name, mtime in (("new.jpg", NEW_MTIME), ("old.jpg", OLD_MTIME)):
+        (tmp_path / name).write_bytes(b"\xff\xd8")
+        os.utime(tmp_path / name, (mtime, mtime))
+    opts = engine.RenameOptions(folder=tmp_path, base="x", sort="taken", template="{taken:%Y}_{index}")
+    rows = engine.plan(opts)
+    assert [(r.old_path.name, r.new_name) for r in rows] == [("old.jpg", "1968_1.jpg"), ("new.jpg", "2023_2.jpg")]
+
+
+def test_records_scanned_without_stat_keep_no_date():
+    r = FileRecord("/nowhere", "a.jpg", -1, -1, 0)
+    exif.fill_taken([r])
+    assert r.taken is None
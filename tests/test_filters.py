@@ -0,0 +1,56 @@
+"""Scan filters: pruned folders, name rules, stat bounds."""
+import os
+
+from smartrename import engine
+from smartrename.filters import ScanFilter
+from smartrename.scanner import scan_tree
+
+
+def make_tree(root):
+    for d in ("keep/deep", "node_modules/pkg", "raw", ".hidden"):
+        (root / d).mkdir(parents=True)
+    for f in ("a.jpg", "b.tmp", "keep/c.jpg", "keep/deep/d.jpg", "node_modules/pkg/e.jpg",
+              "raw/f.jpg", ".hidden/g.jpg", ".h.jpg"):
+        (root / f).write_text(f)
+
+
+def found(result, root):
+    return sorted(os.path.relpath(os.path.join(r.parent, r.name), root).replace(os.sep, "/")
+                  for r in result.records)
+
+
+def test_excluded_folders_are_never_listed(tmp_path):
+    make_tree(tmp_path)
+    filt = ScanFilter(tmp_path, exclude=["node_modules", "raw/*", "*.tmp"], skip_hidden=True)
+    result = scan_tree(tmp_path, recursive=True, with_stat=False, filt=filt)
+    assert found(result, tmp_path) == ["a.jpg", "keep/c.jpg", "keep/deep/d.jpg"]
+    # raw/* leaves out raw's files, not raw itself
+    assert sorted(result.names_by_dir) == sorted(str(tmp_path / d) for d in ("", "keep", "keep/deep", "raw"))
+    assert result.scandir_calls == 4
+    assert result.pruned == 2
+    # left-out files still block their names
+    assert result.exists(str(tmp_path), "b.tmp")
+
+
+def test_include_rules_pick_files_but_every_folder_is_walked(tmp_path):
+    make_tree(tmp_path)
+    filt = ScanFilter(tmp_path, include=["re:^keep/"])
+    assert found(scan_tree(tmp_path, recursive=True, with_stat=False, filt=filt), tmp_path) == \
+        ["keep/c.jpg", "keep/deep/d.jpg"]
+
+
+def test_options_prune_through_engine_scan(tmp_path):
+    make_tree(tmp_path)
+    opts = engine.RenameOptions(folder=tmp_path, base="x", include_sub=True, extensions="jpg",
+                                exclude="node_modules; raw", skip_hidden=True)
+    assert found(engine.scan(opts), tmp_path) == ["a.jpg", "keep/c.jpg", "keep/deep/d.jpg"]
+
+
+def test_older_than_excludes_its_own_bound(tmp_path):
+    f = tmp_path / "a.jpg"
+    f.write_text("a")
+    os.utime(f, ns=(1_700_000_000 * 10**9, 1_700_000_000 * 10**9))
+    st = os.stat(f)
+    assert ScanFilter(tmp_path, older_than=1_700_000_000).skip_stat(st)
+    assert not ScanFilter(tmp_path, older_than=1_700_000_001).skip_stat(st)
+    assert not ScanFilter(tmp_path, newer_than=1_700_000_000).skip_stat(st)
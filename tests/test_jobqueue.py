@@ -0,0 +1,70 @@
+"""Job queue: the per-device and overall limits, failures, profiles."""
+import threading
+import time
+
+import pytest
+
+from smartrename import engine, jobqueue, profiles
+from smartrename.jobqueue import JOB_DONE, JOB_FAILED, Job, Scheduler
+
+
+class Recorder(Scheduler):
+    """Runs no real job: records how many ran at once, overall and per device."""
+
+    def __init__(self, jobs, **kw):
+        super().__init__(jobs, **kw)
+        self.lock = threading.Lock()
+        self.now = {}
+        self.peak = {}
+        self.peak_total = 0
+        self.order = []
+
+    def run_job(self, job):
+        with self.lock:
+            self.order.append(str(job.folder))
+            self.now[job.device] = self.now.get(job.device, 0) + 1
+            self.peak[job.device] = max(self.peak.get(job.device, 0), self.now[job.device])
+            self.peak_total = max(self.peak_total, sum(self.now.values()))
+        time.sleep(0.03)
+        with self.lock:
+            self.now[job.device] -= 1
+        self._set(job, JOB_DONE)
+
+
+def jobs_on(monkeypatch, devices):
+    """One job per entry of `devices`, its folder named '<device><n>'."""
+    monkeypatch.setattr(jobqueue, "_device", lambda folder: str(folder)[0])
+    return [Job(engine.RenameOptions(folder=f"{d}{i}", base="x")) for i, d in enumerate(devices)]
+
+
+@pytest.mark.parametrize("per_device,max_jobs", [(1, 4), (2, 4), (2, 3), (4, 2)])
+def test_limits(monkeypatch, per_device, max_jobs):
+    s = Recorder(jobs_on(monkeypatch, "AAAABBBC"), per_device=per_device, max_jobs=max_jobs)
+    assert all(job.state == JOB_DONE for job in s.run())
+    assert s.peak_total == min(max_jobs, sum(min(n, per_device) for n in (4, 3, 1)))
+    assert all(n <= per_device for n in s.peak.values())
+    assert s.peak["A"] == min(per_device, max_jobs)
+
+
+def test_a_busy_device_does_not_hold_up_the_queue(monkeypatch):
+    s = Recorder(jobs_on(monkeypatch, "AAB"), per_device=1, max_jobs=2)
+    s.run()
+    assert sorted(s.order[:2]) == ["A0", "B2"] and s.order[2] == "A1"
+
+
+def test_bad_values():
+    with pytest.raises(ValueError):
+        Scheduler([], per_device=0)
+
+
+def test_failed_job_keeps_its_error_and_the_queue_moves_on(tmp_path):
+    good = tmp_path / "good"
+    good.mkdir()
+    (good / "a.jpg").write_text("a")
+    path = tmp_path / "profiles.json"
+    profiles.save("Trip", engine.RenameOptions(folder=good, base="Trip", index_type="letters"), path)
+    jobs = [Job(profiles.options("Trip", folder, path), "Trip") for folder in (tmp_path / "missing", good)]
+    Scheduler(jobs, apply=True).run()
+    assert jobs[0].state == JOB_FAILED and jobs[0].error
+    assert (jobs[1].state, jobs[1].ok) == (JOB_DONE, 1)
+    assert [p.name for p in good.iterdir()] == ["Trip_A.jpg"]
@@ -0,0 +1,77 @@
+"""Journaled batches: undo from anywhere, and never past a newer batch."""
+import os
+from pathlib import Path
+
+from smartrename import engine, journal
+
+
+def row(folder, src, dst):
+    return engine.PlanRow(folder / src, dst, folder / dst, engine.STATUS_OK)
+
+
+def test_undo_from_another_directory(tmp_path, monkeypatch):
+    (tmp_path / "photos").mkdir()
+    (tmp_path / "photos" / "a.jpg").write_text("a")
+    monkeypatch.chdir(tmp_path)
+    rel = Path("photos")
+    ok, fail, _, batch = journal.apply_journaled([row(rel, "a.jpg", "x.jpg")], rel,
+                                                 directory=tmp_path / "journal")
+    assert (ok, fail) == (1, 0)
+
+    monkeypatch.chdir(tmp_path / "journal")
+    state = journal.find_batch(batch, tmp_path / "journal")
+    assert state.root == str(tmp_path / "photos")
+    assert journal.undo_batch(state) == (1, 0)
+    assert os.listdir(tmp_path / "photos") == ["a.jpg"]
+
+
+def test_undo_leaves_names_a_newer_batch_reused(tmp_path):
+    folder, jdir = tmp_path / "photos", tmp_path / "journal"
+    folder.mkdir()
+    (folder / "a.jpg").write_text("a")
+    (folder / "b.jpg").write_text("bb")
+    old = journal.apply_journaled([row(folder, "a.jpg", "x.jpg")], folder, directory=jdir)[3]
+    # the newer batch moves x.jpg on and gives its name to another file
+    new = journal.apply_journaled([row(folder, "x.jpg", "y.jpg"), row(folder, "b.jpg", "x.jpg")], folder,
+                                  directory=jdir)[3]
+
+    results = []
+    assert journal.undo_batch(journal.find_batch(old, jdir), lambda *r: results.append(r)) == (0, 1)
+    assert "changed since" in str(results[0][2])
+    assert (folder / "x.jpg").read_text() == "bb"
+
+    assert journal.undo_batch(journal.find_batch(new, jdir)) == (2, 0)
+    assert journal.undo_batch(journal.find_batch(old, jdir)) == (1, 0)
+    assert {n: (folder / n).read_text() for n in os.listdir(folder)} == {"a.jpg": "a", "b.jpg": "bb"}
+
+
+def test_scanned_rows_need_no_stat_to_journal(tmp_path, monkeypatch):
+    folder, jdir = tmp_path / "photos", tmp_path / "journal"
+    folder.mkdir()
+    for n in ("b.jpg", "a.jpg"):
+        (folder / n).write_text(n)
+    rows = engine.plan(engine.RenameOptions(folder=folder, base="Trip"))
+
+    def no_stat(path):
+        raise AssertionError(f"stat'ed {path} for the journal")
+
+    monkeypatch.setattr(journal, "_identity", no_stat)
+    batch = journal.apply_journaled(rows, folder, directory=jdir)[3]
+    monkeypatch.undo()
+    state = journal.find_batch(batch, jdir)
+    assert {i: ino for i, (ino, _) in state.ident.items()} == \
+        {i: os.stat(folder / f"Trip_{i + 1}.jpg").st_ino for i in range(2)}
+    assert journal.undo_batch(state) == (2, 0)
+    assert sorted(os.listdir(folder)) == ["a.jpg", "b.jpg"]
+
+
+def test_undo_of_a_renamed_symlink(tmp_path):
+    folder, jdir = tmp_path / "photos", tmp_path / "journal"
+    folder.mkdir()
+    (tmp_path / "target.jpg").write_text("t")
+    os.symlink(tmp_path / "target.jpg", folder / "link.jpg")
+    rows = engine.plan(engine.RenameOptions(folder=folder, base="Trip"))  # the scan stats through the link
+    batch = journal.apply_journaled(rows, folder, directory=jdir)[3]
+    assert os.path.islink(folder / "Trip_1.jpg")
+    assert journal.undo_batch(journal.find_batch(batch, jdir)) == (1, 0)
+    assert os.listdir(folder) == ["link.jpg"]
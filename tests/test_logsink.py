@@ -0,0 +1,55 @@
+"""LogSink: a bounded ring, coalesced drains, a rotating file behind it."""
+import threading
+
+from smartrename.logsink import LogSink
+
+
+def test_ring_keeps_the_last_lines_and_counts_what_it_dropped():
+    sink = LogSink(max_lines=5)
+    sink.write("".join(f"line {i}\n" for i in range(12)))
+    assert sink.snapshot() == [f"line {i}" for i in range(7, 12)]
+    assert sink.drain() == ([f"line {i}" for i in range(7, 12)], 7)
+    assert sink.drain() == ([], 0)
+    sink.write("one more\n")
+    assert sink.drain() == (["one more"], 0)
+    assert len(sink.snapshot()) == 5
+
+
+def test_partial_lines_wait_for_their_newline():
+    sink = LogSink()
+    sink.write("Renamed a")
+    sink.write(" -> b")
+    assert sink.drain() == ([], 0)
+    sink.write("\n[Error] c: busy\nd")
+    assert sink.drain() == (["Renamed a -> b", "[Error] c: busy"], 0)
+    assert sink.snapshot(errors_only=True) == ["[Error] c: busy"] and sink.error_count == 1
+
+
+def test_concurrent_writers_lose_no_line(tmp_path):
+    sink = LogSink(max_lines=100, path=tmp_path / "log" / "smartrename.log")
+
+    def work(n):
+        for i in range(500):
+            sink.write(f"{n}:{i}\n")
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    lines, dropped = sink.drain()
+    assert len(lines) == 100 and dropped == 1900
+    sink.close()
+    on_disk = (tmp_path / "log" / "smartrename.log").read_text().splitlines()
+    written = sorted(line.split(" ", 2)[2] for line in on_disk)  # after the date and time
+    assert written == sorted(f"{n}:{i}" for n in range(4) for i in range(500))
+
+
+def test_file_rotates(tmp_path):
+    path = tmp_path / "smartrename.log"
+    sink = LogSink(path=path, max_bytes=200, backups=2)
+    for i in range(40):
+        sink.write(f"line {i:02d} with some padding\n")
+    sink.close()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["smartrename.log", "smartrename.log.1", "smartrename.log.2"]
+    assert path.read_text().splitlines()[-1].endswith("line 39 with some padding")
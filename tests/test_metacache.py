@@ -0,0 +1,70 @@
+"""MetaCache: entries only count while the file's size and mtime match."""
+import sqlite3
+
+import pytest
+
+from smartrename.metacache import NO_DATE, MetaCache
+from smartrename.scanner import FileRecord
+
+
+def rec(name, size=10, mtime_ns=1000, inode=None, parent="/d"):
+    return FileRecord(parent, name, size, mtime_ns, inode or sum(map(ord, name)), dev=1)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = MetaCache(tmp_path / "meta.sqlite")
+    yield c
+    c.close()
+
+
+def test_round_trip(cache):
+    files = [rec("a"), rec("b"), rec("c", parent="/e")]
+    cache.put(files, "taken", [5, NO_DATE, None])
+    assert cache.get([rec("a"), rec("b"), rec("c", parent="/e")], "taken") == [5, NO_DATE, None]
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert len(cache) == 2
+
+
+def test_size_or_mtime_change_invalidates(cache):
+    cache.put([rec("a"), rec("b")], "taken", [5, 6])
+    assert cache.get([rec("a", size=11), rec("b", mtime_ns=1001)], "taken") == [None, None]
+    assert cache.get([rec("a"), rec("b")], "taken") == [5, 6]
+
+
+def test_rewrite_of_a_changed_file_drops_its_other_columns(cache):
+    cache.put([rec("a"), rec("b")], "taken", [5, 6])
+    cache.put([rec("a", size=11), rec("b")], "hash", ["h1", "h2"])
+    assert cache.get([rec("a", size=11), rec("b")], "taken") == [None, 6]
+    assert cache.get([rec("a", size=11), rec("b")], "hash") == ["h1", "h2"]
+
+
+def test_unkeyable_records_are_skipped(cache):
+    cache.put([rec("a", size=-1), FileRecord("/d", "w", 10, 1000, 0)], "taken", [5, 5])
+    assert len(cache) == 0
+
+
+def test_eviction_keeps_the_most_recently_used(tmp_path):
+    c = MetaCache(tmp_path / "meta.sqlite", max_rows=2)
+    try:
+        c.put([rec("a"), rec("b", parent="/e"), rec("c", parent="/f")], "taken", [1, 2, 3])
+        c._db.execute("UPDATE meta SET used = used - 100 WHERE dir = '/d'")
+        assert c.evict() == 1
+        assert c.get([rec("a"), rec("b", parent="/e"), rec("c", parent="/f")], "taken") == [None, 2, 3]
+    finally:
+        c.close()
+
+
+def test_old_schema_is_dropped(tmp_path):
+    path = tmp_path / "meta.sqlite"
+    old = MetaCache(path)
+    old.put([rec("a")], "taken", [-1])
+    old.close()
+    db = sqlite3.connect(str(path))
+    db.execute("PRAGMA user_version=1")
+    db.close()
+    c = MetaCache(path)
+    try:
+        assert len(c) == 0
+    finally:
+        c.close()
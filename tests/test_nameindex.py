@@ -0,0 +1,35 @@
+"""NameIndex: taken names and the next free `name (N).ext`."""
+from smartrename.nameindex import NameIndex
+
+
+def test_resolve_skips_existing_and_planned_names():
+    idx = NameIndex({"/d": {"a.jpg", "a (1).jpg", "a (3).jpg"}})
+    assert idx.is_taken("/d", "a.jpg")
+    assert [idx.resolve("/d", "a", ".jpg") for _ in range(3)] == ["a (2).jpg", "a (4).jpg", "a (5).jpg"]
+    assert idx.is_planned("/d", "a (4).jpg")
+    # another stem or folder has its own counter
+    assert idx.resolve("/d", "b", ".jpg") == "b (1).jpg"
+    assert idx.resolve("/e", "a", ".jpg") == "a (1).jpg"
+
+
+def test_vacated_names_are_free_until_occupied_again():
+    idx = NameIndex({"/d": {"a.jpg"}})
+    idx.vacate("/d", "a.jpg")
+    assert not idx.is_taken("/d", "a.jpg")
+    idx.occupy("/d", "a.jpg")
+    assert idx.is_taken("/d", "a.jpg")
+
+
+def test_case_insensitive():
+    idx = NameIndex({"/d": {"IMG.JPG", "img (1).jpg"}}, case_insensitive=True)
+    assert idx.is_taken("/d", "img.jpg")
+    assert idx.resolve("/d", "Img", ".jpg") == "Img (2).jpg"
+    assert NameIndex({"/d": {"IMG.JPG"}}).is_taken("/d", "img.jpg") is False
+
+
+def test_unscanned_folder_is_listed_once(tmp_path):
+    (tmp_path / "x.jpg").write_text("x")
+    idx = NameIndex({})
+    assert idx.is_taken(str(tmp_path), "x.jpg")
+    assert not idx.is_taken(str(tmp_path), "y.jpg")
+    assert idx.listdir_calls == 1
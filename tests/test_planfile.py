@@ -0,0 +1,77 @@
+"""Plan files: export/import round trip, applied from another directory."""
+import os
+
+import pytest
+
+from smartrename import engine, planfile
+
+
+def test_write_and_apply_from_another_directory(tmp_path, monkeypatch):
+    (tmp_path / "photos").mkdir()
+    for n in ("b.jpg", "a.jpg"):
+        (tmp_path / "photos" / n).write_text(n)
+    monkeypatch.chdir(tmp_path)
+    opts = engine.RenameOptions(folder="photos", base="Trip")
+    plan = tmp_path / "plan.csv"
+    assert planfile.write_rows(plan, opts, engine.plan(opts)) == 2
+    assert planfile.read_header(plan)["root"] == str(tmp_path / "photos")
+
+    monkeypatch.chdir(os.sep)
+    ok, fail, stale, _ = planfile.apply_plan(plan)
+    assert (ok, fail, stale) == (2, 0, 0)
+    assert (tmp_path / "photos" / "Trip_1.jpg").read_text() == "a.jpg"
+    assert (tmp_path / "photos" / "Trip_2.jpg").read_text() == "b.jpg"
+
+
+def test_folder_rows_spread_over_the_plan(tmp_path):
+    for d in ("A", "a"):
+        (tmp_path / d).mkdir()
+    (tmp_path / "A" / "x").write_text("x")
+    (tmp_path / "A" / "y").write_text("y")
+    (tmp_path / "a" / "p").write_text("p")
+    plan = tmp_path / "plan.jsonl"
+    with planfile.PlanWriter(plan, tmp_path) as w:
+        w.write(str(tmp_path / "A"), "x", "y", engine.STATUS_OK)
+        w.write(str(tmp_path / "a"), "p", "q", engine.STATUS_OK)
+        w.write(str(tmp_path / "A"), "y", "x", engine.STATUS_OK)  # swaps with the first row
+    assert planfile.apply_plan(plan)[:3] == (3, 0, 0)
+    assert (tmp_path / "A" / "x").read_text() == "y"
+    assert (tmp_path / "A" / "y").read_text() == "x"
+    assert (tmp_path / "a" / "q").read_text() == "p"
+
+
+@pytest.mark.parametrize("ext", [".csv", ".jsonl"])
+def test_export_import_round_trip(tmp_path, ext):
+    folder = tmp_path / "photos"
+    (folder / "sub").mkdir(parents=True)
+    for n in ("b.jpg", "a.jpg", "sub/c, \"q\".jpg"):
+        (folder / n).write_text(n)
+    opts = engine.RenameOptions(folder=folder, base="Trip", include_sub=True)
+    rows = engine.plan(opts)
+    plan = tmp_path / f"plan{ext}"
+    assert planfile.write_rows(plan, opts, rows) == 3
+    with planfile.PlanReader(plan) as reader:
+        assert reader.root == str(folder)
+        assert reader.header["options"]["base"] == "Trip"
+        entries = list(reader)
+    assert [(e.src, e.dst, e.status) for e in entries] == \
+        [(row.old_path.relative_to(folder).as_posix(), row.new_name, row.status) for row in rows]
+    for e in entries:
+        st = os.stat(folder / e.src)
+        assert (e.size, e.mtime_ns) == (st.st_size, st.st_mtime_ns)
+    assert planfile.check_plan(plan) == (3, 3)
+
+
+def test_changed_file_is_stale(tmp_path):
+    folder = tmp_path / "photos"
+    folder.mkdir()
+    for n in ("a.jpg", "b.jpg"):
+        (folder / n).write_text(n)
+    opts = engine.RenameOptions(folder=folder, base="Trip")
+    plan = tmp_path / "plan.jsonl"
+    planfile.write_rows(plan, opts, engine.plan(opts))
+    (folder / "b.jpg").write_text("longer now")
+    errors = []
+    assert planfile.apply_plan(plan, lambda s, d, err: errors.append(err))[:3] == (1, 1, 1)
+    assert [type(err) for err in errors if err is not None] == [planfile.StaleError]
+    assert sorted(os.listdir(folder)) == ["Trip_1.jpg", "b.jpg"]
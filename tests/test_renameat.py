@@ -0,0 +1,46 @@
+"""No-clobber renames."""
+import os
+
+import pytest
+
+from smartrename import renameat
+from smartrename.renameat import Renamer, open_renamer
+
+
+@pytest.mark.parametrize("make", [open_renamer, Renamer])
+def test_existing_target_and_hard_link_are_refused(tmp_path, make):
+    (tmp_path / "a").write_text("a")
+    (tmp_path / "c").write_text("c")
+    os.link(tmp_path / "a", tmp_path / "b")
+    with make() as renamer:
+        with pytest.raises(FileExistsError):
+            renamer.rename(tmp_path / "a", tmp_path / "c")
+        with pytest.raises(FileExistsError, match="hard link"):
+            renamer.rename(tmp_path / "a", tmp_path / "b")
+    assert sorted(os.listdir(tmp_path)) == ["a", "b", "c"]
+
+
+@pytest.mark.parametrize("make", [open_renamer, Renamer])
+def test_swap(tmp_path, make):
+    (tmp_path / "a").write_text("a")
+    (tmp_path / "b").write_text("b")
+    with make() as renamer:
+        renamer.swap(tmp_path / "a", tmp_path / "b", tmp_path / "t")
+    assert [(tmp_path / n).read_text() for n in ("a", "b")] == ["b", "a"]
+    assert sorted(os.listdir(tmp_path)) == ["a", "b"]
+
+
+def test_case_only_rename_lists_no_folder(tmp_path, monkeypatch):
+    (tmp_path / "a.jpg").write_text("a")
+    real = os.lstat
+
+    def lstat(p):  # a case-insensitive filesystem: both spellings are the one file
+        return real(os.fspath(p).replace("A.JPG", "a.jpg"))
+
+    def listdir(p):
+        raise AssertionError("listed a folder for a file with a single name")
+
+    monkeypatch.setattr(renameat.os, "lstat", lstat)
+    monkeypatch.setattr(renameat.os, "listdir", listdir)
+    assert renameat._case_only(tmp_path / "a.jpg", tmp_path / "A.JPG")
+    assert not renameat._case_only(tmp_path / "a.jpg", tmp_path / "b.jpg")
@@ -0,0 +1,56 @@
+"""RowStore: PlanRows kept as columns, read back through Row views."""
+from pathlib import Path
+
+from smartrename import engine
+from smartrename.rowstore import RowStore
+
+
+def make_store(tmp_path):
+    for d in ("a", "b"):
+        (tmp_path / d).mkdir()
+        for n in ("1.jpg", "2.jpg"):
+            (tmp_path / d / n).write_text(n)
+    opts = engine.RenameOptions(folder=tmp_path, base="x", include_sub=True)
+    rows = engine.plan(opts)
+    store = RowStore()
+    for row in rows:
+        store.append_row(row)
+    return opts, rows, store
+
+
+def test_rows_read_back_like_plan_rows(tmp_path):
+    _, rows, store = make_store(tmp_path)
+    assert len(store) == 4
+    assert store.dirs == [str(tmp_path / "a"), str(tmp_path / "b")]  # each folder once
+    assert [r.as_dict() for r in store] == [r.as_dict() for r in rows]
+    assert [(r.old_path, r.target_path, r.tag) for r in store] == [(r.old_path, r.target_path, "ok") for r in rows]
+    assert store.count(engine.STATUS_OK) == 4 and store.indices(engine.STATUS_SKIP) == []
+
+
+def test_rows_are_writable_views(tmp_path):
+    _, rows, store = make_store(tmp_path)
+    row = store[1]
+    row.status = engine.STATUS_CONFLICT
+    row.new_name = "y.jpg"
+    assert store.rows(engine.STATUS_CONFLICT) == [row]
+    assert store[1].target_path == rows[1].old_path.with_name("y.jpg")
+    row.old_path = Path(tmp_path / "c" / "z.jpg")
+    assert (store.parent(1), store[1].old_name) == (str(tmp_path / "c"), "z.jpg")
+    assert len(store.dirs) == 3
+
+
+def test_patch_rows_updates_the_store(tmp_path):
+    _, rows, store = make_store(tmp_path)
+    r0, r1 = store[0], store[1]
+    failed = {r1.old_path: OSError("busy")}
+    assert engine.patch_rows(store, [(r0.old_path, r0.target_path)], failed) == (1, 1)
+    assert (store[0].status, store[0].old_path) == (engine.STATUS_SKIP, rows[0].target_path)
+    assert store[1].status == engine.STATUS_FAILED
+
+
+def test_ident_comes_from_the_scan_while_the_row_names_that_file(tmp_path):
+    opts, rows, store = make_store(tmp_path)
+    store.records = engine.scan(opts).records  # planned in this order
+    assert [r.ident for r in store] == [r.ident for r in store.records] != [None] * 4
+    store[0].old_path = store[0].target_path
+    assert store[0].ident is None
@@ -0,0 +1,73 @@
+"""The scanner: one listing per folder, at most one stat per file."""
+import os
+
+from smartrename.scanner import scan_tree
+
+
+def make_tree(root):
+    for d in ("a/x", "b"):
+        (root / d).mkdir(parents=True)
+    for f in ("1.jpg", "2.jpg", "a/3.jpg", "a/x/4.jpg", "b/5.jpg"):
+        (root / f).write_text(f)
+
+
+def test_records_carry_the_stat_they_were_scanned_with(tmp_path):
+    make_tree(tmp_path)
+    result = scan_tree(tmp_path)
+    assert sorted(r.name for r in result.records) == ["1.jpg", "2.jpg"]
+    for r in result.records:
+        st = os.stat(tmp_path / r.name)
+        assert (r.size, r.mtime_ns, r.inode) == (st.st_size, st.st_mtime_ns, st.st_ino)
+    assert result.stat_calls == 3 and result.scandir_calls == 1
+    # folders are collision targets too
+    assert result.names_by_dir[str(tmp_path)] == {"1.jpg", "2.jpg", "a", "b"}
+    assert result.exists(str(tmp_path), "a")
+    assert not result.exists(str(tmp_path), "3.jpg")
+
+
+def test_names_only_scan_never_stats_a_file(tmp_path):
+    make_tree(tmp_path)
+    result = scan_tree(tmp_path, recursive=True, with_stat=False)
+    assert len(result) == 5
+    assert all(r.size == -1 and r.mtime_ns == -1 and r.inode > 0 for r in result.records)
+    assert result.stat_calls == 4 and result.scandir_calls == 4  # one stat per folder for its mtime
+    assert set(result.dir_mtimes) == set(result.names_by_dir)
+
+
+
+def walk(result, root):
+    return [os.path.relpath(os.path.join(r.parent, r.name), root) for r in result.records]
+
+
+def test_parallel_walk_matches_the_sequential_one(tmp_path):
+    for i in range(6):
+        for j in range(4):
+            (tmp_path / f"d{i}" / f"s{j}").mkdir(parents=True)
+            (tmp_path / f"d{i}" / f"s{j}" / "f.jpg").write_text("x")
+        (tmp_path / f"d{i}" / "top.jpg").write_text("x")
+    sequential = scan_tree(tmp_path, recursive=True)
+    for workers in (2, 8):
+        parallel = scan_tree(tmp_path, recursive=True, workers=workers)
+        assert walk(parallel, tmp_path) == walk(sequential, tmp_path)
+        assert parallel.names_by_dir == sequential.names_by_dir
+        assert (parallel.stat_calls, parallel.scandir_calls) == (sequential.stat_calls, sequential.scandir_calls)
+    assert len(sequential) == 30
+
+
+def test_max_depth(tmp_path):
+    make_tree(tmp_path)
+    for workers in (1, 4):
+        result = scan_tree(tmp_path, recursive=True, max_depth=1, workers=workers)
+        assert sorted(r.name for r in result.records) == ["1.jpg", "2.jpg", "3.jpg", "5.jpg"]
+
+
+def test_symlink_loop_is_walked_once(tmp_path):
+    make_tree(tmp_path)
+    os.symlink(tmp_path, tmp_path / "a" / "x" / "up")
+    os.symlink(tmp_path / "b", tmp_path / "b2")
+    for workers in (1, 4):
+        result = scan_tree(tmp_path, recursive=True, workers=workers)
+        # b2 is a second way into b, not a loop: followed like pathlib's glob
+        assert sorted(walk(result, tmp_path)) == sorted(
+            ["1.jpg", "2.jpg", "a/3.jpg", "a/x/4.jpg", "b/5.jpg", "b2/5.jpg"])
+        assert str(tmp_path / "a" / "x" / "up") not in result.names_by_dir
@@ -0,0 +1,40 @@
+"""Compiled templates: same names as the classic builder, fields, errors."""
+import itertools
+
+import pytest
+
+from smartrename import engine
+from smartrename.scanner import FileRecord
+from smartrename.template import TemplateError, compile_template
+
+NAMES = ["IMG_0001.JPG", "noext", ".hidden", "trailing.", "a.b.tar.gz"]
+
+
+@pytest.mark.parametrize("base", ["Trip", "  Sea: day 1. ", "x" * 250, "Ünï cödé"])
+def test_classic_layout_matches_build_name(base):
+    count = 120
+    for index_type, index_pos, case, ext_mode, sep in itertools.product(
+            ["numbers", "letters", "roman", "none"], ["after", "before"], engine.CASE_MODES, engine.EXT_MODES,
+            ["_", " - ", ""]):
+        opts = engine.RenameOptions(folder="/d", base=base, index_type=index_type, index_pos=index_pos,
+                                    case=case, ext_mode=ext_mode, sep=sep, start=7)
+        make = compile_template(opts, count).make
+        pad = engine.decide_pad(index_type, opts.pad, opts.start, count)
+        for seq, name in zip(range(opts.start, opts.start + count, 13), itertools.cycle(NAMES)):
+            i = name.rfind(".")
+            ext = name[i:] if 0 < i < len(name) - 1 else ""
+            expected = engine.build_name(opts, engine.format_index(index_type, seq, pad), ext)
+            assert make(FileRecord("/d", name, 0, 0, 0), seq) == expected, (opts, seq, name)
+
+
+def test_fields():
+    opts = engine.RenameOptions(folder="/d", base="b", template="{parent}-{orig_stem}-{index:3}-{size}{{x}}")
+    rec = FileRecord("/photos/Rome: 2019", "IMG 1.jpg", 2048, 0, 0)
+    assert compile_template(opts, 4).make(rec, 4) == "Rome_ 2019-IMG 1-004-2048{x}.jpg"
+
+
+@pytest.mark.parametrize("template", ["{nope}", "{base", "{index:x}"])
+def test_bad_templates_are_value_errors(template):
+    with pytest.raises(TemplateError):
+        compile_template(engine.RenameOptions(folder="/d", base="b", template=template), 1)
+    assert issubclass(TemplateError, ValueError)
@@ -0,0 +1,59 @@
+"""VirtualTable: only a screenful of Treeview items, whatever the row count."""
+import pytest
+
+tk = pytest.importorskip("tkinter")
+
+ROWS = [f"f{i:05d}" for i in range(100_000)]
+
+
+@pytest.fixture
+def table():
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no display")
+    root.withdraw()
+    from tkinter import ttk
+
+    from smartrename.vtable import VirtualTable
+    tree = ttk.Treeview(root, columns=("name",), show="headings", height=10)  # unmapped: 10 visible rows
+    tree.heading("name", text="Name")
+    t = VirtualTable(tree, ttk.Scrollbar(root), values=lambda r: (r,), tag=lambda r: "ok",
+                     sort_keys={"name": lambda r: r})
+    t.set_rows(ROWS)
+    yield t
+    root.destroy()
+
+
+def shown(t):
+    return [t.tree.item(iid, "values")[0] for iid in t.tree.get_children()]
+
+
+def test_only_visible_rows_are_items(table):
+    assert len(table) == len(ROWS)
+    assert shown(table) == ROWS[:10]
+    assert table.item_updates == 20  # 10 inserts + 10 fills
+    table.scroll(50)
+    assert shown(table) == ROWS[50:60]
+    table.scroll(10**6)
+    assert shown(table) == ROWS[-10:]
+
+
+def test_filter_and_sort_run_on_indices(table):
+    table.set_filter(lambda r: r.endswith("7"))
+    assert len(table) == 10_000 and shown(table)[0] == "f00007"
+    table.sort_by("name")
+    table.sort_by("name")  # the same heading again flips the order
+    assert shown(table)[:2] == ["f99997", "f99987"]
+    assert table.tree.heading("name", "text") == "Name ▼"
+    table.sort_by(None)
+    table.set_filter(None)
+    assert shown(table) == ROWS[:10]
+
+
+def test_selection_is_a_row_index(table):
+    table.scroll(100)
+    table.select_item("3")
+    assert table.selected_row() == 103
+    table.scroll(-100)  # scrolled out of view, still selected
+    assert table.selected_row() == 103 and not table.tree.selection()